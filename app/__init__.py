@@ -4,28 +4,87 @@ from flask_bcrypt import Bcrypt
 from flask_jwt_extended import JWTManager
 from flask_restx import Api
 from flask_migrate import Migrate
-from app.config import Config
+from app.config import get_config
+from app.utils.password_hasher import PasswordHasher
+from app.utils.cache import Cache
+from app.utils.background import BackgroundJobs
+from app.utils.db_pool import PoolMonitor
+from app.utils.replicas import ReplicaRouter, RoutingSession
+from app.utils.shards import ShardRouter
+from app.middlewares.request_metrics import RequestMetrics
 
 # Inicializamos las extensiones globalmente para luego asociarlas a la app en la función create_app
-db = SQLAlchemy()  # Para la interacción con la base de datos usando SQLAlchemy
+db = SQLAlchemy(session_options={'class_': RoutingSession})  # Para la interacción con la base de datos (las lecturas pueden ir a una réplica)
 migrate = Migrate()  # Para gestionar las migraciones de la base de datos
 bcrypt = Bcrypt()  # Para el hash y verificación de contraseñas de los usuarios
 jwt = JWTManager()  # Para la gestión de tokens JWT en la autenticación
+password_hasher = PasswordHasher()  # Para calcular los hashes de contraseñas en un pool de procesos acotado
+cache = Cache()  # Para la caché de lectura de entidades individuales
+background_jobs = BackgroundJobs()  # Para las tareas largas fuera de la petición (purgas de usuarios y hábitos)
+pool_monitor = PoolMonitor()  # Para configurar el pool de conexiones y recoger sus métricas
+request_metrics = RequestMetrics()  # Para medir las consultas y los tiempos de cada petición
+replica_router = ReplicaRouter()  # Para enviar las lecturas a las réplicas con consistencia read-your-writes
+shard_router = ShardRouter()  # Para repartir los usuarios y sus filas entre varias bases de datos
 
-def create_app():
-    """Función factory para crear la aplicación Flask y configurar sus componentes."""
+# Tablas de las que dependen las lecturas de cada namespace, usadas para calcular los ETags
+ETAG_TABLES = {
+    'users': ('users',),
+    'habits': ('habits',),
+    'assignments': ('assignments',),
+    'completed_dates': ('completed_dates', 'assignments'),  # El calendario de un usuario lista sus asignaciones
+}
+
+# Tablas de las rutas que dependen de más tablas que su namespace, indexadas por la regla de la ruta
+ETAG_ROUTE_TABLES = {
+    '/assignments/<int:assignment_id>/stats': ('assignments', 'completed_dates'),  # Las estadísticas dependen de las fechas
+    '/assignments/user/<int:fk_user_id>/stats': ('assignments', 'completed_dates'),
+}
+
+# Tablas de las que dependen las relaciones que se pueden expandir con `?include=`
+INCLUDE_TABLES = {
+    'assignments': ('assignments',),
+    'completed_dates': ('completed_dates',),
+}
+
+def create_app(config_class=None):
+    """
+    Función factory para crear la aplicación Flask y configurar sus componentes.
+
+    Args:
+        config_class (type): Clase de configuración a usar; por defecto la del perfil indicado en APP_ENV.
+    """
     
     # Creamos una instancia de la aplicación Flask
     app = Flask(__name__)
     
-    # Cargamos la configuración de la aplicación desde el archivo de configuración
-    app.config.from_object(Config)
+    # Cargamos la configuración del perfil (desarrollo, producción o benchmark) desde el archivo de configuración
+    app.config.from_object(config_class or get_config())
 
     # Inicializamos las extensiones con la aplicación
+    pool_monitor.init_app(app)  # Ajustar las opciones del pool de conexiones antes de crear el motor
+    replica_router.init_app(app, tuple(ETAG_TABLES))  # Añadir las réplicas de lectura como binds antes de crear los motores
+    shard_router.init_app(app)  # Añadir los shards adicionales como binds antes de crear los motores
     db.init_app(app)  # Inicializar SQLAlchemy con la app
     bcrypt.init_app(app)  # Inicializar Bcrypt con la app
     jwt.init_app(app)  # Inicializar JWTManager con la app
     migrate.init_app(app, db)  # Inicializar Migrate con la app y la base de datos
+    password_hasher.init_app(app)  # Inicializar el pool de hashes de contraseñas con la configuración de la app
+    cache.init_app(app)  # Inicializar la caché con el backend configurado
+    background_jobs.init_app(app)  # Inicializar el pool de tareas en segundo plano con la configuración de la app
+
+    # Registro muestreado de consultas lentas, instrumentación por petición y eventos de conexión sobre los motores
+    # de la base de datos (el primario, las réplicas de lectura y los shards)
+    from .middlewares.slow_query_logger import SlowQueryLogger
+    request_metrics.init_app(app)
+    with app.app_context():
+        slow_query_logger = SlowQueryLogger(app.config['SLOW_QUERY_THRESHOLD_MS'], app.config['SLOW_QUERY_SAMPLE_RATE'])
+        for engine in db.engines.values():
+            slow_query_logger.register(engine)
+            pool_monitor.register(engine)
+            request_metrics.register(engine)
+        replica_router.register(db.session, db.engines)
+        shard_router.register(db.session, db.engines)
+        cache.register(db.session)
 
     # Autorizador JWT para integrar con la documentación Swagger
     authorizations = {
@@ -37,6 +96,9 @@ def create_app():
         }
     }
 
+    # Importamos el decorador de peticiones condicionales, que depende de los modelos y de la base de datos
+    from .middlewares.conditional_get import ConditionalGet
+
     # Configuramos la API Flask-RESTX, que nos ayuda a crear endpoints RESTful con documentación Swagger integrada
     api = Api(
         app,  # La aplicación Flask en la que registramos la API
@@ -44,20 +106,35 @@ def create_app():
         version='1.0',  # Versión de la API
         description='API para gestión de hábitos, usuarios, asignaciones y logros ',  # Descripción de la API
         authorizations=authorizations,  # Añadimos la configuración de JWT a la API
-        security='Bearer'  # Define que los endpoints por defecto usan el esquema de seguridad JWT
+        security='Bearer',  # Define que los endpoints por defecto usan el esquema de seguridad JWT
+        decorators=[ConditionalGet(ETAG_TABLES, INCLUDE_TABLES, ETAG_ROUTE_TABLES)]  # ETags y respuestas 304 en las lecturas de todos los namespaces
     )
 
+    # Las respuestas JSON se codifican con orjson cuando está instalado
+    from .utils.serializers import output_json
+    api.representation('application/json')(output_json)
+
     # Importamos los controladores y namespaces que organizan las rutas/endpoints de la API
     from .controllers.user_controller import user_ns  # Controlador para la gestión de usuarios
     from .controllers.habit_controller import habit_ns # Controlador para la gestión de hábitos
     from .controllers.assignment_controller import assignment_ns # Controlador para la gestión de asignaciones de hábitos por cada usuario
     from .controllers.completed_date_controller import completed_date_ns # Controlador para la gestión de fechas en que se completan los hábitos
+    from .controllers.purge_job_controller import purge_job_ns # Controlador para el estado de las eliminaciones en segundo plano
+    from .controllers.internal_controller import internal_ns # Controlador para los endpoints internos de operación y métricas
+    from .controllers.metrics_controller import metrics_ns # Controlador para las métricas en formato Prometheus
 
     # Registramos cada namespace (grupo de rutas) en la API
     api.add_namespace(user_ns, path='/users')  # Registrar el namespace de usuarios en /users
     api.add_namespace(habit_ns, path='/habits') # Registrar el namespace de hábitos en /habits
     api.add_namespace(assignment_ns, path='/assignments') # Registrar el namespace de asignaciones de hábitos por cada usuario en /assignment
     api.add_namespace(completed_date_ns, path='/completed_dates') # Registrar el namespace de fechas en que se completan los hábitos en /completed_dates
+    api.add_namespace(purge_job_ns, path='/purge_jobs') # Registrar el namespace de purgas en segundo plano en /purge_jobs
+    api.add_namespace(internal_ns, path='/internal') # Registrar el namespace de endpoints internos en /internal
+    api.add_namespace(metrics_ns, path='/metrics') # Registrar el namespace de métricas en /metrics
+
+    # Registramos los comandos de mantenimiento (por ejemplo `flask stats rebuild`)
+    from .commands import register_commands
+    register_commands(app)
 
     # Retornamos la aplicación ya configurada
     return app
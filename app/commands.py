@@ -0,0 +1,52 @@
+import click
+from flask.cli import AppGroup
+
+# Grupo de comandos `flask stats ...` para mantener las estadísticas materializadas
+stats_cli = AppGroup('stats', help='Mantenimiento de las estadísticas materializadas de las asignaciones.')
+
+
+@stats_cli.command('rebuild')
+@click.option('--chunk-size', type=int, default=None, help='Asignaciones por transacción (por defecto BULK_CHUNK_SIZE).')
+def rebuild_stats(chunk_size):
+    """Recalcula desde cero la tabla assignment_stats a partir de las fechas completadas."""
+    from app.services.stats_service import StatsService
+    processed = StatsService.rebuild_stats(chunk_size)
+    click.echo(f'Rebuilt stats for {processed} assignments.')
+
+
+# Grupo de comandos `flask purge ...` para las eliminaciones en segundo plano
+purge_cli = AppGroup('purge', help='Mantenimiento de las purgas de usuarios y hábitos en segundo plano.')
+
+
+@purge_cli.command('resume')
+def resume_purges():
+    """Ejecuta las purgas pendientes, interrumpidas (por ejemplo al reiniciar un worker) o fallidas."""
+    from app.services.purge_service import PurgeService
+    processed = PurgeService.resume_jobs()
+    click.echo(f'Resumed {processed} purge jobs.')
+
+
+# Grupo de comandos `flask shards ...` para el reparto de los usuarios entre los shards
+shards_cli = AppGroup('shards', help='Mantenimiento del reparto de los usuarios entre los shards.')
+
+
+@shards_cli.command('rebalance')
+@click.option('--batch-size', type=int, default=None, help='Usuarios movidos por transacción (por defecto BULK_CHUNK_SIZE).')
+def rebalance_shards(batch_size):
+    """Copia los hábitos que falten en cada shard, mueve cada usuario al shard que le corresponde y reserva sus nicknames y emails."""
+    from app.services.shard_service import ShardService
+    result = ShardService.rebalance(batch_size)
+    click.echo(f"Copied {result['habits']} habits, moved {result['users']} users between shards "
+               f"and reserved {result['identities']} nicknames and emails.")
+
+
+def register_commands(app):
+    """
+    Registra los comandos de línea de comandos de la aplicación (`flask <comando>`).
+
+    Args:
+        app (Flask): La aplicación configurada.
+    """
+    app.cli.add_command(stats_cli)
+    app.cli.add_command(purge_cli)
+    app.cli.add_command(shards_cli)
@@ -13,24 +13,196 @@ class Config:
     y otras configuraciones esenciales de Flask.
 
     Atributos:
-        SQLALCHEMY_DATABASE_URI (str): URI para la conexión a la base de datos MySQL.
+        SQLALCHEMY_DATABASE_URI (str): URI para la conexión a la base de datos MySQL (o la indicada en DATABASE_URL).
+        ASYNC_DATABASE_URI (str): URI con driver asíncrono para la aplicación ASGI de lecturas (None la deriva de SQLALCHEMY_DATABASE_URI).
+        SQLALCHEMY_REPLICA_URIS (list): URIs de las réplicas de lectura que atienden los GET de la API (vacía: todo va al primario).
+        READ_YOUR_WRITES_SECONDS (int): Segundos durante los que un cliente lee del primario después de una escritura.
+        SQLALCHEMY_SHARD_URIS (list): URIs de los shards adicionales entre los que se reparten los usuarios (vacía: un único shard).
+        SHARD_FAN_OUT_WORKERS (int): Hilos de cada proceso que consultan los shards en paralelo en los listados completos.
         SQLALCHEMY_TRACK_MODIFICATIONS (bool): Deshabilita el seguimiento de modificaciones de objetos en SQLAlchemy para optimizar el rendimiento.
         SQLALCHEMY_ECHO (bool): Activa la impresión de todas las consultas SQL ejecutadas por la aplicación en la consola, útil para depuración.
+        DEBUG (bool): Activa el modo debug de Flask.
+        USE_RELOADER (bool): Reinicia el servidor de desarrollo al detectar cambios en el código.
+        SLOW_QUERY_THRESHOLD_MS (float): Duración en milisegundos a partir de la cual una consulta se registra como lenta.
+        SLOW_QUERY_SAMPLE_RATE (float): Fracción de las consultas que se miden (0 desactiva el registro de consultas lentas).
+        REQUEST_METRICS_SAMPLE_RATE (float): Fracción de las peticiones que se instrumentan con histogramas y Server-Timing (0 las desactiva).
         SECRET_KEY (str): Clave secreta para firmar cookies y otras funcionalidades de seguridad de Flask.
         JWT_SECRET_KEY (str): Clave secreta utilizada para generar y verificar tokens JWT.
+        PAGINATION_DEFAULT_LIMIT (int): Tamaño de página por defecto en los listados paginados por cursor.
+        PAGINATION_MAX_LIMIT (int): Tamaño de página máximo permitido en los listados paginados por cursor.
+        STREAM_BATCH_SIZE (int): Número de filas leídas por lote en las exportaciones en streaming (NDJSON).
+        BULK_MAX_ITEMS (int): Número máximo de elementos aceptados por las operaciones masivas.
+        BULK_CHUNK_SIZE (int): Número de filas por sentencia en las consultas e inserciones masivas.
+        BCRYPT_LOG_ROUNDS (int): Factor de coste de bcrypt para los hashes de contraseñas.
+        PASSWORD_HASH_WORKERS (int): Procesos del pool que calculan los hashes bcrypt en cada worker (0 los calcula en el hilo de la petición).
+        PASSWORD_HASH_QUEUE_LIMIT (int): Hashes pendientes (en cola o en curso) de cada worker a partir de los cuales se responde 503.
+        PASSWORD_HASH_TIMEOUT (float): Segundos máximos de espera por un hash antes de responder 503.
+        CACHE_BACKEND (str): Backend de la caché de lectura de entidades ('memory', 'redis' o 'null'; 'memory' se desactiva con varios workers,
+                             por eso producción usa 'redis').
+        WEB_CONCURRENCY (int): Procesos que sirven la aplicación (gunicorn.conf.py lo fija con su número de workers).
+        CACHE_DEFAULT_TTL (int): Segundos de vida de las entradas de la caché.
+        CACHE_MAX_ENTRIES (int): Número máximo de entradas de la caché en memoria (desalojo LRU).
+        CACHE_REDIS_URL (str): URL del servidor compatible con Redis cuando CACHE_BACKEND es 'redis'.
+        STATS_DEFAULT_WINDOW_DAYS (int): Días (hasta hoy) sobre los que se calcula la tasa de cumplimiento por defecto.
+        STATS_MAX_WINDOW_DAYS (int): Ventana máxima en días aceptada por los endpoints de estadísticas.
+        PURGE_THRESHOLD_ROWS (int): Filas dependientes (asignaciones y fechas) a partir de las cuales la eliminación
+            de un usuario o un hábito se delega a una purga en segundo plano.
+        PURGE_CHUNK_SIZE (int): Filas eliminadas por transacción durante una purga en segundo plano.
+        PURGE_WORKERS (int): Hilos de cada proceso que ejecutan las purgas en segundo plano.
+        SQLALCHEMY_ENGINE_OPTIONS (dict): Opciones del pool de conexiones (tamaño, desbordamiento, espera máxima,
+            reciclado y verificación previa), tomadas de las variables DB_POOL_*.
     """
 
     # URI de conexión a la base de datos MySQL, con las credenciales y el host tomados del archivo .env
-    SQLALCHEMY_DATABASE_URI = f"mysql://{os.environ.get('DB_USER')}:{os.environ.get('DB_PASS')}@{os.environ.get('DB_HOST')}/{os.environ.get('DB_NAME')}"
+    # (DATABASE_URL la sustituye completa, por ejemplo para servir los benchmarks desde una base SQLite)
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or f"mysql://{os.environ.get('DB_USER')}:{os.environ.get('DB_PASS')}@{os.environ.get('DB_HOST')}/{os.environ.get('DB_NAME')}"
+
+    # URI de la ruta de lecturas asíncronas (asgi.py); si no se define se deriva de la anterior con el driver aiomysql o aiosqlite
+    ASYNC_DATABASE_URI = os.environ.get('ASYNC_DATABASE_URL')
+
+    # Réplicas de lectura (URIs separadas por comas) y segundos que un cliente lee del primario tras escribir,
+    # mayores que el retraso habitual de la replicación
+    SQLALCHEMY_REPLICA_URIS = [uri.strip() for uri in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if uri.strip()]
+    READ_YOUR_WRITES_SECONDS = int(os.environ.get('READ_YOUR_WRITES_SECONDS', 5))
+
+    # Shards adicionales (URIs separadas por comas; la base de datos principal es el shard 0) e hilos que los
+    # consultan en paralelo
+    SQLALCHEMY_SHARD_URIS = [uri.strip() for uri in os.environ.get('DATABASE_SHARD_URLS', '').split(',') if uri.strip()]
+    SHARD_FAN_OUT_WORKERS = int(os.environ.get('SHARD_FAN_OUT_WORKERS', 8))
     
     # Desactiva el rastreo de modificaciones para mejorar el rendimiento de la aplicación
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
-    # Activa el logging de las consultas SQL en la consola
-    SQLALCHEMY_ECHO = True
+    # Pool de conexiones: conexiones permanentes, conexiones extra bajo carga, segundos de espera por una conexión,
+    # segundos tras los que se recicla una conexión (por debajo del wait_timeout del servidor) y verificación previa
+    # al préstamo, que descarta las conexiones cerradas por el servidor ("MySQL server has gone away").
+    # gunicorn.conf.py ajusta por defecto el tamaño del pool a los hilos de cada worker
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': float(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 280)),
+        'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes'),
+    }
+
+    # Desactiva por defecto el logging de todas las consultas SQL en la consola (lo activa el perfil de desarrollo)
+    SQLALCHEMY_ECHO = False
+
+    # Modo debug y recarga automática del servidor de desarrollo de Flask (los usa run.py)
+    DEBUG = False
+    USE_RELOADER = False
+
+    # Registro muestreado de consultas lentas: se mide una fracción de las consultas y se registran las que superan el umbral
+    SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 200))
+    SLOW_QUERY_SAMPLE_RATE = float(os.environ.get('SLOW_QUERY_SAMPLE_RATE', 1.0))
+
+    # Instrumentación por petición (consultas, tiempo en la base de datos y serialización) de una muestra de las peticiones
+    REQUEST_METRICS_SAMPLE_RATE = float(os.environ.get('REQUEST_METRICS_SAMPLE_RATE', 1.0))
 
     # Clave secreta para funcionalidades de seguridad como sesiones y cookies
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'super_secret_key'
 
     # Clave secreta para la autenticación JWT, usada para generar tokens
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt_super_secret_key'
+
+    # Tamaño de página por defecto y máximo para los listados paginados por cursor
+    PAGINATION_DEFAULT_LIMIT = int(os.environ.get('PAGINATION_DEFAULT_LIMIT', 50))
+    PAGINATION_MAX_LIMIT = int(os.environ.get('PAGINATION_MAX_LIMIT', 500))
+
+    # Número de filas que se leen por lote del cursor del servidor en las exportaciones NDJSON
+    STREAM_BATCH_SIZE = int(os.environ.get('STREAM_BATCH_SIZE', 1000))
+
+    # Límite de elementos por petición masiva y tamaño de bloque de cada sentencia SQL
+    BULK_MAX_ITEMS = int(os.environ.get('BULK_MAX_ITEMS', 10000))
+    BULK_CHUNK_SIZE = int(os.environ.get('BULK_CHUNK_SIZE', 1000))
+
+    # Coste de bcrypt y pool de procesos que calcula los hashes fuera del hilo de la petición
+    BCRYPT_LOG_ROUNDS = int(os.environ.get('BCRYPT_LOG_ROUNDS', 12))
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', min(4, os.cpu_count() or 1)))
+    PASSWORD_HASH_QUEUE_LIMIT = int(os.environ.get('PASSWORD_HASH_QUEUE_LIMIT', 64))
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))
+
+    # Caché de lectura para las consultas de una sola entidad (usuarios y hábitos)
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'memory')
+    CACHE_DEFAULT_TTL = int(os.environ.get('CACHE_DEFAULT_TTL', 60))
+    CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 10000))
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+
+    # Procesos que sirven la aplicación: la caché en memoria solo es coherente con un único proceso
+    WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', 1))
+
+    # Ventana por defecto y máxima (en días) de la tasa de cumplimiento de las estadísticas
+    STATS_DEFAULT_WINDOW_DAYS = int(os.environ.get('STATS_DEFAULT_WINDOW_DAYS', 30))
+    STATS_MAX_WINDOW_DAYS = int(os.environ.get('STATS_MAX_WINDOW_DAYS', 3660))
+
+    # Eliminación de usuarios y hábitos con muchas filas dependientes: umbral para purgarlos en segundo plano,
+    # filas por transacción de la purga e hilos que la ejecutan en cada proceso
+    PURGE_THRESHOLD_ROWS = int(os.environ.get('PURGE_THRESHOLD_ROWS', 5000))
+    PURGE_CHUNK_SIZE = int(os.environ.get('PURGE_CHUNK_SIZE', 1000))
+    PURGE_WORKERS = int(os.environ.get('PURGE_WORKERS', 1))
+
+
+class DevelopmentConfig(Config):
+    """
+    Perfil de desarrollo: modo debug, recarga automática y todas las consultas SQL en la consola.
+    """
+
+    SQLALCHEMY_ECHO = True
+    DEBUG = True
+    USE_RELOADER = True
+
+
+class ProductionConfig(Config):
+    """
+    Perfil de producción: sin debug, sin recarga automática y sin imprimir cada consulta SQL.
+
+    En lugar de SQLALCHEMY_ECHO se registran solo las consultas lentas de una muestra de las peticiones,
+    y solo se instrumenta una muestra de las peticiones para las métricas de `/metrics`.
+    """
+
+    SQLALCHEMY_ECHO = False
+    DEBUG = False
+    USE_RELOADER = False
+    SLOW_QUERY_SAMPLE_RATE = float(os.environ.get('SLOW_QUERY_SAMPLE_RATE', 0.1))
+    REQUEST_METRICS_SAMPLE_RATE = float(os.environ.get('REQUEST_METRICS_SAMPLE_RATE', 0.1))
+    # gunicorn arranca varios workers: la caché tiene que ser compartida para no quedar desactivada
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'redis')
+
+
+class BenchmarkConfig(ProductionConfig):
+    """
+    Perfil de los benchmarks: igual que producción pero sin medir consultas ni peticiones, para no añadir ruido a las mediciones,
+    y con la caché en memoria del único proceso que los ejecuta (no necesitan un servidor Redis).
+    """
+
+    SLOW_QUERY_SAMPLE_RATE = float(os.environ.get('SLOW_QUERY_SAMPLE_RATE', 0))
+    REQUEST_METRICS_SAMPLE_RATE = float(os.environ.get('REQUEST_METRICS_SAMPLE_RATE', 0))
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'memory')
+
+
+# Perfiles de configuración disponibles, seleccionados con la variable de entorno APP_ENV
+CONFIG_BY_ENV = {
+    'development': DevelopmentConfig,
+    'production': ProductionConfig,
+    'benchmark': BenchmarkConfig,
+}
+
+
+def get_config(env=None):
+    """
+    Obtiene la clase de configuración del entorno indicado.
+
+    Args:
+        env (str): Nombre del entorno ('development', 'production' o 'benchmark'); por defecto la
+                   variable de entorno APP_ENV, o 'development' si no está definida.
+
+    Returns:
+        type: La clase de configuración del entorno.
+
+    Raises:
+        ValueError: Si el entorno no existe.
+    """
+    env = (env or os.environ.get('APP_ENV') or 'development').lower()
+    if env not in CONFIG_BY_ENV:
+        raise ValueError(f'Unsupported APP_ENV: {env}. Use one of: {", ".join(CONFIG_BY_ENV)}.')
+    return CONFIG_BY_ENV[env]
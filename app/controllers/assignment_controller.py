@@ -1,6 +1,12 @@
 from flask import request, jsonify, make_response
 from flask_restx import Namespace, Resource, fields, marshal
 from app.services.assignment_service import AssignmentService
+from app.services.stats_service import StatsService, WEEKDAYS
+from app.utils.exceptions import DuplicateValueError, InvalidDataError, NotFoundError
+from app.utils.pagination import Pagination, PAGINATION_DOC_PARAMS
+from app.utils.streaming import Streaming, STREAM_DOC_PARAMS
+from app.utils.serializers import Serializer, FIELDS_DOC_PARAMS
+from app.controllers.completed_date_controller import get_completed_date_response_model
 
 # Crear un espacio de nombres (namespace) para las asignaciones
 assignment_ns = Namespace('assignments', description='Operaciones relacionadas a la asignación de hábitos por cada usuario')
@@ -11,6 +17,22 @@ entry_assignment_model = assignment_ns.model('Assignment', {
     'fk_habit_id': fields.Integer(required=True, description='ID del hábito asignado')
 })
 
+# Modelos de entrada para la asignación masiva de un hábito a muchos usuarios y de muchos hábitos a un usuario
+entry_assignment_users_bulk_model = assignment_ns.model('AssignmentUsersBulk', {
+    'user_ids': fields.List(fields.Integer, required=True, description='IDs de los usuarios a los que se asigna el hábito')
+})
+entry_assignment_habits_bulk_model = assignment_ns.model('AssignmentHabitsBulk', {
+    'habit_ids': fields.List(fields.Integer, required=True, description='IDs de los hábitos que se asignan al usuario')
+})
+
+# Modelo de respuesta con el resultado de cada elemento de la asignación masiva
+bulk_assignment_result_model = assignment_ns.model('AssignmentBulkItemResult', {
+    'index': fields.Integer(description='Posición del elemento en la petición'),
+    'status': fields.String(description='Resultado del elemento', enum=['created', 'duplicate', 'not_found', 'invalid']),
+    'assignment_id': fields.Integer(description='ID de la asignación creada o de la que ya existía'),
+    'message': fields.String(description='Detalle del resultado cuando la asignación no se creó')
+})
+
 # Modelo de respuesta para obtener información de asignaciones
 get_assignment_response_model = assignment_ns.model('AssignmentResponse', {    
     'assignment_id': fields.Integer(description='ID de la asignación'),
@@ -20,6 +42,51 @@ get_assignment_response_model = assignment_ns.model('AssignmentResponse', {
     'fk_habit_id': fields.Integer(description='ID del hábito asignado')
 })
 
+# Modelo de respuesta de una asignación con sus fechas completadas, para las expansiones `include=assignments.completed_dates`
+assignment_with_dates_response_model = assignment_ns.clone('AssignmentWithDatesResponse', get_assignment_response_model, {
+    'completed_dates': fields.List(fields.Nested(get_completed_date_response_model), description='Fechas completadas de la asignación')
+})
+
+# Conteo de fechas completadas por día de la semana
+weekday_counts_model = assignment_ns.model('WeekdayCounts', {
+    day: fields.Integer(description=f'Fechas completadas en {day}') for day in WEEKDAYS
+})
+
+# Modelo de respuesta de las estadísticas de una asignación
+assignment_stats_model = assignment_ns.model('AssignmentStats', {
+    'assignment_id': fields.Integer(description='ID de la asignación'),
+    'total_count': fields.Integer(description='Número total de fechas completadas'),
+    'current_streak': fields.Integer(description='Días consecutivos completados hasta hoy (o hasta ayer)'),
+    'longest_streak': fields.Integer(description='Racha más larga de días consecutivos'),
+    'last_completed': fields.Date(description='Última fecha completada'),
+    'window_days': fields.Integer(description='Días de la ventana de la tasa de cumplimiento'),
+    'window_count': fields.Integer(description='Fechas completadas dentro de la ventana'),
+    'completion_rate': fields.Float(description='Fracción de días de la ventana completados'),
+    'weekday_counts': fields.Nested(weekday_counts_model, description='Fechas completadas por día de la semana')
+})
+
+# Resumen agregado de las asignaciones de un usuario
+user_stats_totals_model = assignment_ns.model('UserStatsTotals', {
+    'total_count': fields.Integer(description='Número total de fechas completadas'),
+    'best_current_streak': fields.Integer(description='Mayor racha actual entre las asignaciones'),
+    'longest_streak': fields.Integer(description='Racha más larga entre las asignaciones'),
+    'last_completed': fields.Date(description='Última fecha completada'),
+    'window_count': fields.Integer(description='Fechas completadas dentro de la ventana'),
+    'completion_rate': fields.Float(description='Fracción de días de la ventana completados, sobre todas las asignaciones'),
+    'weekday_counts': fields.Nested(weekday_counts_model, description='Fechas completadas por día de la semana')
+})
+
+# Modelo de respuesta de las estadísticas de un usuario
+user_stats_model = assignment_ns.model('UserStats', {
+    'user_id': fields.Integer(description='ID del usuario'),
+    'window_days': fields.Integer(description='Días de la ventana de la tasa de cumplimiento'),
+    'totals': fields.Nested(user_stats_totals_model, description='Resumen de todas las asignaciones'),
+    'assignments': fields.List(fields.Nested(assignment_stats_model), description='Estadísticas de cada asignación')
+})
+
+# Parámetro de consulta común a los endpoints de estadísticas
+STATS_DOC_PARAMS = {'window': {'description': 'Días (hasta hoy) de la tasa de cumplimiento', 'type': 'integer', 'in': 'query'}}
+
 @assignment_ns.route('/')
 class AssignmentResource(Resource):
     @assignment_ns.doc('create_assignment')
@@ -47,18 +114,35 @@ class AssignmentResource(Resource):
             # Si la asignación ya existe se responde un mensaje de error con el código 422
             return make_response(jsonify({'message': str(e)}), 422)  
         
-    @assignment_ns.doc('get_all_assignments')
+    @assignment_ns.doc('get_all_assignments', params={**PAGINATION_DOC_PARAMS, **STREAM_DOC_PARAMS, **FIELDS_DOC_PARAMS})
     def get(self):
         """
-        Obtener todas las asignaciones.
+        Obtener las asignaciones, paginadas por cursor.
         ---
-        Este método permite obtener una lista de todas las asignaciones registradas en la base de datos.
+        Este método permite obtener una página de las asignaciones registradas en la base de datos.
+        Los enlaces a la página siguiente y anterior se envían en el encabezado `Link`.
+
+        Query Parameters:
+        - after: Cursor para obtener la página siguiente.
+        - before: Cursor para obtener la página anterior.
+        - limit: Tamaño de página.
+        - stream: Si es 1, exporta todas las filas en formato NDJSON.
+        - fields: Campos a incluir separados por comas (la clave primaria siempre se incluye).
 
         Responses:
-        - 200: Retorna una lista de todas las asignaciones.
+        - 200: Retorna una lista de las asignaciones de la página.
+        - 422: Si los parámetros de paginación o los campos solicitados no son válidos.
         """
-        assignments = AssignmentService.get_all_assignments()  
-        return marshal(assignments, get_assignment_response_model), 200
+        try:
+            # Campos solicitados con ?fields= (None si se piden todos)
+            field_names = Serializer.get_request_fields(get_assignment_response_model, 'assignment_id')
+            if Streaming.is_requested():
+                # Exportación completa en streaming (NDJSON), una fila por línea
+                return Streaming.ndjson_response(AssignmentService.stream_all_assignments(field_names), get_assignment_response_model, field_names)
+            page = AssignmentService.get_all_assignments(**Pagination.get_request_args(), fields=field_names)
+            return Serializer.for_model(get_assignment_response_model, field_names).serialize_many(page.items), 200, Pagination.link_headers(page)
+        except InvalidDataError as e:
+            return make_response(jsonify({'message': str(e)}), 422)
     
 
 @assignment_ns.route('/<int:assignment_id>')
@@ -87,6 +171,85 @@ class AssignmentDetailResource(Resource):
             return make_response(jsonify({'message': str(e)}), 404)
 
         
+def bulk_response(assign, *args):
+    """
+    Ejecuta una asignación masiva y construye su respuesta con el resumen y el resultado por elemento.
+
+    Args:
+        assign (callable): Método del servicio que crea las asignaciones.
+        *args: Argumentos del método del servicio.
+
+    Returns:
+        Response: Resumen y resultados con el código 200, o el mensaje de error con 404, 409 o 422.
+    """
+    try:
+        results = assign(*args)
+    except InvalidDataError as e:
+        return make_response(jsonify({'message': str(e)}), 422)
+    except NotFoundError as e:
+        return make_response(jsonify({'message': str(e)}), 404)
+    except DuplicateValueError as e:
+        return make_response(jsonify({'message': str(e)}), 409)
+    summary = {status: 0 for status in ('created', 'duplicate', 'not_found', 'invalid')}
+    for result in results:
+        summary[result['status']] += 1
+    return {**summary, 'results': marshal(results, bulk_assignment_result_model, skip_none=True)}, 200
+
+
+@assignment_ns.route('/habit/<int:fk_habit_id>/users')
+@assignment_ns.param('fk_habit_id', 'ID del hábito')
+class AssignmentHabitUsersBulkResource(Resource):
+    @assignment_ns.doc('assign_habit_to_users')
+    @assignment_ns.expect(entry_assignment_users_bulk_model, validate=True)
+    def post(self, fk_habit_id):
+        """
+        Asignar un hábito a muchos usuarios.
+        ---
+        Este método permite asignar de una sola vez un hábito a una cohorte de usuarios.
+        Los usuarios que ya tienen el hábito asignado se omiten y cada elemento informa su resultado.
+
+        Path Parameters:
+        - fk_habit_id: ID del hábito que se asigna.
+
+        Body Parameters:
+        - user_ids: IDs de los usuarios (hasta BULK_MAX_ITEMS).
+
+        Responses:
+        - 200: Resumen (created, duplicate, not_found, invalid) y resultado por elemento.
+        - 404: Si el hábito no existe.
+        - 409: Si otra petición creó alguna de las asignaciones al mismo tiempo.
+        - 422: Si el lote está vacío o es demasiado grande.
+        """
+        return bulk_response(AssignmentService.assign_habit_to_users, fk_habit_id, request.get_json()['user_ids'])
+
+
+@assignment_ns.route('/user/<int:fk_user_id>/habits')
+@assignment_ns.param('fk_user_id', 'ID del usuario')
+class AssignmentUserHabitsBulkResource(Resource):
+    @assignment_ns.doc('assign_habits_to_user')
+    @assignment_ns.expect(entry_assignment_habits_bulk_model, validate=True)
+    def post(self, fk_user_id):
+        """
+        Asignar muchos hábitos a un usuario.
+        ---
+        Este método permite asignar de una sola vez un conjunto de hábitos (por ejemplo, una plantilla) a un usuario.
+        Los hábitos que el usuario ya tiene asignados se omiten y cada elemento informa su resultado.
+
+        Path Parameters:
+        - fk_user_id: ID del usuario que recibe los hábitos.
+
+        Body Parameters:
+        - habit_ids: IDs de los hábitos (hasta BULK_MAX_ITEMS).
+
+        Responses:
+        - 200: Resumen (created, duplicate, not_found, invalid) y resultado por elemento.
+        - 404: Si el usuario no existe.
+        - 409: Si otra petición creó alguna de las asignaciones al mismo tiempo.
+        - 422: Si el lote está vacío o es demasiado grande.
+        """
+        return bulk_response(AssignmentService.assign_habits_to_user, fk_user_id, request.get_json()['habit_ids'])
+
+
 @assignment_ns.route('/user/<int:fk_user_id>')
 @assignment_ns.param('fk_user_id', 'ID del usuario')
 class AssignmentUserResource(Resource):
@@ -107,7 +270,68 @@ class AssignmentUserResource(Resource):
         try:
             # Llama al servicio para obtener las asignaciones asociadas al ID del usuario
             assignments = AssignmentService.get_assignments_by_user_id(fk_user_id)  
-            return marshal(assignments, get_assignment_response_model), 200
+            return Serializer.for_model(get_assignment_response_model).serialize_many(assignments), 200
         except ValueError as e:
             # Si las asignaciones no son encontradas, devolvemos un mensaje de error con el código 404
             return make_response(jsonify({'message': str(e)}), 404)
+
+
+@assignment_ns.route('/<int:assignment_id>/stats')
+@assignment_ns.param('assignment_id', 'ID de la asignación')
+class AssignmentStatsResource(Resource):
+    @assignment_ns.doc('get_assignment_stats', params=STATS_DOC_PARAMS)
+    def get(self, assignment_id):
+        """
+        Obtener las estadísticas de una asignación.
+        ---
+        Este método calcula en la base de datos la racha actual, la racha más larga, la tasa de cumplimiento
+        en la ventana indicada y el número de fechas completadas por día de la semana.
+
+        Path Parameters:
+        - assignment_id: ID de la asignación.
+
+        Query Parameters:
+        - window: Días (hasta hoy) sobre los que se calcula la tasa de cumplimiento.
+
+        Responses:
+        - 200: Retorna las estadísticas de la asignación.
+        - 404: Si la asignación no es encontrada.
+        - 422: Si la ventana no es válida.
+        """
+        try:
+            stats = StatsService.get_assignment_stats(assignment_id, request.args.get('window'))
+            return marshal(stats, assignment_stats_model), 200
+        except InvalidDataError as e:
+            return make_response(jsonify({'message': str(e)}), 422)
+        except NotFoundError as e:
+            return make_response(jsonify({'message': str(e)}), 404)
+
+
+@assignment_ns.route('/user/<int:fk_user_id>/stats')
+@assignment_ns.param('fk_user_id', 'ID del usuario')
+class AssignmentUserStatsResource(Resource):
+    @assignment_ns.doc('get_user_stats', params=STATS_DOC_PARAMS)
+    def get(self, fk_user_id):
+        """
+        Obtener las estadísticas de todas las asignaciones de un usuario.
+        ---
+        Este método retorna las estadísticas de cada asignación del usuario y un resumen agregado.
+
+        Path Parameters:
+        - fk_user_id: ID del usuario.
+
+        Query Parameters:
+        - window: Días (hasta hoy) sobre los que se calcula la tasa de cumplimiento.
+
+        Responses:
+        - 200: Retorna las estadísticas del usuario.
+        - 404: Si el usuario no tiene asignaciones.
+        - 422: Si la ventana no es válida.
+        """
+        try:
+            stats = StatsService.get_user_stats(fk_user_id, request.args.get('window'))
+            return marshal(stats, user_stats_model), 200
+        except InvalidDataError as e:
+            return make_response(jsonify({'message': str(e)}), 422)
+        except NotFoundError as e:
+            return make_response(jsonify({'message': str(e)}), 404)
@@ -1,6 +1,11 @@
 from flask import request, jsonify, make_response
 from flask_restx import Namespace, Resource, fields, marshal
 from app.services.completed_date_service import CompletedDateService
+from app.utils.exceptions import DuplicateValueError, InvalidDataError
+from app.utils.pagination import Pagination, PAGINATION_DOC_PARAMS
+from app.utils.streaming import Streaming, STREAM_DOC_PARAMS
+from app.utils.serializers import Serializer, FIELDS_DOC_PARAMS
+from app.utils.calendar import Calendar
 
 # Definición del namespace para las operaciones relacionadas con las fechas completadas de los hábitos.
 completed_date_ns = Namespace('completed_dates', description='Operaciones relacionadas con las fechas en que se completan los hábitos asignados')
@@ -18,24 +23,80 @@ get_completed_date_response_model = completed_date_ns.model('CompletedDateRespon
     'fk_assignment_id': fields.Integer(description='ID de la asignación del hábito a un usuario')
 })
 
+# Modelo de respuesta del calendario de un año de una asignación, con las fechas como mapa de bits
+assignment_calendar_model = completed_date_ns.model('AssignmentCalendar', {
+    'assignment_id': fields.Integer(description='ID de la asignación'),
+    'year': fields.Integer(description='Año del calendario'),
+    'days': fields.Integer(description='Días del año (365 o 366)'),
+    'count': fields.Integer(description='Fechas completadas en el año'),
+    'bitmap': fields.String(description='Mapa de 366 bits en base64: el bit i (byte i // 8, bit i % 8 desde el menos significativo) es el día i del año')
+})
+
+# Calendario de una asignación dentro del calendario de un usuario
+user_assignment_calendar_model = completed_date_ns.model('UserAssignmentCalendar', {
+    'assignment_id': fields.Integer(description='ID de la asignación'),
+    'fk_habit_id': fields.Integer(description='ID del hábito asignado'),
+    'count': fields.Integer(description='Fechas completadas en el año'),
+    'bitmap': fields.String(description='Mapa de 366 bits en base64, con la misma codificación que el de una asignación')
+})
+
+# Modelo de respuesta del calendario de un año de todas las asignaciones de un usuario
+user_calendar_model = completed_date_ns.model('UserCalendar', {
+    'user_id': fields.Integer(description='ID del usuario'),
+    'year': fields.Integer(description='Año del calendario'),
+    'days': fields.Integer(description='Días del año (365 o 366)'),
+    'assignments': fields.List(fields.Nested(user_assignment_calendar_model), description='Calendario de cada asignación')
+})
+
+# Parámetros de consulta del rango de fechas y de los calendarios
+DATE_RANGE_DOC_PARAMS = {
+    'from': 'Primera fecha del rango (AAAA-MM-DD, incluida)',
+    'to': 'Última fecha del rango (AAAA-MM-DD, incluida)',
+}
+CALENDAR_DOC_PARAMS = {'year': {'description': 'Año del calendario (por defecto el actual)', 'type': 'integer', 'in': 'query'}}
+
+# Modelo de entrada para el registro masivo de fechas de completación.
+entry_completed_dates_bulk_model = completed_date_ns.model('CompletedDatesBulk', {
+    'items': fields.List(fields.Nested(entry_completed_date_model), required=True, description='Fechas a registrar')
+})
+
+# Modelo de respuesta con el resultado de cada elemento del registro masivo.
+bulk_item_result_model = completed_date_ns.model('CompletedDatesBulkItemResult', {
+    'index': fields.Integer(description='Posición del elemento en la petición'),
+    'status': fields.String(description='Resultado del elemento', enum=['created', 'duplicate', 'not_found', 'invalid']),
+    'message': fields.String(description='Detalle del resultado cuando la fecha no se registró')
+})
+
 @completed_date_ns.route('/')
 class CompletedDateResource(Resource):
     """
     Recurso para manejar operaciones de fechas completadas de hábitos.
     """
 
-    @completed_date_ns.doc('get_all_dates')
+    @completed_date_ns.doc('get_all_dates', params={**PAGINATION_DOC_PARAMS, **STREAM_DOC_PARAMS, **FIELDS_DOC_PARAMS})
     def get(self):
         """
-        Obtener todas las fechas completadas registradas.
+        Obtener las fechas completadas registradas, paginadas por cursor.
         ---
-        Este método recupera todas las fechas en que se completaron hábitos asignados en la base de datos.
-        
+        Este método recupera una página de las fechas en que se completaron hábitos asignados en la base de datos.
+        Los enlaces a la página siguiente y anterior se envían en el encabezado `Link`.
+        Con `Accept: application/x-ndjson` o `?stream=1` se exportan todas las fechas en formato NDJSON.
+        Con `?fields=` la respuesta se limita a los campos indicados (la clave primaria siempre se incluye).
+
         Returns:
-            Response: JSON con la lista de fechas completadas y el código de estado 200.
+            Response: JSON con la lista de fechas completadas de la página y el código de estado 200.
+            Response: Mensaje de error con el código de estado 422 si los parámetros de paginación o los campos solicitados no son válidos.
         """
-        dates = CompletedDateService.get_all_dates()
-        return marshal(dates, get_completed_date_response_model), 200
+        try:
+            # Campos solicitados con ?fields= (None si se piden todos)
+            field_names = Serializer.get_request_fields(get_completed_date_response_model, 'completed_date_id')
+            if Streaming.is_requested():
+                # Exportación completa en streaming (NDJSON), una fila por línea
+                return Streaming.ndjson_response(CompletedDateService.stream_all_dates(field_names), get_completed_date_response_model, field_names)
+            page = CompletedDateService.get_all_dates(**Pagination.get_request_args(), fields=field_names)
+            return Serializer.for_model(get_completed_date_response_model, field_names).serialize_many(page.items), 200, Pagination.link_headers(page)
+        except InvalidDataError as e:
+            return make_response(jsonify({'message': str(e)}), 422)
 
     @completed_date_ns.doc('create_completed_date')
     @completed_date_ns.expect(entry_completed_date_model, validate=True)
@@ -53,10 +114,42 @@ class CompletedDateResource(Resource):
         try:
             new_completed_date = CompletedDateService.create_completed_date(data['fk_assignment_id'], data['completed_date'])
             return make_response(jsonify(
-                {'message': 'Date created successfully', 'date': new_completed_date.completed_date}), 201)
+                {'message': 'Date created successfully', 'date': new_completed_date.completed_date.isoformat()}), 201)
         except ValueError as e:
             return make_response(jsonify({'message': str(e)}), 422)
 
+@completed_date_ns.route('/bulk')
+class CompletedDateBulkResource(Resource):
+    """
+    Recurso para el registro masivo de fechas completadas.
+    """
+
+    @completed_date_ns.doc('create_completed_dates_bulk')
+    @completed_date_ns.expect(entry_completed_dates_bulk_model, validate=True)
+    def post(self):
+        """
+        Registrar en lote muchas fechas de completación.
+        ---
+        Este método permite sincronizar de una sola vez las fechas registradas sin conexión por los clientes.
+        Cada elemento se procesa de forma independiente y se informa su resultado.
+
+        Returns:
+            Response: Resumen y resultado por elemento con el código de estado 200.
+            Response: Mensaje de error con el código de estado 422 si el lote no es válido.
+            Response: Mensaje de error con el código de estado 409 si otra petición registró alguna fecha al mismo tiempo.
+        """
+        data = request.get_json()
+        try:
+            results = CompletedDateService.create_completed_dates_bulk(data['items'])
+        except InvalidDataError as e:
+            return make_response(jsonify({'message': str(e)}), 422)
+        except DuplicateValueError as e:
+            return make_response(jsonify({'message': str(e)}), 409)
+        summary = {status: 0 for status in ('created', 'duplicate', 'not_found', 'invalid')}
+        for result in results:
+            summary[result['status']] += 1
+        return {**summary, 'results': marshal(results, bulk_item_result_model, skip_none=True)}, 200
+
 @completed_date_ns.route('/<int:fk_assignment_id>')
 @completed_date_ns.param('fk_assignment_id', 'ID de la asignación')
 class CompletedDateAssignmentResource(Resource):
@@ -64,12 +157,13 @@ class CompletedDateAssignmentResource(Resource):
     Recurso para manejar operaciones de fechas completadas por ID de asignación.
     """
 
-    @completed_date_ns.doc('get_all_dates_by_assignment_id')
+    @completed_date_ns.doc('get_all_dates_by_assignment_id', params=DATE_RANGE_DOC_PARAMS)
     def get(self, fk_assignment_id):
         """
         Obtener todas las fechas de completación por ID de asignación.
         ---
         Este método permite obtener todas las fechas en que se completó un hábito para una asignación específica.
+        Con `from` y `to` se limita a las fechas de ese rango, ordenadas de forma ascendente.
 
         Args:
             fk_assignment_id (int): ID de la asignación a consultar.
@@ -77,16 +171,80 @@ class CompletedDateAssignmentResource(Resource):
         Returns:
             Response: Lista de fechas asociadas a la asignación y el código de estado 200.
             Response: Mensaje de error con el código de estado 404 si no existen fechas.
+            Response: Mensaje de error con el código de estado 422 si el rango de fechas no es válido.
         """
         try:
-            # Llama al servicio para obtener todas las fechas asociadas a la asignación específica.
-            dates = CompletedDateService.get_all_dates_by_assignment_id(fk_assignment_id)
-            # Si se encuentran las fechas, se formatea la respuesta con marshal.
-            return marshal(dates, get_completed_date_response_model), 200
+            # Llama al servicio para obtener las fechas asociadas a la asignación específica, dentro del rango solicitado.
+            dates = CompletedDateService.get_all_dates_by_assignment_id(fk_assignment_id, request.args.get('from'), request.args.get('to'))
+            # Si se encuentran las fechas, se formatea la respuesta con el serializador compilado.
+            return Serializer.for_model(get_completed_date_response_model).serialize_many(dates), 200
+        except InvalidDataError as e:
+            return make_response(jsonify({'message': str(e)}), 422)
         except ValueError as e:
             # En caso de error, se retorna un mensaje con el código de error 422.
             return make_response(jsonify({'message': str(e)}), 404)
         
+@completed_date_ns.route('/<int:fk_assignment_id>/calendar')
+@completed_date_ns.param('fk_assignment_id', 'ID de la asignación')
+class CompletedDateCalendarResource(Resource):
+    """
+    Recurso para el calendario anual de una asignación.
+    """
+
+    @completed_date_ns.doc('get_assignment_calendar', params=CALENDAR_DOC_PARAMS)
+    def get(self, fk_assignment_id):
+        """
+        Obtener el calendario de un año de una asignación como mapa de bits.
+        ---
+        Este método devuelve las fechas completadas del año en 46 bytes (366 bits en base64), con una sola
+        consulta por rango sobre el índice de la asignación, para dibujar un mapa de calor anual.
+
+        Args:
+            fk_assignment_id (int): ID de la asignación a consultar.
+
+        Returns:
+            Response: Calendario de la asignación con el código de estado 200.
+            Response: Mensaje de error con el código de estado 404 si la asignación no existe.
+            Response: Mensaje de error con el código de estado 422 si el año no es válido.
+        """
+        try:
+            calendar = CompletedDateService.get_assignment_calendar(fk_assignment_id, Calendar.get_year(request.args.get('year')))
+            return Serializer.for_model(assignment_calendar_model).serialize(calendar), 200
+        except InvalidDataError as e:
+            return make_response(jsonify({'message': str(e)}), 422)
+        except ValueError as e:
+            return make_response(jsonify({'message': str(e)}), 404)
+
+@completed_date_ns.route('/user/<int:fk_user_id>/calendar')
+@completed_date_ns.param('fk_user_id', 'ID del usuario')
+class CompletedDateUserCalendarResource(Resource):
+    """
+    Recurso para los calendarios anuales de todas las asignaciones de un usuario.
+    """
+
+    @completed_date_ns.doc('get_user_calendar', params=CALENDAR_DOC_PARAMS)
+    def get(self, fk_user_id):
+        """
+        Obtener el calendario de un año de cada asignación de un usuario como mapas de bits.
+        ---
+        Este método devuelve en una sola consulta el mapa de bits del año de cada asignación del usuario.
+
+        Args:
+            fk_user_id (int): ID del usuario a consultar.
+
+        Returns:
+            Response: Calendarios de las asignaciones con el código de estado 200.
+            Response: Mensaje de error con el código de estado 404 si el usuario no tiene asignaciones.
+            Response: Mensaje de error con el código de estado 422 si el año no es válido.
+        """
+        try:
+            calendar = CompletedDateService.get_user_calendar(fk_user_id, Calendar.get_year(request.args.get('year')))
+            return Serializer.for_model(user_calendar_model).serialize(calendar), 200
+        except InvalidDataError as e:
+            return make_response(jsonify({'message': str(e)}), 422)
+        except ValueError as e:
+            return make_response(jsonify({'message': str(e)}), 404)
+        
 @completed_date_ns.route('/<int:completed_date_id>')
 @completed_date_ns.param('completed_date_id', 'ID de la fecha')
 class CompletedDateAssignmentResource(Resource):
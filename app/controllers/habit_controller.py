@@ -1,7 +1,13 @@
 from flask import request, jsonify, make_response
-from flask_restx import Namespace, Resource, fields, marshal
+from flask_restx import Namespace, Resource, fields
 from app.services.habit_service import HabitService
 from app.utils.exceptions import *
+from app.utils.pagination import Pagination, PAGINATION_DOC_PARAMS
+from app.utils.streaming import Streaming, STREAM_DOC_PARAMS
+from app.utils.serializers import Serializer, FIELDS_DOC_PARAMS
+from app.utils.expansions import Expansion, INCLUDE_DOC_PARAMS
+from app.controllers.assignment_controller import get_assignment_response_model, assignment_with_dates_response_model
+from app.controllers.purge_job_controller import purge_job_accepted
 
 # Crear un espacio de nombres (namespace) para los hábitos
 habit_ns = Namespace('habits', description='Operaciones relacionadas con los hábitos')
@@ -20,22 +26,49 @@ get_habit_response_model = habit_ns.model('HabitResponse', {
     'habit_status': fields.Boolean(description='Estado del hábito (activo o inactivo)'),
 })
 
+# Modelos de salida del hábito con sus relaciones expandidas, indexados por las rutas solicitadas con `?include=`
+HABIT_INCLUDE_MODELS = {
+    ('assignments',): habit_ns.clone('HabitWithAssignmentsResponse', get_habit_response_model, {
+        'assignments': fields.List(fields.Nested(get_assignment_response_model), description='Asignaciones del hábito')
+    }),
+    ('assignments', 'assignments.completed_dates'): habit_ns.clone('HabitWithAssignmentDatesResponse', get_habit_response_model, {
+        'assignments': fields.List(fields.Nested(assignment_with_dates_response_model), description='Asignaciones del hábito con sus fechas completadas')
+    }),
+}
+
 # Definir el controlador de hábitos con decoradores para la documentación
 @habit_ns.route('/')
 class HabitResource(Resource):
 
-    @habit_ns.doc('get_all_habits')
+    @habit_ns.doc('get_all_habits', params={**PAGINATION_DOC_PARAMS, **STREAM_DOC_PARAMS, **FIELDS_DOC_PARAMS})
     def get(self):
         """
-        Obtener todos los hábitos con sus datos
+        Obtener los hábitos con sus datos, paginados por cursor
         ---
-        Este método permite obtener una lista de todos los hábitos registrados.
+        Este método permite obtener una página de los hábitos registrados.
+        Los enlaces a la página siguiente y anterior se envían en el encabezado `Link`.
+
+        Query Parameters:
+        - after: Cursor para obtener la página siguiente.
+        - before: Cursor para obtener la página anterior.
+        - limit: Tamaño de página.
+        - stream: Si es 1, exporta todas las filas en formato NDJSON.
+        - fields: Campos a incluir separados por comas (la clave primaria siempre se incluye).
 
         Responses:
-        - 200: Retorna una lista de todos los hábitos con sus datos.
+        - 200: Retorna una lista de los hábitos de la página con sus datos.
+        - 422: Si los parámetros de paginación o los campos solicitados no son válidos.
         """
-        habits = HabitService.get_all_habits()  # Llama al servicio para obtener todos los hábitos
-        return marshal(habits, get_habit_response_model), 200 # Retorna todos los hábitos en el formato estipulado
+        try:
+            # Campos solicitados con ?fields= (None si se piden todos)
+            field_names = Serializer.get_request_fields(get_habit_response_model, 'habit_id')
+            if Streaming.is_requested():
+                # Exportación completa en streaming (NDJSON), una fila por línea
+                return Streaming.ndjson_response(HabitService.stream_all_habits(field_names), get_habit_response_model, field_names)
+            page = HabitService.get_all_habits(**Pagination.get_request_args(), fields=field_names)  # Llama al servicio para obtener la página de hábitos
+            return Serializer.for_model(get_habit_response_model, field_names).serialize_many(page.items), 200, Pagination.link_headers(page) # Retorna los hábitos en el formato estipulado
+        except InvalidDataError as e:
+            return make_response(jsonify({'message': str(e)}), 422)
 
     @habit_ns.doc('create_habit')
     @habit_ns.expect(entry_habit_model, validate=True)  # Decorador para esperar el modelo en la petición
@@ -78,22 +111,33 @@ class HabitResource(Resource):
 @habit_ns.param('habit_id', 'ID del hábito')
 class HabitDetailResource(Resource):
 
-    @habit_ns.doc('get_habit_by_id')
+    @habit_ns.doc('get_habit_by_id', params=INCLUDE_DOC_PARAMS)
     def get(self, habit_id):
         """
         Obtener un hábito por su ID
         ---
         Este método permite obtener todos los datos de un hábito basado en su ID.
 
+        Query Parameters:
+        - include: Relaciones a incluir (`assignments` o `assignments.completed_dates`).
+
         Responses:
-        - 200: Retorna un JSON con todos los datos del hábito.
+        - 200: Retorna un JSON con todos los datos del hábito y las relaciones solicitadas.
         - 404: Si el hábito no es encontrado.
+        - 422: Si alguna de las relaciones solicitadas no existe.
         """
         try:
-            # Llama al servicio para obtener el hábito asociado al ID
-            habit = HabitService.get_habit_by_id(habit_id)
+            includes = Expansion.get_request_includes({path for key in HABIT_INCLUDE_MODELS for path in key})
+            if includes:
+                # Las relaciones expandidas se cargan por adelantado, sin pasar por la caché de lectura
+                habit = HabitService.get_habit_with_includes(habit_id, includes)
+                return Serializer.for_model(HABIT_INCLUDE_MODELS[includes]).serialize(habit), 200
+            # Llama al servicio para obtener el hábito asociado al ID, a través de la caché de lectura
+            habit = HabitService.get_cached_habit(habit_id)
             # Retorna todos los datos del hábito en el formato estipulado
-            return marshal(habit, get_habit_response_model), 200
+            return Serializer.for_model(get_habit_response_model).serialize(habit), 200
+        except InvalidDataError as e:
+            return make_response(jsonify({'message': str(e)}), 422)
         except NotFoundError as e:
             return make_response(jsonify({'message': str(e)}), 404) 
 
@@ -139,13 +183,19 @@ class HabitDetailResource(Resource):
         Path Parameters:
         - habit_id: El ID del hábito a eliminar.
 
+        Si el hábito tiene más de PURGE_THRESHOLD_ROWS asignaciones y fechas completadas, se eliminan en segundo
+        plano y la respuesta incluye el ID de la purga, cuyo estado se consulta en `GET /purge_jobs/<id>`.
+
         Responses:
         - 200: Hábito eliminado con éxito.
+        - 202: Eliminación programada en segundo plano.
         - 404: Si el hábito no se encuentra.
         """
         try:
             # Llama al servicio para eliminar el hábito
-            HabitService.delete_habit(habit_id)  
+            job = HabitService.delete_habit(habit_id)
+            if job is not None:
+                return purge_job_accepted(job, 'Habit')
             return make_response(jsonify({'message': 'Habit deleted successfully'}), 200)
         except NotFoundError as e:
             # Si el hábito no es encontrado, devolvemos un mensaje de error con el código 404
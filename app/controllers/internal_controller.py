@@ -0,0 +1,84 @@
+from flask_restx import Namespace, Resource
+from app import db, password_hasher, cache, pool_monitor, replica_router, shard_router
+
+# Crear un espacio de nombres (namespace) para los endpoints internos de operación y métricas
+internal_ns = Namespace('internal', description='Endpoints internos de operación y métricas del servicio')
+
+@internal_ns.route('/hashing')
+class HashingStatsResource(Resource):
+    @internal_ns.doc('get_hashing_stats')
+    def get(self):
+        """
+        Obtener las métricas del pool de hashes de contraseñas
+        ---
+        Este método permite consultar la configuración del pool de procesos que calcula los hashes bcrypt,
+        los hashes pendientes, los rechazados por saturación y los histogramas de latencia y espera en cola
+        del proceso que atiende la petición.
+
+        Responses:
+        - 200: Retorna las métricas del pool de hashes.
+        """
+        return password_hasher.stats(), 200
+
+@internal_ns.route('/cache')
+class CacheStatsResource(Resource):
+    @internal_ns.doc('get_cache_stats')
+    def get(self):
+        """
+        Obtener las métricas de la caché de lectura
+        ---
+        Este método permite consultar el backend de la caché, el número de entradas y los contadores
+        de aciertos, fallos e invalidaciones por tipo de entidad del proceso que atiende la petición.
+
+        Responses:
+        - 200: Retorna las métricas de la caché.
+        """
+        return cache.stats(), 200
+
+@internal_ns.route('/pool')
+class PoolStatsResource(Resource):
+    @internal_ns.doc('get_pool_stats')
+    def get(self):
+        """
+        Obtener las métricas del pool de conexiones a la base de datos
+        ---
+        Este método permite consultar el estado del pool de conexiones (libres, prestadas y de desbordamiento),
+        su configuración, los contadores de conexiones, préstamos, invalidaciones y esperas agotadas, y el
+        histograma de espera por una conexión del proceso que atiende la petición.
+
+        Responses:
+        - 200: Retorna las métricas del pool de conexiones.
+        """
+        return pool_monitor.stats(db.engine), 200
+
+@internal_ns.route('/replicas')
+class ReplicaStatsResource(Resource):
+    @internal_ns.doc('get_replica_stats')
+    def get(self):
+        """
+        Obtener el estado de las réplicas de lectura
+        ---
+        Este método permite consultar las réplicas configuradas, su retraso respecto al primario (escrituras
+        confirmadas que todavía no han recibido), los segundos de consistencia read-your-writes y las decisiones
+        de enrutado de lecturas (réplica o primario, y el motivo) del proceso que atiende la petición.
+
+        Responses:
+        - 200: Retorna el estado de las réplicas de lectura.
+        """
+        return replica_router.stats(), 200
+
+@internal_ns.route('/shards')
+class ShardStatsResource(Resource):
+    @internal_ns.doc('get_shard_stats')
+    def get(self):
+        """
+        Obtener el estado de los shards por usuario
+        ---
+        Este método permite consultar el número de shards, los usuarios que hay en cada uno, los hilos que ejecutan
+        las consultas repartidas entre todos los shards y el contador de esas operaciones (listados, exportaciones
+        y búsquedas por ID) del proceso que atiende la petición.
+
+        Responses:
+        - 200: Retorna el estado de los shards.
+        """
+        return shard_router.stats(), 200
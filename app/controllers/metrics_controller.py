@@ -0,0 +1,33 @@
+from flask import Response
+from flask_restx import Namespace, Resource
+from app import request_metrics, pool_monitor, cache, password_hasher, replica_router, shard_router
+from app.utils.metrics import PROMETHEUS_CONTENT_TYPE
+
+# Crear un espacio de nombres (namespace) para las métricas en formato Prometheus
+metrics_ns = Namespace('metrics', description='Métricas del servicio en formato Prometheus')
+
+@metrics_ns.route('')
+class MetricsResource(Resource):
+    @metrics_ns.doc('get_metrics')
+    def get(self):
+        """
+        Obtener las métricas en formato Prometheus
+        ---
+        Este método expone, en el formato de texto de Prometheus, los histogramas por namespace y ruta de las
+        peticiones muestreadas (latencia, consultas SQL, tiempo en la base de datos y de serialización), el contador
+        de peticiones y las métricas del pool de conexiones, la caché, el pool de hashes, el enrutado de lecturas a las
+        réplicas y las operaciones repartidas entre los shards del proceso que atiende la petición. El retraso de las
+        réplicas se mide en cada consulta.
+
+        Responses:
+        - 200: Retorna las métricas en formato de texto de Prometheus.
+        """
+        replica_router.measure_lag()
+        metrics = request_metrics.metrics() + replica_router.metrics() + [
+            pool_monitor.checkout_wait, pool_monitor.timeouts, pool_monitor.connections, pool_monitor.checkouts, pool_monitor.invalidations,
+            cache.hits, cache.misses, cache.invalidations,
+            password_hasher.hash_latency, password_hasher.queue_wait, password_hasher.rejected,
+            shard_router.fan_outs,
+        ]
+        lines = [line for metric in metrics for line in metric.expose()]
+        return Response('\n'.join(lines) + '\n', content_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,58 @@
+from flask import jsonify, make_response
+from flask_restx import Namespace, Resource, fields
+from app.services.purge_service import PurgeService
+from app.utils.serializers import Serializer
+
+# Crear un espacio de nombres (namespace) para las purgas en segundo plano
+purge_job_ns = Namespace('purge_jobs', description='Estado de las eliminaciones de usuarios y hábitos en segundo plano')
+
+# Modelo de salida de una purga
+get_purge_job_response_model = purge_job_ns.model('PurgeJobResponse', {
+    'purge_job_id': fields.Integer(description='ID de la purga'),
+    'target_table': fields.String(description='Tabla de la fila eliminada (users o habits)'),
+    'target_id': fields.Integer(description='ID de la fila eliminada'),
+    'status': fields.String(description='Estado de la purga (pending, running, completed o failed)'),
+    'deleted_rows': fields.Integer(description='Filas dependientes eliminadas hasta el momento'),
+    'error': fields.String(description='Mensaje del error si la purga falló'),
+    'created_date': fields.DateTime(description='Fecha y hora en que se programó la purga'),
+    'updated_date': fields.DateTime(description='Fecha y hora del último cambio de la purga'),
+})
+
+
+def purge_job_accepted(job, type_obj):
+    """
+    Construye la respuesta 202 de una eliminación delegada a una purga en segundo plano.
+
+    Args:
+        job (PurgeJob): La purga programada.
+        type_obj (str): Nombre de la entidad eliminada para el mensaje (por ejemplo 'User').
+
+    Returns:
+        Response: Respuesta con el ID de la purga y el encabezado `Location` de su estado.
+    """
+    return make_response(jsonify({'message': f'{type_obj} deletion scheduled', 'purge_job_id': job.purge_job_id}), 202,
+                         {'Location': f'/purge_jobs/{job.purge_job_id}'})
+
+
+@purge_job_ns.route('/<int:purge_job_id>')
+class PurgeJobResource(Resource):
+    @purge_job_ns.doc('get_purge_job')
+    def get(self, purge_job_id):
+        """
+        Obtener el estado de una purga
+        ---
+        Este método permite consultar el progreso de la eliminación en segundo plano de un usuario o un hábito
+        con muchas filas dependientes, programada por `DELETE /users/<id>` o `DELETE /habits/<id>`.
+
+        Path Parameters:
+        - purge_job_id: El ID de la purga devuelto en la respuesta 202.
+
+        Responses:
+        - 200: Retorna el estado de la purga.
+        - 404: Si la purga no existe.
+        """
+        try:
+            job = PurgeService.get_job(purge_job_id)
+            return Serializer.for_model(get_purge_job_response_model).serialize(job), 200
+        except ValueError as e:
+            return make_response(jsonify({'message': str(e)}), 404)
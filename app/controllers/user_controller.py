@@ -1,6 +1,13 @@
 from flask import request, jsonify, make_response
-from flask_restx import Namespace, Resource, fields, marshal
+from flask_restx import Namespace, Resource, fields
 from app.services.user_service import UserService
+from app.utils.exceptions import InvalidDataError, ServiceUnavailableError
+from app.utils.pagination import Pagination, PAGINATION_DOC_PARAMS
+from app.utils.streaming import Streaming, STREAM_DOC_PARAMS
+from app.utils.serializers import Serializer, FIELDS_DOC_PARAMS
+from app.utils.expansions import Expansion, INCLUDE_DOC_PARAMS
+from app.controllers.assignment_controller import get_assignment_response_model, assignment_with_dates_response_model
+from app.controllers.purge_job_controller import purge_job_accepted
 
 # Crear un espacio de nombres (namespace) para los usuarios
 user_ns = Namespace('users', description='Operaciones relacionadas con los usuarios')
@@ -25,23 +32,50 @@ get_user_response_model = user_ns.model('GetResponse', {
     'user_created_date': fields.DateTime(description='Fecha y hora de creación del usuario')
 })
 
+# Modelos de salida del usuario con sus relaciones expandidas, indexados por las rutas solicitadas con `?include=`
+USER_INCLUDE_MODELS = {
+    ('assignments',): user_ns.clone('UserWithAssignmentsResponse', get_user_response_model, {
+        'assignments': fields.List(fields.Nested(get_assignment_response_model), description='Asignaciones del usuario')
+    }),
+    ('assignments', 'assignments.completed_dates'): user_ns.clone('UserWithAssignmentDatesResponse', get_user_response_model, {
+        'assignments': fields.List(fields.Nested(assignment_with_dates_response_model), description='Asignaciones del usuario con sus fechas completadas')
+    }),
+}
+
 # Definir el controlador de usuarios con decoradores para la documentación
 @user_ns.route('/')
 class UserResource(Resource):
-    @user_ns.doc('get_all_users')
+    @user_ns.doc('get_all_users', params={**PAGINATION_DOC_PARAMS, **STREAM_DOC_PARAMS, **FIELDS_DOC_PARAMS})
     def get(self):
         """
-        Obtener todos los usuarios con sus datos
+        Obtener los usuarios con sus datos, paginados por cursor
         ---
-        Este método permite obtener una lista de todos los usuarios registrados en la base de datos.
+        Este método permite obtener una página de los usuarios registrados en la base de datos.
+        Los enlaces a la página siguiente y anterior se envían en el encabezado `Link`.
+
+        Query Parameters:
+        - after: Cursor para obtener la página siguiente.
+        - before: Cursor para obtener la página anterior.
+        - limit: Tamaño de página.
+        - stream: Si es 1, exporta todas las filas en formato NDJSON.
+        - fields: Campos a incluir separados por comas (la clave primaria siempre se incluye).
 
         Responses:
-        - 200: Retorna todos los datos de todos los usuarios.
+        - 200: Retorna los datos de los usuarios de la página solicitada.
+        - 422: Si los parámetros de paginación o los campos solicitados no son válidos.
         """
-        # Llama al servicio para obtener todos los usuarios
-        users = UserService.get_all_users()  
-        # Usamos marshal para garantizar que la lista de usuarios se retorne conforme al modelo get_user_response_model.
-        return marshal(users, get_user_response_model), 200 # Retorna todos los datos de los usuarios    
+        try:
+            # Campos solicitados con ?fields= (None si se piden todos)
+            field_names = Serializer.get_request_fields(get_user_response_model, 'user_id')
+            if Streaming.is_requested():
+                # Exportación completa en streaming (NDJSON), una fila por línea
+                return Streaming.ndjson_response(UserService.stream_all_users(field_names), get_user_response_model, field_names)
+            # Llama al servicio para obtener la página de usuarios solicitada
+            page = UserService.get_all_users(**Pagination.get_request_args(), fields=field_names)
+            # El serializador compilado formatea la página conforme al modelo get_user_response_model
+            return Serializer.for_model(get_user_response_model, field_names).serialize_many(page.items), 200, Pagination.link_headers(page)
+        except InvalidDataError as e:
+            return make_response(jsonify({'message': str(e)}), 422)
     
     @user_ns.doc('create_user')
     @user_ns.expect(entry_user_model, validate=True)  # Decorador para esperar el modelo en la petición
@@ -66,6 +100,7 @@ class UserResource(Resource):
         Responses:
         - 201: Usuario creado con éxito.
         - 422: Si el nickname o el email ya existen.
+        - 503: Si el servidor está saturado calculando hashes de contraseñas.
         """
         # Obtiene los datos en formato JSON del cuerpo de la solicitud
         data = request.get_json()
@@ -83,26 +118,40 @@ class UserResource(Resource):
         except ValueError as e:
             # Si el nickname o el email ya existen se responde un mensaje de error con el codigo 422
             return make_response(jsonify({'message': str(e)}), 422)   
+        except ServiceUnavailableError as e:
+            # Si el pool de hashes está saturado se pide al cliente que reintente más tarde
+            return make_response(jsonify({'message': str(e)}), 503, {'Retry-After': '1'})
 
 @user_ns.route('/<int:user_id>')
 @user_ns.param('user_id', 'ID del usuario')
 class UserDetailResource(Resource):
-    @user_ns.doc('get_user_by_user_id')
+    @user_ns.doc('get_user_by_user_id', params=INCLUDE_DOC_PARAMS)
     def get(self, user_id):
         """
         Obtener datos de usuario
         ---
         Este método permite obtener todos los datos de un usuario basado en su ID.
 
+        Query Parameters:
+        - include: Relaciones a incluir (`assignments` o `assignments.completed_dates`).
+
         Responses:
-        - 200: Retorna un JSON con todos los datos del usuario.
+        - 200: Retorna un JSON con todos los datos del usuario y las relaciones solicitadas.
         - 404: Si el usuario no es encontrado.
+        - 422: Si alguna de las relaciones solicitadas no existe.
         """
         try:
-            # Llama al servicio para obtener el usuario asociado al ID
-            user = UserService.get_user_by_user_id(user_id)            
-            # Si el usuario se encuentra, aplicamos manualmente marshal para formatear la respuesta
-            return marshal(user, get_user_response_model), 200
+            includes = Expansion.get_request_includes({path for key in USER_INCLUDE_MODELS for path in key})
+            if includes:
+                # Las relaciones expandidas se cargan por adelantado, sin pasar por la caché de lectura
+                user = UserService.get_user_with_includes(user_id, includes)
+                return Serializer.for_model(USER_INCLUDE_MODELS[includes]).serialize(user), 200
+            # Llama al servicio para obtener el usuario asociado al ID, a través de la caché de lectura
+            user = UserService.get_cached_user(user_id)
+            # Si el usuario se encuentra, el serializador compilado formatea la respuesta
+            return Serializer.for_model(get_user_response_model).serialize(user), 200
+        except InvalidDataError as e:
+            return make_response(jsonify({'message': str(e)}), 422)
         except ValueError as e:
             # Si el usuario no es encontrado, devolvemos un mensaje de error con el código 404
             return make_response(jsonify({'message': str(e)}), 404)
@@ -117,13 +166,19 @@ class UserDetailResource(Resource):
         Path Parameters:
         - user_id: El ID del usuario a eliminar.
 
+        Si el usuario tiene más de PURGE_THRESHOLD_ROWS asignaciones y fechas completadas, se eliminan en segundo
+        plano y la respuesta incluye el ID de la purga, cuyo estado se consulta en `GET /purge_jobs/<id>`.
+
         Responses:
         - 200: Usuario eliminado con éxito.
+        - 202: Eliminación programada en segundo plano.
         - 404: Si el usuario no se encuentra.
         """
         try:
             # Llama al servicio para eliminar al usuario
-            UserService.delete_user(user_id)  
+            job = UserService.delete_user(user_id)
+            if job is not None:
+                return purge_job_accepted(job, 'User')
             # Usamos jsonify para enviar un mensaje de éxito en formato JSON.
             return make_response(jsonify({'message': 'User deleted successfully'}), 200)
         except ValueError as e:
@@ -151,6 +206,7 @@ class UserDetailResource(Resource):
         Responses:
         - 200: Usuario actualizado con éxito.
         - 404: Si el usuario no se encuentra.
+        - 503: Si el servidor está saturado calculando hashes de contraseñas.
         """
         # Obtiene los nuevos datos para la actualización
         new_data = request.get_json()  
@@ -162,4 +218,7 @@ class UserDetailResource(Resource):
         except ValueError as e:
             # Si el usuario no es encontrado, devolvemos un mensaje de error con el código 404
             return make_response(jsonify({'message': str(e)}), 404)     
+        except ServiceUnavailableError as e:
+            # Si el pool de hashes está saturado se pide al cliente que reintente más tarde
+            return make_response(jsonify({'message': str(e)}), 503, {'Retry-After': '1'})
 
@@ -0,0 +1,61 @@
+import hashlib
+from datetime import date
+from functools import wraps
+from flask import make_response, request
+from app.services.table_version_service import TableVersionService
+
+
+class ConditionalGet():
+    """
+    Decorador de recursos de flask-restx que añade ETags fuertes y respuestas 304 a las lecturas.
+
+    El ETag se calcula a partir de la ruta con su query string, el encabezado Accept, la fecha del día
+    (las estadísticas de rachas cambian al cambiar de día aunque no haya escrituras) y la versión de las
+    tablas de las que depende el namespace (o la ruta, si depende de más tablas). Como la versión solo cambia cuando un servicio escribe en la
+    tabla, la comparación con `If-None-Match` se resuelve con una consulta por clave primaria, antes de
+    ejecutar la consulta completa y `marshal`.
+
+    Atributos:
+        tables_by_namespace (dict): Tablas de las que dependen las lecturas de cada namespace,
+                                    indexadas por el primer segmento de la ruta (por ejemplo 'users').
+        tables_by_include (dict): Tablas de las que dependen las relaciones expandidas con `?include=`,
+                                  indexadas por el nombre de la relación (por ejemplo 'completed_dates').
+        tables_by_route (dict): Tablas de las rutas que dependen de más tablas que su namespace, indexadas por la
+                                regla de la ruta (por ejemplo '/assignments/<int:assignment_id>/stats').
+    """
+
+    def __init__(self, tables_by_namespace, tables_by_include=None, tables_by_route=None):
+        self.tables_by_namespace = tables_by_namespace
+        self.tables_by_include = tables_by_include or {}
+        self.tables_by_route = tables_by_route or {}
+
+    def __call__(self, view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(*args, **kwargs)
+            rule = request.url_rule.rule if request.url_rule else None
+            tables = self.tables_by_route.get(rule) or self.tables_by_namespace.get(request.path.strip('/').split('/', 1)[0])
+            if not tables:
+                return view(*args, **kwargs)
+            include = request.args.get('include')
+            if include:
+                # Las relaciones expandidas añaden sus tablas a la versión del recurso
+                names = include.replace(',', '.').split('.')
+                tables = tuple(tables) + tuple(table for name in names for table in self.tables_by_include.get(name.strip(), ()))
+
+            versions = TableVersionService.get_versions(tables)
+            fingerprint = '|'.join([request.full_path, request.headers.get('Accept', ''), date.today().isoformat()] +
+                                   [f'{table}={versions[table]}' for table in sorted(versions)])
+            etag = hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()
+
+            if etag in request.if_none_match:
+                response = make_response('', 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.vary.add('Accept')
+            return response
+        return wrapper
@@ -0,0 +1,113 @@
+import random
+import time
+from flask import g, request
+from sqlalchemy import event
+from app.utils.metrics import Counter, Histogram, RequestTimer
+
+# Límites de los buckets del número de consultas por petición
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+
+# Etiquetas de las métricas de cada petición
+REQUEST_LABELS = ('namespace', 'route', 'method')
+
+
+class RequestMetrics():
+    """
+    Instrumentación por petición: número de consultas, tiempo en la base de datos, tiempo de serialización y latencia total.
+
+    Solo se mide una fracción (`sample_rate`) de las peticiones; la decisión se toma al empezar la petición
+    y los eventos de SQLAlchemy de las no muestreadas terminan tras una única consulta a la ContextVar de
+    `RequestTimer`. Las peticiones muestreadas alimentan los histogramas (etiquetados por namespace y ruta)
+    y devuelven los tiempos en el encabezado `Server-Timing`; el contador de peticiones incluye todas.
+
+    Atributos:
+        sample_rate (float): Fracción de las peticiones que se miden, entre 0 y 1.
+    """
+
+    def __init__(self):
+        self.sample_rate = 0.0
+        self.requests = Counter('http_requests_total', 'Peticiones atendidas', labelnames=REQUEST_LABELS + ('status',))
+        self.latency = Histogram('http_request_duration_seconds', 'Latencia total de las peticiones muestreadas', labelnames=REQUEST_LABELS)
+        self.db_time = Histogram('http_request_db_seconds', 'Tiempo en consultas SQL por petición muestreada', labelnames=REQUEST_LABELS)
+        self.db_queries = Histogram('http_request_db_queries', 'Consultas SQL por petición muestreada', buckets=QUERY_COUNT_BUCKETS, labelnames=REQUEST_LABELS)
+        self.serialize_time = Histogram('http_request_serialize_seconds', 'Tiempo de serialización por petición muestreada', labelnames=REQUEST_LABELS)
+
+    def init_app(self, app):
+        """
+        Registra los hooks de la petición.
+
+        Args:
+            app (Flask): La aplicación configurada.
+        """
+        self.sample_rate = app.config['REQUEST_METRICS_SAMPLE_RATE']
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+        app.teardown_request(self.teardown_request)
+
+    def register(self, engine):
+        """
+        Registra los eventos de ejecución de un motor de la base de datos (el primario o una réplica).
+
+        Args:
+            engine (Engine): Motor de SQLAlchemy de la aplicación.
+        """
+        if self.sample_rate > 0:
+            event.listen(engine, 'before_cursor_execute', self.before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', self.after_cursor_execute)
+            event.listen(engine, 'handle_error', self.handle_error)
+
+    def metrics(self):
+        """
+        Returns:
+            list: Métricas de las peticiones, para exponerlas en `/metrics`.
+        """
+        return [self.requests, self.latency, self.db_time, self.db_queries, self.serialize_time]
+
+    def before_request(self):
+        g.request_started = time.perf_counter()
+        if self.sample_rate > 0 and (self.sample_rate >= 1 or random.random() < self.sample_rate):
+            RequestTimer.start()
+
+    def after_request(self, response):
+        started = g.pop('request_started', None)
+        timings = RequestTimer.stop()
+        rule = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        labels = {'namespace': rule.strip('/').split('/', 1)[0], 'route': rule, 'method': request.method}
+        self.requests.inc(status=response.status_code, **labels)
+        if timings is None or started is None:
+            return response
+        # Las exportaciones en streaming se envían después de este punto: su latencia es la de la primera respuesta
+        total = time.perf_counter() - started
+        self.latency.observe(total, **labels)
+        self.db_time.observe(timings['db'], **labels)
+        self.db_queries.observe(timings['db_queries'], **labels)
+        self.serialize_time.observe(timings['serialize'], **labels)
+        response.headers.add('Server-Timing', f'db;dur={timings["db"] * 1000:.2f};desc="{timings["db_queries"]} queries"')
+        response.headers.add('Server-Timing', f'serialize;dur={timings["serialize"] * 1000:.2f}')
+        response.headers.add('Server-Timing', f'total;dur={total * 1000:.2f}')
+        return response
+
+    def teardown_request(self, exception):
+        # Las peticiones que terminan con una excepción no pasan por after_request
+        RequestTimer.stop()
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if RequestTimer.current() is not None:
+            # Una pila por conexión, porque una sentencia puede ejecutar otras antes de terminar
+            conn.info.setdefault('request_metrics_started', []).append(time.perf_counter())
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        stack = conn.info.get('request_metrics_started')
+        if not stack:
+            return
+        started = stack.pop()
+        timings = RequestTimer.current()
+        if timings is not None:
+            timings['db'] += time.perf_counter() - started
+            timings['db_queries'] += 1
+
+    def handle_error(self, exception_context):
+        # Las sentencias que fallan no pasan por after_cursor_execute; se descarta su marca de inicio
+        connection = exception_context.connection
+        if connection is not None and connection.info.get('request_metrics_started'):
+            connection.info['request_metrics_started'].pop()
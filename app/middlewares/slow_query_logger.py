@@ -0,0 +1,67 @@
+import logging
+import random
+import time
+from flask import has_request_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Longitud máxima de la sentencia SQL incluida en cada registro
+MAX_STATEMENT_LENGTH = 1000
+
+
+class SlowQueryLogger():
+    """
+    Registro muestreado de consultas lentas, como alternativa a SQLALCHEMY_ECHO en producción.
+
+    Solo se mide una fracción (`sample_rate`) de las consultas; la decisión se toma antes de ejecutarlas,
+    así las consultas no muestreadas no pagan ni el cronómetro. Las muestreadas que superan `threshold_ms`
+    se registran con su duración, la ruta de la petición y la sentencia SQL (sin parámetros).
+
+    Atributos:
+        threshold_ms (float): Duración en milisegundos a partir de la cual una consulta es lenta.
+        sample_rate (float): Fracción de las consultas que se miden, entre 0 y 1.
+    """
+
+    def __init__(self, threshold_ms, sample_rate):
+        self.threshold_ms = threshold_ms
+        self.sample_rate = sample_rate
+
+    def register(self, engine):
+        """
+        Registra los eventos de ejecución en el motor de la base de datos.
+
+        Args:
+            engine (Engine): Motor de SQLAlchemy de la aplicación.
+
+        Returns:
+            bool: True si el registro quedó activo, False si el muestreo está desactivado.
+        """
+        if self.sample_rate <= 0:
+            return False
+        event.listen(engine, 'before_cursor_execute', self.before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self.after_cursor_execute)
+        event.listen(engine, 'handle_error', self.handle_error)
+        return True
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # Una pila por conexión, porque una sentencia puede ejecutar otras antes de terminar
+        started = time.perf_counter() if self.sample_rate >= 1 or random.random() < self.sample_rate else None
+        conn.info.setdefault('slow_query_started', []).append(started)
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        stack = conn.info.get('slow_query_started')
+        started = stack.pop() if stack else None
+        if started is None:
+            return
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if elapsed_ms >= self.threshold_ms:
+            logger.warning('Slow query (%.1f ms) on %s: %s', elapsed_ms,
+                           f'{request.method} {request.path}' if has_request_context() else 'no request',
+                           ' '.join(statement.split())[:MAX_STATEMENT_LENGTH])
+
+    def handle_error(self, exception_context):
+        # Las sentencias que fallan no pasan por after_cursor_execute; se descarta su marca de inicio
+        connection = exception_context.connection
+        if connection is not None and connection.info.get('slow_query_started'):
+            connection.info['slow_query_started'].pop()
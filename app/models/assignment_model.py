@@ -1,5 +1,4 @@
 from app import db
-from datetime import datetime
 
 class Assignment(db.Model):
     """
@@ -9,19 +8,26 @@ class Assignment(db.Model):
         assignment_id (int): Identificador único de la asignación (clave primaria).
         created_date (datetime): Fecha y hora en que se creó la asignación.
         assignment_status (bool): Estado de la asignación (True si está activa, False si está inactiva).
-        fk_user_id (int): ID del usuario asociado a la asignación (clave foránea).
-        fk_habit_id (int): ID del hábito asociado a la asignación (clave foránea).
+        fk_user_id (int): ID del usuario asociado a la asignación (clave foránea, ON DELETE CASCADE).
+        fk_habit_id (int): ID del hábito asociado a la asignación (clave foránea, ON DELETE CASCADE).
         completed_dates (list): Lista de fechas en que el usuario ha completado el hábito.
+        stats (AssignmentStats): Resumen materializado de las fechas completadas (rachas y totales).
     """
 
     __tablename__ = 'assignments'
+    __table_args__ = (
+        # Un usuario no puede tener asignado dos veces el mismo hábito; el índice también sirve a las búsquedas por fk_user_id
+        db.UniqueConstraint('fk_user_id', 'fk_habit_id', name='uq_assignments_user_habit'),
+        db.Index('ix_assignments_fk_habit_id', 'fk_habit_id'),
+    )
 
     assignment_id = db.Column(db.Integer, primary_key=True)
-    created_date = db.Column(db.DateTime, default=datetime.now(), nullable=False)
+    created_date = db.Column(db.DateTime, server_default=db.func.now(), nullable=False)
     assignment_status = db.Column(db.Boolean, default=True, nullable=False)
-    fk_user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False)
-    fk_habit_id = db.Column(db.Integer, db.ForeignKey('habits.habit_id'), nullable=False)
-    completed_dates = db.relationship('CompletedDate', backref='assignment', lazy=True)
+    fk_user_id = db.Column(db.Integer, db.ForeignKey('users.user_id', ondelete='CASCADE'), nullable=False)
+    fk_habit_id = db.Column(db.Integer, db.ForeignKey('habits.habit_id', ondelete='CASCADE'), nullable=False)
+    completed_dates = db.relationship('CompletedDate', backref='assignment', lazy=True, passive_deletes=True)
+    stats = db.relationship('AssignmentStats', uselist=False, cascade='all, delete-orphan', lazy=True, passive_deletes=True)
 
     def __init__(self, fk_user_id, fk_habit_id):
         """
@@ -0,0 +1,48 @@
+from app import db
+
+class AssignmentStats(db.Model):
+    """
+    Modelo que representa el resumen materializado de las fechas completadas de una asignación.
+
+    Los servicios lo actualizan de forma incremental en la misma transacción en que registran o eliminan
+    fechas, así las lecturas de estadísticas leen una fila por asignación en lugar de todo el historial.
+
+    Atributos:
+        assignment_id (int): ID de la asignación resumida (clave primaria y foránea).
+        last_completed (date): Última fecha completada, None si no hay fechas.
+        current_streak (int): Longitud de la racha que termina en `last_completed`; solo está vigente
+                              si `last_completed` es hoy o ayer.
+        longest_streak (int): Racha más larga de días consecutivos.
+        total_count (int): Número total de fechas completadas.
+        monday_count ... sunday_count (int): Número de fechas completadas en cada día de la semana.
+    """
+
+    __tablename__ = 'assignment_stats'
+
+    assignment_id = db.Column(db.Integer, db.ForeignKey('assignments.assignment_id', ondelete='CASCADE'), primary_key=True)
+    last_completed = db.Column(db.Date, nullable=True)
+    current_streak = db.Column(db.Integer, default=0, nullable=False)
+    longest_streak = db.Column(db.Integer, default=0, nullable=False)
+    total_count = db.Column(db.Integer, default=0, nullable=False)
+    monday_count = db.Column(db.Integer, default=0, nullable=False)
+    tuesday_count = db.Column(db.Integer, default=0, nullable=False)
+    wednesday_count = db.Column(db.Integer, default=0, nullable=False)
+    thursday_count = db.Column(db.Integer, default=0, nullable=False)
+    friday_count = db.Column(db.Integer, default=0, nullable=False)
+    saturday_count = db.Column(db.Integer, default=0, nullable=False)
+    sunday_count = db.Column(db.Integer, default=0, nullable=False)
+
+    def __init__(self, assignment_id=None):
+        """
+        Constructor de la clase AssignmentStats, con todos los contadores a cero.
+
+        Args:
+            assignment_id (int): ID de la asignación resumida (None si se asocia a través de `Assignment.stats`).
+        """
+        self.assignment_id = assignment_id
+        self.last_completed = None
+        self.current_streak = 0
+        self.longest_streak = 0
+        self.total_count = 0
+        for column in ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday'):
+            setattr(self, f'{column}_count', 0)
@@ -1,5 +1,4 @@
 from app import db
-from datetime import datetime
 
 class CompletedDate(db.Model):
     """
@@ -8,14 +7,18 @@ class CompletedDate(db.Model):
     Atributos:
         completed_date_id (int): Identificador único de la fecha de finalización (clave primaria).
         completed_date (date): Fecha en la que se completó la asignación.
-        fk_assignment_id (int): ID de la asignación asociada (clave foránea).
+        fk_assignment_id (int): ID de la asignación asociada (clave foránea, ON DELETE CASCADE).
     """
 
     __tablename__ = 'completed_dates'
+    __table_args__ = (
+        # Una asignación no puede completarse dos veces el mismo día; el índice también sirve a las búsquedas por fk_assignment_id
+        db.UniqueConstraint('fk_assignment_id', 'completed_date', name='uq_completed_dates_assignment_date'),
+    )
     
     completed_date_id = db.Column(db.Integer, primary_key=True)
-    completed_date = db.Column(db.Date, default=datetime.now().date(), nullable=False)
-    fk_assignment_id = db.Column(db.Integer, db.ForeignKey('assignments.assignment_id'), nullable=False)
+    completed_date = db.Column(db.Date, server_default=db.text('(CURRENT_DATE)'), nullable=False)
+    fk_assignment_id = db.Column(db.Integer, db.ForeignKey('assignments.assignment_id', ondelete='CASCADE'), nullable=False)
     
     def __init__(self, fk_assignment_id, completed_date):
         """
@@ -23,7 +26,8 @@ class CompletedDate(db.Model):
 
         Args:
             fk_assignment_id (int): ID de la asignación asociada a la fecha de finalización.
-            completed_date (date): Fecha en la que se completó la asignación.
+            completed_date (date): Fecha en la que se completó la asignación; None para que la base de datos use la fecha actual.
         """
         self.fk_assignment_id = fk_assignment_id
-        self.completed_date = completed_date
+        if completed_date is not None:
+            self.completed_date = completed_date
@@ -13,13 +13,16 @@ class Habit(db.Model):
     """
 
     __tablename__ = 'habits'  # Nombre de la tabla en la base de datos
+    __table_args__ = (
+        db.UniqueConstraint('habit_name', 'time_of_day', name='uq_habits_name_time_of_day'),  # Nombre y momento del día únicos
+    )
 
     # Definición de columnas de la tabla
     habit_id = db.Column(db.Integer, primary_key=True) # Clave primaria
     habit_name = db.Column(db.String(100), nullable=False) # Nombre del hábito
     time_of_day = db.Column(db.Enum('mañana', 'tarde', 'noche'), nullable=True) # Jornada en que se realizará el hábito
     habit_status = db.Column(db.Boolean, default=True, nullable=False) # Status del hábito (activo/inactivo)
-    assignments = db.relationship('Assignment', backref='habit', lazy=True)  # Relación con la tabla 'assignments'
+    assignments = db.relationship('Assignment', backref='habit', lazy=True, passive_deletes=True)  # Relación con la tabla 'assignments', que se elimina en cascada en la base de datos
 
     def __init__(self, habit_name, time_of_day):
         """
@@ -0,0 +1,58 @@
+from app import db
+
+class PurgeJob(db.Model):
+    """
+    Modelo que representa la eliminación en segundo plano de un usuario o un hábito con muchas filas dependientes.
+
+    La purga borra las fechas completadas y las asignaciones por bloques, cada uno en su propia transacción,
+    y al final elimina la fila principal. El estado se guarda en la base de datos para que cualquier proceso
+    pueda consultarlo y para reanudar las purgas interrumpidas con `flask purge resume`.
+
+    Atributos:
+        purge_job_id (int): Identificador único de la purga (clave primaria).
+        target_table (str): Tabla de la fila eliminada ('users' o 'habits').
+        target_id (int): ID de la fila eliminada.
+        status (str): Estado de la purga ('pending', 'running', 'completed' o 'failed').
+        active_target (str): 'tabla:id' de la fila mientras la purga está pendiente o en curso, None al terminar;
+                             es único, así que cada fila tiene como mucho una purga activa.
+        deleted_rows (int): Filas dependientes eliminadas hasta el momento.
+        error (str): Mensaje del error si la purga falló.
+        created_date (datetime): Fecha y hora en que se programó la purga.
+        updated_date (datetime): Fecha y hora del último cambio de estado o progreso.
+    """
+
+    __tablename__ = 'purge_jobs'
+    __table_args__ = (
+        # Dos peticiones simultáneas de eliminación de la misma fila no pueden programar dos purgas
+        db.UniqueConstraint('active_target', name='uq_purge_jobs_active_target'),
+    )
+
+    purge_job_id = db.Column(db.Integer, primary_key=True)
+    target_table = db.Column(db.String(64), nullable=False)
+    target_id = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.Enum('pending', 'running', 'completed', 'failed'), server_default='pending', nullable=False)
+    active_target = db.Column(db.String(80), nullable=True)
+    deleted_rows = db.Column(db.Integer, server_default='0', nullable=False)
+    error = db.Column(db.String(500), nullable=True)
+    created_date = db.Column(db.DateTime, server_default=db.func.now(), nullable=False)
+    updated_date = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now(), nullable=False)
+
+    def __init__(self, target_table, target_id):
+        """
+        Constructor de la clase PurgeJob.
+
+        Args:
+            target_table (str): Tabla de la fila eliminada ('users' o 'habits').
+            target_id (int): ID de la fila eliminada.
+        """
+        self.target_table = target_table
+        self.target_id = target_id
+        self.active_target = PurgeJob.target_key(target_table, target_id)
+
+    @staticmethod
+    def target_key(target_table, target_id):
+        """
+        Returns:
+            str: Valor de `active_target` de las purgas activas de una fila.
+        """
+        return f'{target_table}:{target_id}'
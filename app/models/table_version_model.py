@@ -0,0 +1,29 @@
+from app import db
+
+class TableVersion(db.Model):
+    """
+    Modelo que representa el contador de versión de una tabla.
+
+    Los métodos de escritura de los servicios incrementan la versión de las tablas que modifican
+    después de confirmar su transacción; las lecturas la usan para calcular ETags sin consultar los datos.
+
+    Atributos:
+        table_name (str): Nombre de la tabla versionada (clave primaria).
+        version (int): Número de escrituras confirmadas sobre la tabla.
+    """
+
+    __tablename__ = 'table_versions'
+
+    table_name = db.Column(db.String(64), primary_key=True)  # Nombre de la tabla versionada
+    version = db.Column(db.BigInteger, default=0, nullable=False)  # Versión actual de la tabla
+
+    def __init__(self, table_name, version=0):
+        """
+        Constructor de la clase TableVersion.
+
+        Args:
+            table_name (str): Nombre de la tabla versionada.
+            version (int): Versión inicial de la tabla.
+        """
+        self.table_name = table_name
+        self.version = version
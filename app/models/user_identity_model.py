@@ -0,0 +1,34 @@
+from app import db
+
+class UserIdentity(db.Model):
+    """
+    Modelo que reserva el nickname y el email de cada usuario en una tabla global.
+
+    Con varios shards, las restricciones UNIQUE de `users` solo se cumplen dentro de cada shard; esta tabla
+    vive solo en el shard 0, así que sus restricciones UNIQUE garantizan la unicidad entre todos los shards.
+    Se escribe en la misma transacción que la fila del usuario.
+
+    Atributos:
+        user_id (int): ID del usuario (clave primaria; la fila del usuario puede estar en otro shard).
+        nickname (str): Apodo del usuario, único entre todos los shards.
+        email (str): Correo electrónico del usuario, único entre todos los shards.
+    """
+
+    __tablename__ = 'user_identities'
+
+    user_id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # ID del usuario en su shard
+    nickname = db.Column(db.String(100), unique=True, nullable=False)  # Apodo reservado
+    email = db.Column(db.String(100), unique=True, nullable=False)  # Correo electrónico reservado
+
+    def __init__(self, user_id, nickname, email):
+        """
+        Constructor de la clase UserIdentity.
+
+        Args:
+            user_id (int): ID del usuario.
+            nickname (str): Apodo del usuario.
+            email (str): Correo electrónico del usuario.
+        """
+        self.user_id = user_id
+        self.nickname = nickname
+        self.email = email
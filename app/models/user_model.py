@@ -1,5 +1,4 @@
 from app import db
-from datetime import datetime
 
 
 class User(db.Model):
@@ -29,8 +28,8 @@ class User(db.Model):
     email = db.Column(db.String(100), unique=True, nullable=False)  # Correo electrónico del usuario, debe ser único y no nulo
     user_password = db.Column(db.String(200), nullable=False)  # Contraseña encriptada del usuario, no puede ser nula
     user_status = db.Column(db.Boolean, default=True, nullable=False)  # Estado del usuario, por defecto es activo
-    user_created_date = db.Column(db.DateTime, default=datetime.now(), nullable=False)  # Fecha de creación del usuario, no puede ser nula
-    assignments = db.relationship('Assignment', backref='user', lazy=True) # Relación con la tabla assignments
+    user_created_date = db.Column(db.DateTime, server_default=db.func.now(), nullable=False)  # Fecha de creación del usuario, la asigna la base de datos al insertar
+    assignments = db.relationship('Assignment', backref='user', lazy=True, passive_deletes=True) # Relación con la tabla assignments, que se elimina en cascada en la base de datos
 
     def __init__(self, first_name, last_name, nickname, email, user_password):
         """
@@ -1,8 +1,16 @@
-from app import db
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from app import db, shard_router
 from app.models.assignment_model import Assignment
+from app.models.assignment_stats_model import AssignmentStats
 from app.models.habit_model import Habit
 from app.models.user_model import User
+from app.services.table_version_service import TableVersionService
+from app.utils.bulk import Bulk
+from app.utils.exceptions import DuplicateValueError, InvalidDataError, NotFoundError
 from app.utils.validations import Validations
+from app.utils.mutations import Mutations
+from app.utils.serializers import Serializer
 
 class AssignmentService:
     """
@@ -25,31 +33,187 @@ class AssignmentService:
         Raises:
             ValueError: Si ya existe una asignación con el mismo usuario y hábito.
         """
-        # Verificar que la el id del usuario y del hábitos existan en sus respectivas tablas
-        Validations.check_fk_existence(User.user_id, fk_user_id, 'users')
-        Validations.check_fk_existence(Habit.habit_id, fk_habit_id, 'habits')
+        # Verificar en una sola consulta, en el shard del usuario, que el usuario y el hábito existan en sus
+        # respectivas tablas y que no exista una asignación duplicada para el mismo usuario y hábito
+        shard_router.use_for_user(fk_user_id)
+        Validations.check_all(
+            Validations.fk_check(User.user_id, fk_user_id, 'users'),
+            Validations.fk_check(Habit.habit_id, fk_habit_id, 'habits'),
+            Validations.data_pair_check(Assignment.fk_user_id, fk_user_id, Assignment.fk_habit_id, fk_habit_id, 'assignment'))
 
-        # Verificar que no exista una asignación duplicada para el mismo usuario y hábito
-        Validations.check_data_pair_existence(Assignment.fk_user_id, fk_user_id, Assignment.fk_habit_id, fk_habit_id, 'assignment')
-
-        # Crear una nueva asignación
+        # Crear una nueva asignación, con su resumen de estadísticas vacío
         new_assignment = Assignment(fk_user_id, fk_habit_id)
+        new_assignment.stats = AssignmentStats()
         
         # Guardar la nueva asignación en la base de datos
         db.session.add(new_assignment)
-        db.session.commit()
+        TableVersionService.bump('assignments')
+        Validations.commit_session('assignment')
 
         return new_assignment
     
     @staticmethod
-    def get_all_assignments():
+    def assign_habit_to_users(fk_habit_id, user_ids):
+        """
+        Asignar un hábito a muchos usuarios en lote (por ejemplo, a una cohorte nueva).
+
+        Args:
+            fk_habit_id (int): ID del hábito que se asigna.
+            user_ids (list): IDs de los usuarios que recibirán el hábito.
+
+        Returns:
+            list: Resultado por elemento, en el mismo orden de la petición (ver `_assign_pairs`).
+
+        Raises:
+            InvalidDataError: Si el lote está vacío o supera BULK_MAX_ITEMS elementos.
+            NotFoundError: Si el hábito no existe.
+            DuplicateValueError: Si otra petición creó alguna de las asignaciones durante la transacción.
+        """
+        return AssignmentService._assign_pairs(Assignment.fk_habit_id, fk_habit_id, Habit.habit_id, 'habits',
+                                               Assignment.fk_user_id, user_ids, User.user_id, 'users')
+
+    @staticmethod
+    def assign_habits_to_user(fk_user_id, habit_ids):
+        """
+        Asignar muchos hábitos a un usuario en lote (por ejemplo, un conjunto de hábitos de plantilla).
+
+        Args:
+            fk_user_id (int): ID del usuario que recibe los hábitos.
+            habit_ids (list): IDs de los hábitos que se asignan.
+
+        Returns:
+            list: Resultado por elemento, en el mismo orden de la petición (ver `_assign_pairs`).
+
+        Raises:
+            InvalidDataError: Si el lote está vacío o supera BULK_MAX_ITEMS elementos.
+            NotFoundError: Si el usuario no existe.
+            DuplicateValueError: Si otra petición creó alguna de las asignaciones durante la transacción.
+        """
+        return AssignmentService._assign_pairs(Assignment.fk_user_id, fk_user_id, User.user_id, 'users',
+                                               Assignment.fk_habit_id, habit_ids, Habit.habit_id, 'habits')
+
+    @staticmethod
+    def _assign_pairs(fixed_column, fixed_id, fixed_key, fixed_table, item_column, item_ids, item_key, item_table):
         """
-        Obtener todas las asignaciones de la base de datos.
+        Crea en lote las asignaciones entre una entidad fija y muchas entidades de la otra tabla.
+        ---
+        La existencia de las entidades y de las asignaciones previas se verifica con una sola consulta
+        por bloque de IDs; las asignaciones nuevas y sus resúmenes de estadísticas vacíos se insertan con
+        sentencias de varias filas dentro de una única transacción. Con varios shards, cada usuario se procesa
+        en el suyo (el catálogo de hábitos está en todos).
+
+        Args:
+            fixed_column (Column): Columna de Assignment de la entidad fija (por ejemplo fk_habit_id).
+            fixed_id (int): ID de la entidad fija.
+            fixed_key (Column): Clave primaria de la tabla de la entidad fija.
+            fixed_table (str): Nombre de la tabla de la entidad fija, para el mensaje de error.
+            item_column (Column): Columna de Assignment de los elementos del lote (por ejemplo fk_user_id).
+            item_ids (list): IDs de los elementos del lote.
+            item_key (Column): Clave primaria de la tabla de los elementos.
+            item_table (str): Nombre de la tabla de los elementos, para los mensajes de error.
 
         Returns:
-            List[Assignment]: Lista de todas las asignaciones en la base de datos.
+            list: Resultado por elemento. Cada resultado contiene 'index', 'status' ('created', 'duplicate',
+                  'not_found' o 'invalid'), 'assignment_id' si la asignación existe y 'message' si aplica.
+
+        Raises:
+            InvalidDataError: Si el lote está vacío o supera BULK_MAX_ITEMS elementos.
+            NotFoundError: Si la entidad fija no existe, o si se eliminó alguna entidad del lote durante la transacción.
+            DuplicateValueError: Si otra petición creó alguna de las asignaciones durante la transacción.
         """
-        return Assignment.query.all()
+        max_items = current_app.config['BULK_MAX_ITEMS']
+        chunk_size = current_app.config['BULK_CHUNK_SIZE']
+        if not item_ids or len(item_ids) > max_items:
+            raise InvalidDataError(f'The batch must contain between 1 and {max_items} items.')
+        if fixed_table == 'users':
+            shard_router.use_for_user(fixed_id)
+        Validations.check_fk_existence(fixed_key, fixed_id, fixed_table)
+
+        results = [None] * len(item_ids)
+        candidates = {}  # ID del elemento -> índice del primer elemento con ese ID
+
+        # Normalizar los IDs y descartar los repetidos dentro del mismo lote
+        for index, item_id in enumerate(item_ids):
+            if isinstance(item_id, bool) or not isinstance(item_id, int):
+                results[index] = {'index': index, 'status': 'invalid', 'message': 'The item must be an integer ID.'}
+            elif item_id in candidates:
+                results[index] = {'index': index, 'status': 'duplicate', 'message': 'This ID is repeated in the batch.'}
+            else:
+                candidates[item_id] = index
+
+        # Shard de cada elemento: el de cada usuario, o el del usuario fijo si los elementos son hábitos
+        user_of = (lambda item_id: item_id) if item_table == 'users' else (lambda item_id: fixed_id)
+        shards = {item_id: shard_router.shard_for(user_of(item_id)) for item_id in candidates}
+
+        existing_items = set()
+        existing_assignments = {}  # ID del elemento -> ID de la asignación que ya lo une a la entidad fija
+        # Una sola consulta por bloque: elementos existentes y sus asignaciones previas con la entidad fija
+        for shard in shard_router.each(sorted(set(shards.values()))):
+            for chunk in Bulk.chunked(sorted(item_id for item_id in candidates if shards[item_id] == shard), chunk_size):
+                rows = (db.session.query(item_key, Assignment.assignment_id)
+                        .outerjoin(Assignment, db.and_(item_column == item_key, fixed_column == fixed_id))
+                        .filter(item_key.in_(chunk))
+                        .all())
+                for item_id, assignment_id in rows:
+                    existing_items.add(item_id)
+                    if assignment_id is not None:
+                        existing_assignments[item_id] = assignment_id
+
+        new_ids = {}  # shard -> IDs de los elementos con asignación nueva
+        for item_id, index in candidates.items():
+            if item_id not in existing_items:
+                results[index] = {'index': index, 'status': 'not_found',
+                                  'message': f'The primary key {item_id} does not exist in the {item_table} table.'}
+            elif item_id in existing_assignments:
+                results[index] = {'index': index, 'status': 'duplicate', 'assignment_id': existing_assignments[item_id],
+                                  'message': 'This assignment already exists.'}
+            else:
+                results[index] = {'index': index, 'status': 'created'}
+                new_ids.setdefault(shards[item_id], []).append(item_id)
+
+        if not new_ids:
+            return results
+        try:
+            for shard in shard_router.each(sorted(new_ids)):
+                for chunk in Bulk.chunked(new_ids[shard], chunk_size):
+                    # Inserción de varias filas por sentencia y, con un INSERT ... SELECT, sus resúmenes de estadísticas vacíos
+                    db.session.execute(db.insert(Assignment), [{fixed_column.key: fixed_id, item_column.key: item_id} for item_id in chunk])
+                    created = (db.select(Assignment.assignment_id)
+                               .where(fixed_column == fixed_id, item_column.in_(chunk))
+                               .where(~db.exists().where(AssignmentStats.assignment_id == Assignment.assignment_id)))
+                    db.session.execute(db.insert(AssignmentStats).from_select(['assignment_id'], created))
+                    for item_id, assignment_id in db.session.execute(
+                            db.select(item_column, Assignment.assignment_id).where(fixed_column == fixed_id, item_column.in_(chunk))):
+                        results[candidates[item_id]]['assignment_id'] = assignment_id
+            TableVersionService.bump('assignments')
+            db.session.commit()
+        except IntegrityError as e:
+            db.session.rollback()
+            if Validations.is_foreign_key_violation(e):
+                raise NotFoundError('Some users or habits of the batch were deleted concurrently.')
+            raise DuplicateValueError('Some assignments were created concurrently. Please retry the batch.')
+        return results
+
+    @staticmethod
+    def get_all_assignments(after=None, before=None, limit=None, fields=None):
+        """
+        Obtener una página de las asignaciones de la base de datos.
+
+        Args:
+            after (str): Cursor a partir del cual se obtiene la página siguiente.
+            before (str): Cursor antes del cual se obtiene la página anterior.
+            limit (int): Tamaño de página solicitado.
+            fields (list): Campos solicitados; el SELECT se restringe a sus columnas (None para todas).
+
+        Returns:
+            Page: Una página de asignaciones ordenadas por su ID.
+
+        Raises:
+            InvalidDataError: Si los parámetros de paginación no son válidos.
+        """
+        # Con varios shards, la página de cada uno se obtiene en paralelo y se mezclan en orden
+        return shard_router.paginate(lambda session: Serializer.narrow_query(session.query(Assignment), Assignment, fields),
+                                     Assignment.assignment_id, after, before, limit)
     
     @staticmethod
     def get_assignments_by_user_id(fk_user_id):
@@ -65,7 +229,8 @@ class AssignmentService:
         Raises:
             ValueError: Si no se encuentran asignaciones para el usuario dado.
         """
-        # Buscar asignaciones por el ID del usuario
+        # Buscar asignaciones por el ID del usuario, en su shard
+        shard_router.use_for_user(fk_user_id)
         assignments = Assignment.query.filter_by(fk_user_id=fk_user_id).all()
         # Verificar si se encontraron asignaciones
         assignments_validated = Validations.check_if_exists(assignments, 'Assignment')
@@ -86,11 +251,11 @@ class AssignmentService:
         Raises:
             ValueError: Si la asignación no se encuentra.
         """
-        # Obtener la asignación por su ID
-        assignment = AssignmentService.get_assignment_by_assignment_id(assignment_id)
-        
-        # Eliminar la asignación de la base de datos
-        db.session.delete(assignment)
+        # Eliminar la asignación con un único DELETE, sin cargarla en la sesión; la base de datos elimina en cascada
+        # su resumen y sus fechas completadas (si la asignación no existe no se elimina ninguna fila)
+        shard_router.use_for_key(Assignment.assignment_id, assignment_id)
+        Mutations.delete_by_id(Assignment.assignment_id, assignment_id, 'Assignment')
+        TableVersionService.bump('assignments', 'completed_dates')
         db.session.commit()
 
     @staticmethod
@@ -107,9 +272,25 @@ class AssignmentService:
         Raises:
             ValueError: Si la asignación no se encuentra.
         """
-        # Buscar la asignación por su ID
+        # Buscar la asignación por su ID, en el shard en el que esté
+        shard_router.use_for_key(Assignment.assignment_id, assignment_id)
         assignment = Assignment.query.filter_by(assignment_id=assignment_id).first()
         # Validar que la asignación exista
         assignment_validated = Validations.check_if_exists(assignment, 'Assignment')
         
         return assignment_validated
+
+    @staticmethod
+    def stream_all_assignments(fields=None):
+        """
+        Obtener una consulta que recorre todas las asignaciones por lotes, para exportarlas en streaming.
+
+        Args:
+            fields (list): Campos solicitados; el SELECT se restringe a sus columnas (None para todas).
+
+        Returns:
+            Query | MergedStream: Consulta ordenada por ID que se lee con un cursor del lado del servidor
+                                  (con varios shards, la mezcla en orden de la de cada uno).
+        """
+        return shard_router.stream(lambda session: Serializer.narrow_query(session.query(Assignment), Assignment, fields),
+                                   Assignment.assignment_id)
@@ -1,7 +1,16 @@
-from app import db
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from app import db, shard_router
 from app.models.completed_date_model import CompletedDate
 from app.models.assignment_model import Assignment
+from app.utils.bulk import Bulk
+from app.utils.calendar import Calendar
+from app.utils.exceptions import DuplicateValueError, InvalidDataError, NotFoundError
+from app.services.table_version_service import TableVersionService
+from app.services.stats_service import StatsService
 from app.utils.validations import Validations
+from app.utils.mutations import Mutations
+from app.utils.serializers import Serializer
 
 class CompletedDateService:
     """
@@ -24,18 +33,133 @@ class CompletedDateService:
             CompletedDate: La nueva fecha de completación creada.
 
         Raises:
-            ValueError: Si la asignación no existe o si la fecha de completación ya existe.
+            ValueError: Si la asignación no existe, si la fecha no es válida o si la fecha de completación ya existe.
         """
-        Validations.check_fk_existence(Assignment.assignment_id, assignment_id, 'assignments')
-        Validations.check_data_pair_existence(CompletedDate.fk_assignment_id, assignment_id, CompletedDate.completed_date, completed_date, 'date')
+        completed_date = Validations.check_date(completed_date)
+
+        # La fecha se registra en el shard de su asignación
+        shard_router.use_for_key(Assignment.assignment_id, assignment_id)
+        # Bloquear primero el resumen de estadísticas de la asignación para serializar las escrituras concurrentes
+        locked_stats = StatsService.lock_stats([assignment_id])
+        Validations.check_all(
+            Validations.fk_check(Assignment.assignment_id, assignment_id, 'assignments'),
+            Validations.data_pair_check(CompletedDate.fk_assignment_id, assignment_id, CompletedDate.completed_date, completed_date, 'date'))
         
         new_completed_date = CompletedDate(assignment_id, completed_date)
 
+        # La fila se envía antes de actualizar el resumen, que puede necesitar recalcularse con ella
         db.session.add(new_completed_date)
-        db.session.commit()
+        Validations.flush_session('date')
+        StatsService.record_completions(locked_stats, {assignment_id: [completed_date]})
+        TableVersionService.bump('completed_dates')
+        Validations.commit_session('date')
 
         return new_completed_date
     
+    @staticmethod
+    def create_completed_dates_bulk(items):
+        """
+        Registrar en lote muchas fechas de completación (sincronización de clientes sin conexión).
+        ---
+        La existencia de las asignaciones y de las fechas ya registradas se verifica con una sola
+        consulta por bloque de asignaciones, y las fechas nuevas se insertan con sentencias de varias
+        filas dentro de una única transacción. Con varios shards, las asignaciones del lote se procesan
+        en el shard en el que está cada una.
+
+        Args:
+            items (list): Lista de diccionarios con las claves 'fk_assignment_id' y 'completed_date'.
+
+        Returns:
+            list: Resultado por elemento, en el mismo orden de la petición. Cada resultado contiene
+                  'index', 'status' ('created', 'duplicate', 'not_found' o 'invalid') y 'message' si aplica.
+
+        Raises:
+            InvalidDataError: Si el lote está vacío o supera BULK_MAX_ITEMS elementos.
+            DuplicateValueError: Si otra petición registró alguna de las fechas durante la transacción.
+            NotFoundError: Si otra petición eliminó alguna de las asignaciones durante la transacción.
+        """
+        max_items = current_app.config['BULK_MAX_ITEMS']
+        chunk_size = current_app.config['BULK_CHUNK_SIZE']
+        if not items or len(items) > max_items:
+            raise InvalidDataError(f'The batch must contain between 1 and {max_items} items.')
+
+        results = [None] * len(items)
+        candidates = {}  # (fk_assignment_id, completed_date) -> índice del primer elemento con ese par
+
+        # Normalizar los elementos y descartar los repetidos dentro del mismo lote
+        for index, item in enumerate(items):
+            try:
+                assignment_id = int(item['fk_assignment_id'])
+                completed_date = Validations.check_date(item.get('completed_date'))
+            except (KeyError, TypeError, ValueError) as e:
+                message = str(e) if isinstance(e, InvalidDataError) else 'The item must contain a valid fk_assignment_id.'
+                results[index] = {'index': index, 'status': 'invalid', 'message': message}
+                continue
+            if (assignment_id, completed_date) in candidates:
+                results[index] = {'index': index, 'status': 'duplicate', 'message': 'This date is repeated in the batch.'}
+                continue
+            candidates[(assignment_id, completed_date)] = index
+
+        if candidates:
+            dates = [completed_date for _, completed_date in candidates]
+            min_date, max_date = min(dates), max(dates)
+            existing_assignments = set()
+            existing_pairs = set()
+            # Shard de cada asignación del lote (con un solo shard, todas en el shard 0)
+            shards = shard_router.locate_many(Assignment.assignment_id, {assignment_id for assignment_id, _ in candidates})
+            locked_stats = {}  # shard -> resúmenes bloqueados de sus asignaciones
+
+            for shard in shard_router.each(sorted(set(shards.values()))):
+                # Bloquear primero los resúmenes de estadísticas de las asignaciones del lote
+                assignment_ids = sorted(assignment_id for assignment_id in shards if shards[assignment_id] == shard)
+                locked_stats[shard] = StatsService.lock_stats(assignment_ids)
+
+                # Una sola consulta por bloque: asignaciones existentes y sus fechas ya registradas en el rango del lote
+                for chunk in Bulk.chunked(assignment_ids, chunk_size):
+                    rows = (db.session.query(Assignment.assignment_id, CompletedDate.completed_date)
+                            .outerjoin(CompletedDate, db.and_(
+                                CompletedDate.fk_assignment_id == Assignment.assignment_id,
+                                CompletedDate.completed_date.between(min_date, max_date)))
+                            .filter(Assignment.assignment_id.in_(chunk))
+                            .all())
+                    for assignment_id, completed_date in rows:
+                        existing_assignments.add(assignment_id)
+                        if completed_date is not None:
+                            existing_pairs.add((assignment_id, completed_date))
+
+            new_rows = {}  # shard -> filas nuevas
+            new_dates = {}  # shard -> {fk_assignment_id: fechas nuevas}, para actualizar los resúmenes de estadísticas
+            for (assignment_id, completed_date), index in candidates.items():
+                if assignment_id not in existing_assignments:
+                    results[index] = {'index': index, 'status': 'not_found',
+                                      'message': f'The primary key {assignment_id} does not exist in the assignments table.'}
+                elif (assignment_id, completed_date) in existing_pairs:
+                    results[index] = {'index': index, 'status': 'duplicate', 'message': 'This date already exists.'}
+                else:
+                    results[index] = {'index': index, 'status': 'created'}
+                    shard = shards[assignment_id]
+                    new_rows.setdefault(shard, []).append({'fk_assignment_id': assignment_id, 'completed_date': completed_date})
+                    new_dates.setdefault(shard, {}).setdefault(assignment_id, []).append(completed_date)
+
+            # Inserciones de varias filas por sentencia, confirmadas en una sola transacción
+            try:
+                for shard in shard_router.each(sorted(new_rows)):
+                    for chunk in Bulk.chunked(new_rows[shard], chunk_size):
+                        db.session.execute(db.insert(CompletedDate), chunk)
+                    StatsService.record_completions(locked_stats[shard], new_dates[shard])
+                    # Los resúmenes modificados se envían a su shard antes de pasar al siguiente
+                    db.session.flush()
+                if new_rows:
+                    TableVersionService.bump('completed_dates')
+                db.session.commit()
+            except IntegrityError as e:
+                db.session.rollback()
+                if Validations.is_foreign_key_violation(e):
+                    raise NotFoundError('Some assignments of the batch were deleted concurrently.')
+                raise DuplicateValueError('Some dates were registered concurrently. Please retry the batch.')
+
+        return results
+
     @staticmethod
     def get_date_by_date_id(date_id):
         """
@@ -50,34 +174,131 @@ class CompletedDateService:
         Raises:
             ValueError: Si la fecha de completación no existe.
         """
+        shard_router.use_for_key(CompletedDate.completed_date_id, date_id)
         date = CompletedDate.query.filter_by(completed_date_id=date_id).first()
         validated_date = Validations.check_if_exists(date, 'Date')
         return validated_date
     
     @staticmethod
-    def get_all_dates_by_assignment_id(assignment_id):
+    def get_all_dates_by_assignment_id(assignment_id, date_from=None, date_to=None):
         """
-        Obtener todas las fechas de completación asociadas a una asignación específica.
+        Obtener las fechas de completación asociadas a una asignación específica, opcionalmente dentro de un rango.
+
+        El rango se resuelve con el índice único `(fk_assignment_id, completed_date)`.
 
         Args:
             assignment_id (int): ID de la asignación para la cual se buscan las fechas de completación.
+            date_from (str): Primera fecha del rango (AAAA-MM-DD, incluida), None para no acotarlo.
+            date_to (str): Última fecha del rango (AAAA-MM-DD, incluida), None para no acotarlo.
 
         Returns:
             List[CompletedDate]: Lista de fechas de completación asociadas a la asignación.
+
+        Raises:
+            InvalidDataError: Si alguna fecha del rango no es válida o el rango está invertido.
+            ValueError: Si no existen fechas.
         """
-        dates = CompletedDate.query.filter_by(fk_assignment_id=assignment_id).all()
+        shard_router.use_for_key(Assignment.assignment_id, assignment_id)
+        query = CompletedDate.query.filter_by(fk_assignment_id=assignment_id)
+        if date_from is not None or date_to is not None:
+            date_from = Validations.check_date(date_from) if date_from is not None else None
+            date_to = Validations.check_date(date_to) if date_to is not None else None
+            if date_from and date_to and date_from > date_to:
+                raise InvalidDataError('The from date must be earlier than or equal to the to date.')
+            if date_from:
+                query = query.filter(CompletedDate.completed_date >= date_from)
+            if date_to:
+                query = query.filter(CompletedDate.completed_date <= date_to)
+            query = query.order_by(CompletedDate.completed_date)
+        dates = query.all()
         validated_date = Validations.check_if_exists(dates, 'Dates')
         return validated_date
-    
+
     @staticmethod
-    def get_all_dates():
+    def get_assignment_calendar(assignment_id, year):
         """
-        Obtener todas las fechas de completación en la base de datos.
+        Obtener las fechas completadas de una asignación en un año, codificadas como mapa de bits.
+
+        Args:
+            assignment_id (int): ID de la asignación.
+            year (int): Año del calendario.
 
         Returns:
-            List[CompletedDate]: Lista de todas las fechas de completación en la base de datos.
+            dict: ID de la asignación, año, días del año, número de fechas y mapa de bits en base64.
+
+        Raises:
+            NotFoundError: Si la asignación no existe.
         """
-        return CompletedDate.query.all()
+        first, last = Calendar.year_bounds(year)
+        shard_router.use_for_key(Assignment.assignment_id, assignment_id)
+        dates = [completed_date for (completed_date,) in
+                 db.session.query(CompletedDate.completed_date)
+                 .filter(CompletedDate.fk_assignment_id == assignment_id, CompletedDate.completed_date.between(first, last))]
+        if not dates:
+            # Un calendario vacío es válido; solo se distingue de una asignación inexistente cuando no hay fechas
+            Validations.check_fk_existence(Assignment.assignment_id, assignment_id, 'assignments')
+        return {'assignment_id': assignment_id, 'year': year, 'days': last.timetuple().tm_yday,
+                'count': len(dates), 'bitmap': Calendar.encode(dates, year)}
+
+    @staticmethod
+    def get_user_calendar(fk_user_id, year):
+        """
+        Obtener en una sola consulta los calendarios de un año de todas las asignaciones de un usuario.
+
+        Args:
+            fk_user_id (int): ID del usuario.
+            year (int): Año del calendario.
+
+        Returns:
+            dict: ID del usuario, año, días del año y el calendario de cada asignación (con su hábito).
+
+        Raises:
+            ValueError: Si el usuario no tiene asignaciones.
+        """
+        first, last = Calendar.year_bounds(year)
+        shard_router.use_for_user(fk_user_id)
+        rows = (db.session.query(Assignment.assignment_id, Assignment.fk_habit_id, CompletedDate.completed_date)
+                .outerjoin(CompletedDate, db.and_(
+                    CompletedDate.fk_assignment_id == Assignment.assignment_id,
+                    CompletedDate.completed_date.between(first, last)))
+                .filter(Assignment.fk_user_id == fk_user_id)
+                .order_by(Assignment.assignment_id)
+                .all())
+        Validations.check_if_exists(rows, 'Assignment')
+        dates_by_assignment = {}
+        for assignment_id, fk_habit_id, completed_date in rows:
+            dates = dates_by_assignment.setdefault((assignment_id, fk_habit_id), [])
+            if completed_date is not None:
+                dates.append(completed_date)
+        return {
+            'user_id': fk_user_id,
+            'year': year,
+            'days': last.timetuple().tm_yday,
+            'assignments': [{'assignment_id': assignment_id, 'fk_habit_id': fk_habit_id,
+                             'count': len(dates), 'bitmap': Calendar.encode(dates, year)}
+                            for (assignment_id, fk_habit_id), dates in dates_by_assignment.items()],
+        }
+
+    @staticmethod
+    def get_all_dates(after=None, before=None, limit=None, fields=None):
+        """
+        Obtener una página de las fechas de completación en la base de datos.
+
+        Args:
+            after (str): Cursor a partir del cual se obtiene la página siguiente.
+            before (str): Cursor antes del cual se obtiene la página anterior.
+            limit (int): Tamaño de página solicitado.
+            fields (list): Campos solicitados; el SELECT se restringe a sus columnas (None para todas).
+
+        Returns:
+            Page: Una página de fechas de completación ordenadas por su ID.
+
+        Raises:
+            InvalidDataError: Si los parámetros de paginación no son válidos.
+        """
+        # Con varios shards, la página de cada uno se obtiene en paralelo y se mezclan en orden
+        return shard_router.paginate(lambda session: Serializer.narrow_query(session.query(CompletedDate), CompletedDate, fields),
+                                     CompletedDate.completed_date_id, after, before, limit)
     
     @staticmethod
     def delete_date(completed_date_id):
@@ -93,9 +314,37 @@ class CompletedDateService:
         Raises:
             ValueError: Si la fecha de completación no se encuentra.
         """
-        # Obtener la fecha de completación por su ID
-        date = CompletedDateService.get_date_by_date_id(completed_date_id)
-        
-        # Eliminar la fecha de completación de la base de datos
-        db.session.delete(date)
+        # La asignación de la fecha (que nunca cambia) se lee con una conexión aparte, fuera de la transacción: así
+        # el bloqueo del resumen es su primera consulta y se toma antes que el de la fecha, en el mismo orden que en
+        # create_completed_date, y una eliminación y un registro simultáneos no se bloquean mutuamente
+        shard_router.use_for_key(CompletedDate.completed_date_id, completed_date_id)
+        with db.session.get_bind(CompletedDate.__mapper__).connect() as connection:
+            assignment_id = connection.scalar(
+                db.select(CompletedDate.fk_assignment_id).where(CompletedDate.completed_date_id == completed_date_id))
+        Validations.check_if_exists(assignment_id, 'Date')
+        locked_stats = StatsService.lock_stats([assignment_id])
+
+        # Eliminar la fecha de completación con un único DELETE que devuelve su día (RETURNING), sin cargarla en la
+        # sesión; si otra petición la eliminó a la vez no se elimina ninguna fila
+        date = Mutations.delete_by_id(CompletedDate.completed_date_id, completed_date_id, 'Date',
+                                      returning=(CompletedDate.completed_date,))
+
+        # Actualizar el resumen de la asignación
+        StatsService.record_removal(locked_stats, assignment_id, date.completed_date)
+        TableVersionService.bump('completed_dates')
         db.session.commit()
+
+    @staticmethod
+    def stream_all_dates(fields=None):
+        """
+        Obtener una consulta que recorre todas las fechas de completación por lotes, para exportarlas en streaming.
+
+        Args:
+            fields (list): Campos solicitados; el SELECT se restringe a sus columnas (None para todas).
+
+        Returns:
+            Query | MergedStream: Consulta ordenada por ID que se lee con un cursor del lado del servidor
+                                  (con varios shards, la mezcla en orden de la de cada uno).
+        """
+        return shard_router.stream(lambda session: Serializer.narrow_query(session.query(CompletedDate), CompletedDate, fields),
+                                   CompletedDate.completed_date_id)
@@ -1,6 +1,17 @@
-from app import db
+import itertools
+from operator import attrgetter
+from sqlalchemy.orm.attributes import set_committed_value
+from app import db, cache, shard_router
+from app.models.assignment_model import Assignment
 from app.models.habit_model import Habit
+from app.services.table_version_service import TableVersionService
+from app.services.purge_service import PurgeService
 from app.utils.validations import Validations
+from app.utils.mutations import Mutations
+from app.utils.pagination import Pagination
+from app.utils.streaming import Streaming
+from app.utils.serializers import Serializer
+from app.utils.expansions import Expansion
 
 class HabitService:
     """
@@ -28,9 +39,17 @@ class HabitService:
         Validations.check_data_pair_existence(Habit.habit_name, habit_name, Habit.time_of_day, time_of_day, 'habit')  
         # Crear un nuevo objeto Habit con los datos proporcionados
         new_habit = Habit(habit_name, time_of_day)
-        # Agregar el nuevo hábito a la base de datos y confirmar la transacción
+        # Agregar el nuevo hábito a la base de datos
         db.session.add(new_habit)
-        db.session.commit()
+        if shard_router.enabled:
+            # El catálogo de hábitos se replica en todos los shards, con el ID que generó el shard 0
+            Validations.flush_session('habit')
+            values = {column.key: getattr(new_habit, column.key) for column in Habit.__table__.columns}
+            for _ in shard_router.each(range(1, shard_router.count)):
+                Validations.execute_statement(db.insert(Habit).values(**values), 'habit')
+        # Confirmar la transacción
+        TableVersionService.bump('habits')
+        Validations.commit_session('habit')
         # Retornar el hábito creado
         return new_habit
 
@@ -41,10 +60,11 @@ class HabitService:
 
         Args:
             habit_id (int): El ID del hábito a actualizar.
-            new_data (dict): Un diccionario con los nuevos datos del hábito, como 'habit_name' y 'time_of_day'.
+            habit_name (str): El nuevo nombre del hábito.
+            time_of_day (str): El nuevo momento del día del hábito.
 
         Returns:
-            Habit: El hábito actualizado.
+            None
 
         Raises:
             ValueError: Si el hábito no se encuentra o si ya existe un hábito con el mismo nombre y momento del día.
@@ -52,41 +72,53 @@ class HabitService:
         Validations.Check_data_time_of_day(time_of_day)
         # Validar que no exista otra combinación de nombre y momento del día
         Validations.check_data_pair_existence(Habit.habit_name, habit_name, Habit.time_of_day, time_of_day, 'habit')
-        # Buscar el hábito por su ID
-        habit = HabitService.get_habit_by_id(habit_id)
-        # Actualizar el nombre y el momento del día del hábito
-        habit.habit_name = habit_name
-        habit.time_of_day = time_of_day
-        # Guardar los cambios en la base de datos
-        db.session.commit()
-        return habit
+        # Actualizar el nombre y el momento del día con un único UPDATE en cada shard, empezando por el shard 0
+        # (si no existe no se modifica ninguna fila)
+        for _ in shard_router.each():
+            Mutations.update_by_id(Habit.habit_id, habit_id, {'habit_name': habit_name, 'time_of_day': time_of_day}, 'Habit')
+        # Invalidar la copia en caché al confirmar y guardar los cambios en la base de datos
+        cache.invalidate('habit', habit_id)
+        TableVersionService.bump('habits')
+        Validations.commit_session('habit')
 
     @staticmethod
     def delete_habit(habit_id):
         """
-        Elimina un hábito existente de la base de datos.
+        Elimina un hábito existente de la base de datos junto con sus asignaciones y sus fechas completadas.
+
+        Si el hábito tiene más de PURGE_THRESHOLD_ROWS filas dependientes, la eliminación se programa
+        como una purga en segundo plano.
 
         Args:
             habit_id (int): El ID del hábito a eliminar.
 
+        Returns:
+            PurgeJob: La purga programada; None si el hábito se eliminó directamente.
+
         Raises:
             ValueError: Si el hábito no se encuentra.
         """
-        # Obtener el hábito por su ID
-        habit = HabitService.get_habit_by_id(habit_id)
-        # Eliminar el hábito de la base de datos y confirmar la transacción
-        db.session.delete(habit)
-        db.session.commit()
+        return PurgeService.delete_or_schedule('habits', habit_id)
 
     @staticmethod
-    def get_all_habits():
+    def get_all_habits(after=None, before=None, limit=None, fields=None):
         """
-        Obtiene todos los hábitos almacenados en la base de datos.
+        Obtiene una página de los hábitos almacenados en la base de datos.
+
+        Args:
+            after (str): Cursor a partir del cual se obtiene la página siguiente.
+            before (str): Cursor antes del cual se obtiene la página anterior.
+            limit (int): Tamaño de página solicitado.
+            fields (list): Campos solicitados; el SELECT se restringe a sus columnas (None para todas).
 
         Returns:
-            List[Habit]: Una lista con todos los hábitos registrados.
+            Page: Una página de hábitos ordenados por su ID.
+
+        Raises:
+            InvalidDataError: Si los parámetros de paginación no son válidos.
         """
-        return Habit.query.all()
+        query = Serializer.narrow_query(Habit.query, Habit, fields)
+        return Pagination.paginate(query, Habit.habit_id, after, before, limit)
     
     @staticmethod
     def get_habit_by_id(habit_id):
@@ -107,3 +139,59 @@ class HabitService:
         # Validar que el hábito exista
         habit_validated = Validations.check_if_exists(habit, 'Habit')
         return habit_validated
+
+    @staticmethod
+    def get_habit_with_includes(habit_id, includes):
+        """
+        Obtiene un hábito por su ID con sus relaciones expandidas cargadas por adelantado.
+
+        Args:
+            habit_id (int): El ID del hábito a buscar.
+            includes (tuple): Rutas de relación a cargar (por ejemplo 'assignments.completed_dates').
+
+        Returns:
+            Habit: El hábito con las relaciones solicitadas ya cargadas.
+
+        Raises:
+            ValueError: Si el hábito no se encuentra.
+        """
+        if not shard_router.enabled:
+            # Una consulta por nivel de relación (selectinload), sin importar cuántas filas tenga cada nivel
+            habit = Habit.query.options(*Expansion.load_options(Habit, includes)).filter_by(habit_id=habit_id).first()
+            return Validations.check_if_exists(habit, 'Habit')
+        # Con varios shards las asignaciones del hábito están repartidas por usuario: se cargan de todos en paralelo
+        habit = Validations.check_if_exists(Habit.query.filter_by(habit_id=habit_id).first(), 'Habit')
+        options = Expansion.load_options(Assignment, [path.split('.', 1)[1] for path in includes if '.' in path])
+        shards = shard_router.fan_out(lambda session: session.query(Assignment).options(*options)
+                                      .filter_by(fk_habit_id=habit_id).all(), 'include')
+        set_committed_value(habit, 'assignments', sorted(itertools.chain(*shards), key=attrgetter('assignment_id')))
+        return habit
+
+    @staticmethod
+    def stream_all_habits(fields=None):
+        """
+        Obtiene una consulta que recorre todos los hábitos por lotes, para exportarlos en streaming.
+
+        Args:
+            fields (list): Campos solicitados; el SELECT se restringe a sus columnas (None para todas).
+
+        Returns:
+            Query: Consulta ordenada por ID que se lee con un cursor del lado del servidor.
+        """
+        return Streaming.stream_query(Serializer.narrow_query(Habit.query, Habit, fields), Habit.habit_id)
+
+    @staticmethod
+    def get_cached_habit(habit_id):
+        """
+        Obtiene los datos de un hábito a través de la caché de lectura.
+
+        Args:
+            habit_id (int): El ID del hábito a buscar.
+
+        Returns:
+            dict: Las columnas del hábito.
+
+        Raises:
+            NotFoundError: Si el hábito no se encuentra.
+        """
+        return cache.get_or_load('habit', habit_id, lambda: cache.snapshot(HabitService.get_habit_by_id(habit_id)))
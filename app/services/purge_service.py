@@ -0,0 +1,230 @@
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from app import db, cache, background_jobs, shard_router
+from app.models.assignment_model import Assignment
+from app.models.completed_date_model import CompletedDate
+from app.models.habit_model import Habit
+from app.models.purge_job_model import PurgeJob
+from app.models.user_model import User
+from app.models.user_identity_model import UserIdentity
+from app.services.table_version_service import TableVersionService
+from app.utils.mutations import Mutations
+from app.utils.validations import Validations
+
+# Filas que se pueden purgar: (clave primaria, columna de las asignaciones que la referencia, nombre en los errores, tipo en caché)
+PURGE_TARGETS = {
+    'users': (User.user_id, Assignment.fk_user_id, 'User', 'user'),
+    'habits': (Habit.habit_id, Assignment.fk_habit_id, 'Habit', 'habit'),
+}
+
+# Estados de una purga que todavía no ha terminado
+ACTIVE_STATUSES = ('pending', 'running')
+
+class PurgeService:
+    """
+    Servicio para eliminar usuarios y hábitos junto con sus asignaciones, resúmenes y fechas completadas.
+
+    Las claves foráneas de la base de datos eliminan en cascada (`ON DELETE CASCADE`) las filas dependientes,
+    así que un único `DELETE` de la fila principal basta y la sesión no carga ninguna relación. Si la fila tiene
+    más de PURGE_THRESHOLD_ROWS filas dependientes, ese DELETE sería una transacción muy larga que bloquea
+    miles de filas: en su lugar se programa una purga en segundo plano que las elimina por bloques de
+    PURGE_CHUNK_SIZE filas, cada uno en su propia transacción, y elimina la fila principal al final.
+
+    Con varios shards, un usuario se elimina en su shard y un hábito en todos (el catálogo está replicado),
+    empezando por el shard 0; las purgas programadas se guardan siempre en el shard 0.
+    """
+
+    @staticmethod
+    def delete_or_schedule(target_table, target_id):
+        """
+        Elimina un usuario o un hábito, o programa su purga en segundo plano si tiene demasiadas filas dependientes.
+
+        Args:
+            target_table (str): Tabla de la fila a eliminar ('users' o 'habits').
+            target_id (int): ID de la fila a eliminar.
+
+        Returns:
+            PurgeJob: La purga programada (o la que ya estaba en curso para la misma fila); None si la fila
+                      se eliminó directamente.
+
+        Raises:
+            NotFoundError: Si la fila no existe.
+        """
+        key_column, fk_column, type_obj, cache_type = PURGE_TARGETS[target_table]
+        threshold = current_app.config['PURGE_THRESHOLD_ROWS']
+        shards = PurgeService.shards(target_table, target_id)
+        dependents = sum(PurgeService.count_dependents(fk_column, target_id, threshold) for _ in shard_router.each(shards))
+        if dependents <= threshold:
+            # Un único DELETE por shard: la base de datos elimina en cascada las asignaciones, sus resúmenes y sus fechas
+            for _ in shard_router.each(shards):
+                Mutations.delete_by_id(key_column, target_id, type_obj)
+            PurgeService.release_identity(target_table, target_id)
+            cache.invalidate(cache_type, target_id)
+            TableVersionService.bump(target_table, *(('assignments', 'completed_dates') if dependents else ()))
+            db.session.commit()
+            return None
+
+        shard_router.use(shards[0])
+        exists = db.session.query(db.exists().where(key_column == target_id)).scalar()
+        Validations.check_if_exists(exists, type_obj)
+        # Una segunda petición de eliminación de la misma fila devuelve la purga en curso
+        active_target = PurgeJob.target_key(target_table, target_id)
+        job = PurgeJob.query.filter_by(active_target=active_target).first()
+        if job is None:
+            job = PurgeJob(target_table, target_id)
+            db.session.add(job)
+            try:
+                db.session.commit()
+            except IntegrityError:
+                # Otra petición programó la purga de la misma fila a la vez (restricción única de active_target)
+                db.session.rollback()
+                return PurgeJob.query.filter_by(active_target=active_target).first()
+            background_jobs.submit(PurgeService.run_job, job.purge_job_id)
+        return job
+
+    @staticmethod
+    def shards(target_table, target_id):
+        """
+        Shards en los que está la fila: el del usuario, o todos para un hábito (empezando por el shard 0).
+
+        Args:
+            target_table (str): Tabla de la fila ('users' o 'habits').
+            target_id (int): ID de la fila.
+
+        Returns:
+            list: Índices de los shards.
+        """
+        if target_table == 'users':
+            return [shard_router.shard_for(target_id)]
+        return list(range(shard_router.count))
+
+    @staticmethod
+    def release_identity(target_table, target_id):
+        """
+        Libera el nickname y el email de un usuario eliminado en la tabla global `user_identities`, dentro de la
+        transacción que elimina su fila.
+
+        Args:
+            target_table (str): Tabla de la fila eliminada ('users' o 'habits'; los hábitos no reservan nada).
+            target_id (int): ID de la fila eliminada.
+
+        Returns:
+            None
+        """
+        if target_table == 'users':
+            db.session.execute(db.delete(UserIdentity).where(UserIdentity.user_id == target_id),
+                               execution_options={'synchronize_session': False})
+
+    @staticmethod
+    def count_dependents(fk_column, target_id, limit):
+        """
+        Cuenta las filas dependientes de un usuario o un hábito, sin pasar de `limit + 1`.
+
+        Cada asignación cuenta como sus fechas completadas, o como una fila si no tiene ninguna. El conteo se
+        detiene al superar el límite, así que su coste no crece con el historial de la fila.
+
+        Args:
+            fk_column (Column): Columna de las asignaciones que referencia la fila (fk_user_id o fk_habit_id).
+            target_id (int): ID de la fila.
+            limit (int): Umbral a partir del cual no importa el número exacto.
+
+        Returns:
+            int: Número de filas dependientes del shard fijado, como mucho `limit + 1`.
+        """
+        rows = (db.select(Assignment.assignment_id)
+                .outerjoin(CompletedDate, CompletedDate.fk_assignment_id == Assignment.assignment_id)
+                .where(fk_column == target_id)
+                .limit(limit + 1)
+                .subquery())
+        return db.session.scalar(db.select(db.func.count()).select_from(rows))
+
+    @staticmethod
+    def run_job(purge_job_id):
+        """
+        Ejecuta una purga: elimina por bloques las fechas completadas y las asignaciones, y después la fila principal.
+
+        Cada bloque se confirma en su propia transacción junto con el progreso de la purga, así que una purga
+        interrumpida se puede volver a ejecutar y continúa donde se quedó. Los errores se guardan en la purga.
+
+        Args:
+            purge_job_id (int): ID de la purga.
+
+        Returns:
+            PurgeJob: La purga con su estado final; None si no existe.
+        """
+        job = db.session.get(PurgeJob, purge_job_id)
+        if job is None or job.status == 'completed':
+            return job
+        key_column, fk_column, _, cache_type = PURGE_TARGETS[job.target_table]
+        chunk_size = current_app.config['PURGE_CHUNK_SIZE']
+        job.status = 'running'
+        job.active_target = PurgeJob.target_key(job.target_table, job.target_id)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Una purga fallida que se reanuda cuando ya se programó otra para la misma fila: la nueva la sustituye
+            db.session.rollback()
+            return job
+        try:
+            assignment_ids = db.select(Assignment.assignment_id).where(fk_column == job.target_id)
+            # En cada shard de la fila, primero las fechas completadas, después las asignaciones (sus resúmenes se
+            # eliminan en cascada) y al final la fila principal; la purga se sigue guardando en el shard 0
+            for _ in shard_router.each(PurgeService.shards(job.target_table, job.target_id)):
+                for key, table, ids_query in (
+                        (CompletedDate.completed_date_id, 'completed_dates',
+                         db.select(CompletedDate.completed_date_id).where(CompletedDate.fk_assignment_id.in_(assignment_ids))),
+                        (Assignment.assignment_id, 'assignments', assignment_ids)):
+                    while True:
+                        ids = db.session.scalars(ids_query.limit(chunk_size)).all()
+                        if not ids:
+                            break
+                        db.session.execute(db.delete(key.class_).where(key.in_(ids)), execution_options={'synchronize_session': False})
+                        job.deleted_rows += len(ids)
+                        TableVersionService.bump(table)
+                        db.session.commit()
+                db.session.execute(db.delete(key_column.class_).where(key_column == job.target_id), execution_options={'synchronize_session': False})
+            PurgeService.release_identity(job.target_table, job.target_id)
+            cache.invalidate(cache_type, job.target_id)
+            TableVersionService.bump(job.target_table)
+            job.status = 'completed'
+            job.active_target = None
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.exception('Purge job %s failed', purge_job_id)
+            job.status = 'failed'
+            job.active_target = None
+            job.error = str(e)[:500]
+            db.session.commit()
+        return job
+
+    @staticmethod
+    def get_job(purge_job_id):
+        """
+        Obtener una purga por su ID.
+
+        Args:
+            purge_job_id (int): ID de la purga.
+
+        Returns:
+            PurgeJob: La purga encontrada.
+
+        Raises:
+            NotFoundError: Si la purga no existe.
+        """
+        return Validations.check_if_exists(db.session.get(PurgeJob, purge_job_id), 'Purge job')
+
+    @staticmethod
+    def resume_jobs():
+        """
+        Ejecuta en el proceso actual las purgas pendientes, en curso (interrumpidas) o fallidas.
+
+        Returns:
+            int: Número de purgas ejecutadas.
+        """
+        job_ids = [job_id for (job_id,) in db.session.query(PurgeJob.purge_job_id)
+                   .filter(PurgeJob.status.in_(ACTIVE_STATUSES + ('failed',))).order_by(PurgeJob.purge_job_id)]
+        db.session.commit()
+        for job_id in job_ids:
+            PurgeService.run_job(job_id)
+        return len(job_ids)
@@ -0,0 +1,138 @@
+from flask import current_app
+from app import db, shard_router
+from app.models.assignment_model import Assignment
+from app.models.assignment_stats_model import AssignmentStats
+from app.models.completed_date_model import CompletedDate
+from app.models.habit_model import Habit
+from app.models.user_identity_model import UserIdentity
+from app.models.user_model import User
+from app.utils.bulk import Bulk
+
+class ShardService:
+    """
+    Servicio para mantener el reparto de los datos entre los shards por usuario.
+
+    Un usuario vive en el shard `(user_id - 1) % número de shards` junto con sus asignaciones, sus resúmenes de
+    estadísticas y sus fechas completadas, y el catálogo de hábitos está copiado en todos los shards. Al activar
+    los shards sobre una base de datos existente (todos los datos en el shard 0), o al cambiar el número de shards,
+    `rebalance` copia los hábitos que falten, mueve cada usuario al shard que le corresponde y reserva en la tabla
+    global del shard 0 los nicknames y los emails que falten.
+    """
+
+    @staticmethod
+    def rebalance(batch_size=None):
+        """
+        Copia los hábitos que falten en cada shard, mueve los usuarios que están fuera de su shard y reserva en
+        `user_identities` los nicknames y los emails de los usuarios que no los tengan reservados.
+
+        Los usuarios se mueven por lotes con sus filas dependientes, conservando sus IDs. Cada lote se confirma
+        primero en el shard de destino y después se elimina del de origen (sin commit en dos fases): si el proceso
+        se interrumpe entre ambos pasos, el lote queda en los dos shards y la siguiente ejecución lo vuelve a mover.
+
+        Args:
+            batch_size (int): Usuarios por lote, por defecto BULK_CHUNK_SIZE.
+
+        Returns:
+            dict: Número de hábitos copiados ('habits'), de usuarios movidos ('users') y de usuarios cuyo nickname
+                  y email se reservaron ('identities').
+
+        Raises:
+            IntegrityError: Si dos usuarios de shards distintos tienen el mismo nickname o el mismo email.
+        """
+        batch_size = batch_size or current_app.config['BULK_CHUNK_SIZE']
+        copied, moved, reserved = 0, 0, 0
+        if not shard_router.enabled:
+            return {'habits': copied, 'users': moved, 'identities': reserved}
+
+        # 1. El catálogo de hábitos del shard 0 se copia, con los mismos IDs, en los shards en los que falte
+        habits = Habit.__table__
+        shard_router.use(0)
+        catalog = [dict(row) for row in db.session.execute(db.select(habits)).mappings()]
+        for _ in shard_router.each(range(1, shard_router.count)):
+            present = set(db.session.scalars(db.select(habits.c.habit_id)))
+            missing = [row for row in catalog if row['habit_id'] not in present]
+            for chunk in Bulk.chunked(missing, batch_size):
+                db.session.execute(db.insert(habits), chunk)
+            db.session.commit()
+            copied += len(missing)
+
+        # 2. Los usuarios de cada shard cuyo ID corresponde a otro shard se mueven por lotes
+        users = User.__table__
+        for source in range(shard_router.count):
+            while True:
+                shard_router.use(source)
+                user_ids = db.session.scalars(
+                    db.select(users.c.user_id).where((users.c.user_id - 1) % shard_router.count != source)
+                    .order_by(users.c.user_id).limit(batch_size)).all()
+                if not user_ids:
+                    break
+                targets = {}
+                for user_id in user_ids:
+                    targets.setdefault(shard_router.shard_for(user_id), []).append(user_id)
+                for target, target_ids in targets.items():
+                    ShardService.move_users(source, target, target_ids, batch_size)
+                moved += len(user_ids)
+
+        # 3. Los usuarios registrados antes de que existiera la tabla global (por ejemplo, en otros shards) reservan
+        #    en ella su nickname y su email, por lotes
+        identities = UserIdentity.__table__
+        for shard in range(shard_router.count):
+            last_id = 0
+            while True:
+                shard_router.use(shard)
+                rows = [dict(row) for row in db.session.execute(
+                    db.select(users.c.user_id, users.c.nickname, users.c.email).where(users.c.user_id > last_id)
+                    .order_by(users.c.user_id).limit(batch_size)).mappings()]
+                if not rows:
+                    break
+                last_id = rows[-1]['user_id']
+                shard_router.use(0)
+                present = set(db.session.scalars(db.select(identities.c.user_id)
+                                                 .where(identities.c.user_id.in_([row['user_id'] for row in rows]))))
+                missing = [row for row in rows if row['user_id'] not in present]
+                if missing:
+                    db.session.execute(db.insert(identities), missing)
+                db.session.commit()
+                reserved += len(missing)
+        shard_router.use(0)
+        return {'habits': copied, 'users': moved, 'identities': reserved}
+
+    @staticmethod
+    def move_users(source, target, user_ids, batch_size):
+        """
+        Mueve usuarios de un shard a otro con sus asignaciones, sus resúmenes y sus fechas completadas.
+
+        Args:
+            source (int): Shard en el que están los usuarios.
+            target (int): Shard al que se mueven.
+            user_ids (list): IDs de los usuarios.
+            batch_size (int): Filas por sentencia de inserción.
+
+        Returns:
+            None
+        """
+        users = User.__table__
+        assignment_ids = db.select(Assignment.assignment_id).where(Assignment.fk_user_id.in_(user_ids))
+        # En el orden de las claves foráneas: cada tabla se inserta después de las que referencia
+        copies = (
+            (users, users.c.user_id.in_(user_ids)),
+            (Assignment.__table__, Assignment.fk_user_id.in_(user_ids)),
+            (AssignmentStats.__table__, AssignmentStats.assignment_id.in_(assignment_ids)),
+            (CompletedDate.__table__, CompletedDate.fk_assignment_id.in_(assignment_ids)),
+        )
+        shard_router.use(source)
+        rows = [(table, [dict(row) for row in db.session.execute(db.select(table).where(condition)).mappings()])
+                for table, condition in copies]
+
+        # Las copias que dejó un lote interrumpido se eliminan (en cascada) antes de insertar de nuevo
+        shard_router.use(target)
+        db.session.execute(db.delete(users).where(users.c.user_id.in_(user_ids)))
+        for table, table_rows in rows:
+            for chunk in Bulk.chunked(table_rows, batch_size):
+                db.session.execute(db.insert(table), chunk)
+        db.session.commit()
+
+        # Con el destino confirmado, un único DELETE en el origen elimina en cascada las filas dependientes
+        shard_router.use(source)
+        db.session.execute(db.delete(users).where(users.c.user_id.in_(user_ids)))
+        db.session.commit()
@@ -0,0 +1,401 @@
+from datetime import date, timedelta
+from flask import current_app
+from app import db, shard_router
+from app.models.assignment_model import Assignment
+from app.models.assignment_stats_model import AssignmentStats
+from app.models.completed_date_model import CompletedDate
+from app.utils.bulk import Bulk
+from app.utils.exceptions import InvalidDataError
+from app.utils.sql_functions import day_number, weekday
+from app.utils.validations import Validations
+
+WEEKDAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+
+class StatsService:
+    """
+    Servicio para calcular y mantener las estadísticas de cumplimiento de los hábitos asignados.
+
+    El resumen de cada asignación (última fecha, rachas, totales y conteos por día de la semana) se guarda
+    en la tabla `assignment_stats` y se actualiza en la misma transacción que registra o elimina fechas:
+    añadir una fecha posterior a la última es O(1); las fechas intermedias y las eliminaciones que pueden
+    partir una racha recalculan el resumen de esa asignación en SQL.
+
+    Las rachas se recalculan con funciones de ventana (gaps-and-islands): en una racha de días consecutivos,
+    `número de día - ROW_NUMBER()` es constante, así que cada racha es un grupo.
+    """
+
+    @staticmethod
+    def get_assignment_stats(assignment_id, window_days=None):
+        """
+        Obtener las estadísticas de una asignación.
+
+        Args:
+            assignment_id (int): ID de la asignación.
+            window_days (int | str): Número de días (hasta hoy) sobre los que se calcula la tasa de cumplimiento.
+
+        Returns:
+            dict: Racha actual, racha más larga, última fecha, total de fechas, tasa de cumplimiento
+                  en la ventana y número de fechas por día de la semana.
+
+        Raises:
+            NotFoundError: Si la asignación no existe.
+            InvalidDataError: Si la ventana no es válida.
+        """
+        window_days = StatsService.get_window_days(window_days)
+        shard_router.use_for_key(Assignment.assignment_id, assignment_id)
+        exists = db.session.query(db.exists().where(Assignment.assignment_id == assignment_id)).scalar()
+        Validations.check_if_exists(exists, 'Assignment')
+        return StatsService.read_stats([assignment_id], window_days)[0]
+
+    @staticmethod
+    def get_user_stats(fk_user_id, window_days=None):
+        """
+        Obtener las estadísticas de todas las asignaciones de un usuario y su resumen agregado.
+
+        Args:
+            fk_user_id (int): ID del usuario.
+            window_days (int | str): Número de días (hasta hoy) sobre los que se calcula la tasa de cumplimiento.
+
+        Returns:
+            dict: Resumen del usuario ('totals') y estadísticas de cada asignación ('assignments').
+
+        Raises:
+            NotFoundError: Si el usuario no tiene asignaciones.
+            InvalidDataError: Si la ventana no es válida.
+        """
+        window_days = StatsService.get_window_days(window_days)
+        shard_router.use_for_user(fk_user_id)
+        assignment_ids = [assignment_id for (assignment_id,) in
+                          db.session.query(Assignment.assignment_id).filter_by(fk_user_id=fk_user_id).order_by(Assignment.assignment_id)]
+        Validations.check_if_exists(assignment_ids, 'Assignment')
+        assignments = StatsService.read_stats(assignment_ids, window_days)
+
+        # El resumen se agrega sobre las filas ya agregadas por asignación, no sobre las fechas
+        totals = {
+            'total_count': sum(stats['total_count'] for stats in assignments),
+            'window_count': sum(stats['window_count'] for stats in assignments),
+            'best_current_streak': max(stats['current_streak'] for stats in assignments),
+            'longest_streak': max(stats['longest_streak'] for stats in assignments),
+            'last_completed': max((stats['last_completed'] for stats in assignments if stats['last_completed']), default=None),
+            'weekday_counts': {day: sum(stats['weekday_counts'][day] for stats in assignments) for day in WEEKDAYS},
+        }
+        totals['completion_rate'] = round(totals['window_count'] / (window_days * len(assignments)), 4)
+        return {'user_id': fk_user_id, 'window_days': window_days, 'totals': totals, 'assignments': assignments}
+
+    @staticmethod
+    def get_window_days(window_days):
+        """
+        Normaliza la ventana de días solicitada según la configuración de la aplicación.
+
+        Args:
+            window_days (int | str): Ventana solicitada (tal como llega en la query string),
+                                     None para usar STATS_DEFAULT_WINDOW_DAYS.
+
+        Returns:
+            int: Ventana entre 1 y STATS_MAX_WINDOW_DAYS días.
+
+        Raises:
+            InvalidDataError: Si la ventana no es un entero o está fuera de rango.
+        """
+        if window_days is None:
+            return current_app.config['STATS_DEFAULT_WINDOW_DAYS']
+        max_window = current_app.config['STATS_MAX_WINDOW_DAYS']
+        try:
+            window_days = int(window_days)
+        except ValueError:
+            raise InvalidDataError(f'The window parameter must be between 1 and {max_window} days.')
+        if not 1 <= window_days <= max_window:
+            raise InvalidDataError(f'The window parameter must be between 1 and {max_window} days.')
+        return window_days
+
+    @staticmethod
+    def read_stats(assignment_ids, window_days, today=None):
+        """
+        Lee las estadísticas de varias asignaciones desde la tabla materializada.
+
+        Por cada bloque de asignaciones se lee una fila de resumen por asignación y se cuentan las fechas
+        de la ventana con una búsqueda por rango en el índice (fk_assignment_id, completed_date).
+        Las asignaciones sin resumen (por ejemplo, antes de ejecutar `flask stats rebuild`) se calculan en SQL.
+
+        Args:
+            assignment_ids (list): IDs de las asignaciones.
+            window_days (int): Días de la ventana de la tasa de cumplimiento.
+            today (date): Fecha de referencia, por defecto hoy.
+
+        Returns:
+            list: Estadísticas de cada asignación, en el mismo orden que `assignment_ids`.
+        """
+        today = today or date.today()
+        window_start = today - timedelta(days=window_days - 1)
+        results = {}
+
+        for chunk in Bulk.chunked(assignment_ids, current_app.config['BULK_CHUNK_SIZE']):
+            summaries = {stats.assignment_id: StatsService.to_summary(stats)
+                         for stats in AssignmentStats.query.filter(AssignmentStats.assignment_id.in_(chunk))}
+            missing = [assignment_id for assignment_id in chunk if assignment_id not in summaries]
+            if missing:
+                summaries.update(StatsService.compute_summaries(missing))
+
+            window_counts = dict(
+                db.session.query(CompletedDate.fk_assignment_id, db.func.count())
+                .filter(CompletedDate.fk_assignment_id.in_(chunk),
+                        CompletedDate.completed_date.between(window_start, today))
+                .group_by(CompletedDate.fk_assignment_id))
+
+            for assignment_id in chunk:
+                summary = summaries[assignment_id]
+                last_completed = summary['last_completed']
+                window_count = int(window_counts.get(assignment_id, 0))
+                results[assignment_id] = {
+                    'assignment_id': assignment_id,
+                    'total_count': summary['total_count'],
+                    # La racha guardada termina en la última fecha; deja de estar vigente si se salta más de un día
+                    'current_streak': summary['current_streak'] if last_completed and last_completed >= today - timedelta(days=1) else 0,
+                    'longest_streak': summary['longest_streak'],
+                    'last_completed': last_completed,
+                    'window_days': window_days,
+                    'window_count': window_count,
+                    'completion_rate': round(window_count / window_days, 4),
+                    'weekday_counts': summary['weekday_counts'],
+                }
+
+        return [results[assignment_id] for assignment_id in assignment_ids]
+
+    @staticmethod
+    def lock_stats(assignment_ids):
+        """
+        Bloquea (SELECT ... FOR UPDATE) los resúmenes de varias asignaciones antes de modificar sus fechas.
+
+        Debe ser la primera consulta de la transacción: así las escrituras concurrentes sobre la misma
+        asignación se serializan y, en MySQL, la instantánea de las lecturas posteriores ya incluye
+        las fechas confirmadas por la transacción anterior.
+
+        Args:
+            assignment_ids (list): IDs de las asignaciones.
+
+        Returns:
+            dict: {assignment_id: AssignmentStats} con los resúmenes existentes.
+        """
+        locked = {}
+        for chunk in Bulk.chunked(sorted(set(assignment_ids)), current_app.config['BULK_CHUNK_SIZE']):
+            for stats in AssignmentStats.query.filter(AssignmentStats.assignment_id.in_(chunk)).with_for_update():
+                locked[stats.assignment_id] = stats
+        return locked
+
+    @staticmethod
+    def record_completions(locked, dates_by_assignment):
+        """
+        Actualiza los resúmenes tras registrar fechas nuevas, dentro de la transacción actual.
+
+        Las fechas nuevas ya deben estar enviadas a la base de datos (flush). Si todas son posteriores a la
+        última fecha del resumen se aplican en O(1) por fecha; en otro caso se recalcula la asignación.
+
+        Args:
+            locked (dict): Resúmenes bloqueados con `lock_stats`.
+            dates_by_assignment (dict): {assignment_id: [fechas registradas]}.
+
+        Returns:
+            None
+        """
+        recompute = []
+        for assignment_id, completed_dates in dates_by_assignment.items():
+            stats = locked.get(assignment_id)
+            completed_dates = sorted(completed_dates)
+            if stats is None or (stats.last_completed is not None and completed_dates[0] <= stats.last_completed):
+                recompute.append(assignment_id)
+                continue
+            for completed_date in completed_dates:
+                if stats.last_completed is not None and completed_date == stats.last_completed + timedelta(days=1):
+                    stats.current_streak += 1
+                else:
+                    stats.current_streak = 1
+                stats.last_completed = completed_date
+                stats.longest_streak = max(stats.longest_streak, stats.current_streak)
+                stats.total_count += 1
+                StatsService._add_weekday(stats, completed_date, 1)
+        if recompute:
+            StatsService.refresh_stats(recompute, locked)
+
+    @staticmethod
+    def record_removal(locked, assignment_id, completed_date):
+        """
+        Actualiza el resumen tras eliminar una fecha, dentro de la transacción actual.
+
+        La eliminación ya debe estar enviada a la base de datos (flush). Quitar la última fecha de una racha
+        que no es la más larga se aplica en O(1); cualquier otro caso puede partir una racha y recalcula la asignación.
+
+        Args:
+            locked (dict): Resúmenes bloqueados con `lock_stats`.
+            assignment_id (int): ID de la asignación.
+            completed_date (date): Fecha eliminada.
+
+        Returns:
+            None
+        """
+        stats = locked.get(assignment_id)
+        if (stats is not None and completed_date == stats.last_completed
+                and 1 < stats.current_streak < stats.longest_streak):
+            stats.current_streak -= 1
+            stats.last_completed = completed_date - timedelta(days=1)
+            stats.total_count -= 1
+            StatsService._add_weekday(stats, completed_date, -1)
+        else:
+            StatsService.refresh_stats([assignment_id], locked)
+
+    @staticmethod
+    def refresh_stats(assignment_ids, locked=None):
+        """
+        Recalcula en SQL los resúmenes de varias asignaciones y los guarda en la sesión (sin confirmar).
+
+        Args:
+            assignment_ids (list): IDs de las asignaciones.
+            locked (dict): Resúmenes ya cargados (y bloqueados); los que falten se crean.
+
+        Returns:
+            None
+        """
+        locked = {} if locked is None else locked
+        summaries = StatsService.compute_summaries(assignment_ids)
+        for assignment_id in assignment_ids:
+            stats = locked.get(assignment_id)
+            if stats is None:
+                stats = locked[assignment_id] = AssignmentStats(assignment_id)
+                db.session.add(stats)
+            summary = summaries[assignment_id]
+            stats.last_completed = summary['last_completed']
+            stats.current_streak = summary['current_streak']
+            stats.longest_streak = summary['longest_streak']
+            stats.total_count = summary['total_count']
+            for day in WEEKDAYS:
+                setattr(stats, f'{day}_count', summary['weekday_counts'][day])
+
+    @staticmethod
+    def rebuild_stats(chunk_size=None):
+        """
+        Reconstruye desde cero la tabla `assignment_stats` a partir de las fechas registradas.
+
+        Recorre las asignaciones de cada shard por bloques, bloquea sus resúmenes, los recalcula y confirma
+        cada bloque en su propia transacción, por lo que puede ejecutarse con la aplicación en servicio.
+
+        Args:
+            chunk_size (int): Asignaciones por bloque, por defecto BULK_CHUNK_SIZE.
+
+        Returns:
+            int: Número de asignaciones procesadas.
+        """
+        chunk_size = chunk_size or current_app.config['BULK_CHUNK_SIZE']
+        processed = 0
+        for _ in shard_router.each():
+            # Los resúmenes de asignaciones que ya no existen se descartan
+            db.session.execute(db.delete(AssignmentStats).where(
+                ~db.exists().where(Assignment.assignment_id == AssignmentStats.assignment_id)))
+            db.session.commit()
+
+            last_id = 0
+            while True:
+                chunk = [assignment_id for (assignment_id,) in
+                         db.session.query(Assignment.assignment_id).filter(Assignment.assignment_id > last_id)
+                         .order_by(Assignment.assignment_id).limit(chunk_size)]
+                if not chunk:
+                    break
+                db.session.commit()  # La consulta de IDs no debe fijar la instantánea de la transacción del bloque
+                StatsService.refresh_stats(chunk, StatsService.lock_stats(chunk))
+                db.session.commit()
+                processed += len(chunk)
+                last_id = chunk[-1]
+        return processed
+
+    @staticmethod
+    def to_summary(stats):
+        """
+        Convierte una fila de `assignment_stats` en un diccionario de resumen.
+
+        Args:
+            stats (AssignmentStats): Resumen materializado.
+
+        Returns:
+            dict: Resumen con las mismas claves que `compute_summaries`.
+        """
+        return {
+            'last_completed': stats.last_completed,
+            'current_streak': stats.current_streak,
+            'longest_streak': stats.longest_streak,
+            'total_count': stats.total_count,
+            'weekday_counts': {day: getattr(stats, f'{day}_count') for day in WEEKDAYS},
+        }
+
+    @staticmethod
+    def compute_summaries(assignment_ids):
+        """
+        Calcula en SQL el resumen de varias asignaciones a partir de todas sus fechas.
+
+        Usa dos consultas por bloque de asignaciones: una para las rachas y los totales
+        y otra para los conteos por día de la semana.
+
+        Args:
+            assignment_ids (list): IDs de las asignaciones.
+
+        Returns:
+            dict: {assignment_id: resumen}. 'current_streak' es la racha que termina en 'last_completed'.
+        """
+        summaries = {assignment_id: {
+            'last_completed': None, 'current_streak': 0, 'longest_streak': 0, 'total_count': 0,
+            'weekday_counts': {day: 0 for day in WEEKDAYS},
+        } for assignment_id in assignment_ids}
+
+        for chunk in Bulk.chunked(assignment_ids, current_app.config['BULK_CHUNK_SIZE']):
+            for row in db.session.execute(StatsService._streaks_statement(chunk)):
+                summaries[row.assignment_id].update({
+                    'last_completed': row.last_completed,
+                    'current_streak': int(row.current_streak),
+                    'longest_streak': int(row.longest_streak),
+                    'total_count': int(row.total_count),
+                })
+            weekday_statement = (
+                db.select(CompletedDate.fk_assignment_id, weekday(CompletedDate.completed_date).label('weekday'), db.func.count())
+                .where(CompletedDate.fk_assignment_id.in_(chunk))
+                .group_by(CompletedDate.fk_assignment_id, 'weekday'))
+            for assignment_id, day, count in db.session.execute(weekday_statement):
+                summaries[assignment_id]['weekday_counts'][WEEKDAYS[int(day)]] = int(count)
+
+        return summaries
+
+    @staticmethod
+    def _streaks_statement(assignment_ids):
+        # 1. Cada fecha con su grupo de racha: número de día - posición de la fecha dentro de la asignación
+        islands = (
+            db.select(
+                CompletedDate.fk_assignment_id.label('assignment_id'),
+                CompletedDate.completed_date.label('completed_date'),
+                (day_number(CompletedDate.completed_date) - db.func.row_number().over(
+                    partition_by=CompletedDate.fk_assignment_id,
+                    order_by=CompletedDate.completed_date)).label('streak_group'))
+            .where(CompletedDate.fk_assignment_id.in_(assignment_ids))
+            .subquery('islands'))
+
+        # 2. Una fila por racha con su longitud, su último día y el último día de la asignación
+        streak_end = db.func.max(islands.c.completed_date)
+        streaks = (
+            db.select(
+                islands.c.assignment_id,
+                db.func.count().label('length'),
+                streak_end.label('streak_end'),
+                db.func.max(streak_end).over(partition_by=islands.c.assignment_id).label('last_completed'))
+            .group_by(islands.c.assignment_id, islands.c.streak_group)
+            .subquery('streaks'))
+
+        # 3. Una fila por asignación; la racha actual es la que termina en la última fecha
+        return (
+            db.select(
+                streaks.c.assignment_id,
+                db.func.sum(streaks.c.length).label('total_count'),
+                db.func.max(streaks.c.length).label('longest_streak'),
+                db.func.max(db.case((streaks.c.streak_end == streaks.c.last_completed, streaks.c.length), else_=0)).label('current_streak'),
+                db.func.max(streaks.c.last_completed).label('last_completed'))
+            .group_by(streaks.c.assignment_id))
+
+    @staticmethod
+    def _add_weekday(stats, completed_date, amount):
+        # Suma (o resta) una fecha al contador de su día de la semana
+        column = f'{WEEKDAYS[completed_date.weekday()]}_count'
+        setattr(stats, column, getattr(stats, column) + amount)
@@ -0,0 +1,95 @@
+import logging
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models.table_version_model import TableVersion
+from app.utils.replicas import RoutingSession
+
+logger = logging.getLogger(__name__)
+
+# Clave de `session.info` con las tablas modificadas en la transacción actual
+PENDING_BUMPS = 'table_version_bumps'
+
+class TableVersionService:
+    """
+    Servicio para gestionar los contadores de versión por tabla usados en las peticiones condicionales (ETag).
+    """
+
+    @staticmethod
+    def bump(*table_names):
+        """
+        Incrementa la versión de las tablas indicadas cuando se confirme la transacción actual.
+
+        La escritura solo anota las tablas en la sesión; tras el commit, `_apply_bumps` las incrementa en una
+        transacción propia y corta del shard 0, así la fila del contador no queda bloqueada durante la escritura
+        (en InnoDB el bloqueo duraría hasta el commit y los escritores de una tabla irían de uno en uno) y la
+        versión nunca cambia antes que los datos. Si la transacción se revierte, las tablas anotadas se descartan.
+
+        Args:
+            *table_names (str): Nombres de las tablas modificadas.
+
+        Returns:
+            None
+        """
+        db.session.info.setdefault(PENDING_BUMPS, set()).update(table_names)
+
+    @staticmethod
+    def get_versions(table_names):
+        """
+        Obtiene la versión actual de varias tablas con una sola consulta por clave primaria.
+
+        Args:
+            table_names (tuple): Nombres de las tablas.
+
+        Returns:
+            dict: Diccionario {tabla: versión}; las tablas sin contador tienen versión 0.
+        """
+        rows = db.session.query(TableVersion.table_name, TableVersion.version).filter(TableVersion.table_name.in_(table_names))
+        versions = {name: 0 for name in table_names}
+        versions.update({name: version for name, version in rows})
+        return versions
+
+    @staticmethod
+    def increment(connection, table_names):
+        """
+        Incrementa la versión de varias tablas con la conexión indicada.
+
+        Args:
+            connection (Connection): Conexión al shard 0, dentro de una transacción.
+            table_names (set): Nombres de las tablas.
+
+        Returns:
+            None
+        """
+        table = TableVersion.__table__
+        increment = db.update(table).where(table.c.table_name.in_(table_names)).values(version=table.c.version + 1)
+        if connection.execute(increment).rowcount == len(table_names):
+            return
+        # Las tablas sin contador (por ejemplo en una base creada sin migraciones) empiezan en la versión 1
+        existing = set(connection.scalars(db.select(table.c.table_name).where(table.c.table_name.in_(table_names))))
+        for name in table_names - existing:
+            try:
+                with connection.begin_nested():
+                    connection.execute(db.insert(table).values(table_name=name, version=1))
+            except IntegrityError:
+                # Otro proceso creó el contador a la vez
+                connection.execute(increment.where(table.c.table_name == name))
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _apply_bumps(session):
+    table_names = session.info.pop(PENDING_BUMPS, None)
+    if not table_names:
+        return
+    try:
+        with db.engines[None].begin() as connection:
+            TableVersionService.increment(connection, table_names)
+    except Exception:
+        # Los datos ya están confirmados: sin el incremento, los ETags y la caché de esas tablas siguen en la
+        # versión anterior hasta la siguiente escritura
+        logger.exception('Could not bump table versions of %s', sorted(table_names))
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _discard_bumps(session):
+    session.info.pop(PENDING_BUMPS, None)
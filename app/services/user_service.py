@@ -1,6 +1,12 @@
-from app import db, bcrypt
+from app import db, password_hasher, cache, shard_router
 from app.models.user_model import User
+from app.models.user_identity_model import UserIdentity
+from app.services.table_version_service import TableVersionService
+from app.services.purge_service import PurgeService
 from app.utils.validations import Validations
+from app.utils.mutations import Mutations
+from app.utils.serializers import Serializer
+from app.utils.expansions import Expansion
 
 class UserService:
     """
@@ -25,30 +31,48 @@ class UserService:
 
         Raises:
             ValueError: Si el 'nickname' o el 'email' ya existen en la base de datos.
+            ServiceUnavailableError: Si el pool de hashes de contraseñas está saturado.
         """
-        # Verificando si el nickname ya existe
-        Validations.check_field_existence(User.nickname, nickname, 'Nickname')
-        # Verificando si el email ya existe
-        Validations.check_field_existence(User.email, email, 'Email')
-        # Generando un hash seguro de la contraseña con bcrypt
-        hashed_password = bcrypt.generate_password_hash(user_password).decode('utf-8')
+        # Verificando en una sola consulta a la tabla global del shard 0 que ni el nickname ni el email existan
+        for _ in shard_router.each([0]):
+            Validations.check_all(
+                Validations.field_check(UserIdentity.nickname, nickname, 'Nickname'),
+                Validations.field_check(UserIdentity.email, email, 'Email'))
+        # Generando un hash seguro de la contraseña con bcrypt, fuera del hilo de la petición
+        hashed_password = password_hasher.generate_password_hash(user_password)
         # Crear un nuevo usuario con la contraseña hasheada y los demás datos proporcionados
         user = User(first_name, last_name, nickname, email, user_password=hashed_password)
-        # Añadir el nuevo usuario a la base de datos
+        # Añadir el nuevo usuario a la base de datos, en el shard que le toque por turnos, y reservar con su ID el
+        # nickname y el email en la tabla global (sus restricciones UNIQUE cubren los registros concurrentes de
+        # todos los shards)
+        shard_router.use(shard_router.new_shard())
         db.session.add(user)
-        db.session.commit()
+        Validations.flush_session('user')
+        db.session.add(UserIdentity(user.user_id, nickname, email))
+        TableVersionService.bump('users')
+        Validations.commit_session('user')
         return user
 
     @staticmethod
-    def get_all_users():
+    def get_all_users(after=None, before=None, limit=None, fields=None):
         """
-        Obtiene todos los usuarios registrados en la base de datos.
+        Obtiene una página de los usuarios registrados en la base de datos.
+
+        Args:
+            after (str): Cursor a partir del cual se obtiene la página siguiente.
+            before (str): Cursor antes del cual se obtiene la página anterior.
+            limit (int): Tamaño de página solicitado.
+            fields (list): Campos solicitados; el SELECT se restringe a sus columnas (None para todas).
 
         Returns:
-            List[User]: Una lista con todos los usuarios registrados.
+            Page: Una página de usuarios ordenados por su ID.
+
+        Raises:
+            InvalidDataError: Si los parámetros de paginación no son válidos.
         """
-        # Retorna todos los registros de la tabla User
-        return User.query.all()
+        # Retorna una página de la tabla User paginada por la clave primaria (de todos los shards, en paralelo)
+        return shard_router.paginate(lambda session: Serializer.narrow_query(session.query(User), User, fields),
+                                     User.user_id, after, before, limit)
 
     @staticmethod
     def get_user_by_user_id(user_id):
@@ -64,12 +88,51 @@ class UserService:
         Raises:
             ValueError: Si el usuario no existe.
         """
-        # Buscar al usuario por su ID
+        # Buscar al usuario por su ID en su shard
+        shard_router.use_for_user(user_id)
         user = User.query.filter_by(user_id=user_id).first()
         # Validar si el usuario existe
         user_validated = Validations.check_if_exists(user, 'User')
         return user_validated
 
+    @staticmethod
+    def get_user_with_includes(user_id, includes):
+        """
+        Obtiene un usuario por su ID con sus relaciones expandidas cargadas por adelantado.
+
+        Args:
+            user_id (int): El ID del usuario que se desea obtener.
+            includes (tuple): Rutas de relación a cargar (por ejemplo 'assignments.completed_dates').
+
+        Returns:
+            User: El usuario con las relaciones solicitadas ya cargadas.
+
+        Raises:
+            ValueError: Si el usuario no existe.
+        """
+        # Una consulta por nivel de relación (selectinload), sin importar cuántas filas tenga cada nivel
+        shard_router.use_for_user(user_id)
+        user = User.query.options(*Expansion.load_options(User, includes)).filter_by(user_id=user_id).first()
+        return Validations.check_if_exists(user, 'User')
+
+    @staticmethod
+    def get_cached_user(user_id):
+        """
+        Obtiene los datos de un usuario a través de la caché de lectura.
+
+        Args:
+            user_id (int): El ID del usuario que se desea obtener.
+
+        Returns:
+            dict: Las columnas del usuario, sin la contraseña.
+
+        Raises:
+            ValueError: Si el usuario no existe.
+        """
+        # La contraseña encriptada nunca se guarda en la caché
+        return cache.get_or_load('user', user_id, lambda: cache.snapshot(
+            UserService.get_user_by_user_id(user_id), exclude=('user_password',)))
+
     @staticmethod
     def update_user(user_id, new_data):
         """
@@ -84,39 +147,61 @@ class UserService:
             None
 
         Raises:
-            ValueError: Si el 'nickname' o 'email' proporcionados ya existen en la base de datos.
-        """
-        # Buscar al usuario por su ID
-        user = UserService.get_user_by_user_id(user_id)
-        # Actualizar los datos según lo que se proporcione en 'new_data'
-        if 'first_name' in new_data:
-            user.first_name = new_data['first_name']
-        if 'last_name' in new_data:
-            user.last_name = new_data['last_name']
+            ValueError: Si el usuario no existe o si el 'nickname' o 'email' proporcionados ya existen en la base de datos.
+            ServiceUnavailableError: Si el pool de hashes de contraseñas está saturado.
+        """
+        # Verificar en una sola consulta a la tabla global del shard 0 que el nuevo nickname y el nuevo email no existan
+        checks = []
         if 'nickname' in new_data:
-            Validations.check_field_existence(User.nickname, new_data['nickname'], 'Nickname')
-            user.nickname = new_data['nickname']
+            checks.append(Validations.field_check(UserIdentity.nickname, new_data['nickname'], 'Nickname'))
         if 'email' in new_data:
-            Validations.check_field_existence(User.email, new_data['email'], 'Email')
-            user.email = new_data['email']
+            checks.append(Validations.field_check(UserIdentity.email, new_data['email'], 'Email'))
+        for _ in shard_router.each([0]):
+            Validations.check_all(*checks)
+        # Reunir los datos que se proporcionen en 'new_data'
+        values = {field: new_data[field] for field in ('first_name', 'last_name', 'nickname', 'email') if field in new_data}
         if 'user_password' in new_data:
-            user.user_password = bcrypt.generate_password_hash(new_data['user_password']).decode('utf-8')
-        # Guardar los cambios en la base de datos
-        db.session.commit()
+            values['user_password'] = password_hasher.generate_password_hash(new_data['user_password'])
+        # Actualizar el usuario con un único UPDATE en su shard (si no existe no se modifica ninguna fila), su reserva
+        # del nickname y el email en la tabla global, e invalidar la copia en caché
+        shard_router.use_for_user(user_id)
+        Mutations.update_by_id(User.user_id, user_id, values, 'User')
+        identity = {field: values[field] for field in ('nickname', 'email') if field in values}
+        if identity:
+            Validations.execute_statement(db.update(UserIdentity).where(UserIdentity.user_id == user_id).values(**identity), 'user')
+        cache.invalidate('user', user_id)
+        TableVersionService.bump('users')
+        Validations.commit_session('user')
 
     @staticmethod
     def delete_user(user_id):
         """
-        Elimina un usuario de la base de datos.
+        Elimina un usuario de la base de datos junto con sus asignaciones y sus fechas completadas.
+
+        Si el usuario tiene más de PURGE_THRESHOLD_ROWS filas dependientes, la eliminación se programa
+        como una purga en segundo plano.
 
         Args:
             user_id (int): El ID del usuario a eliminar.
 
         Returns:
-            None
+            PurgeJob: La purga programada; None si el usuario se eliminó directamente.
+
+        Raises:
+            ValueError: Si el usuario no se encuentra.
+        """
+        return PurgeService.delete_or_schedule('users', user_id)
+
+    @staticmethod
+    def stream_all_users(fields=None):
+        """
+        Obtiene una consulta que recorre todos los usuarios por lotes, para exportarlos en streaming.
+
+        Args:
+            fields (list): Campos solicitados; el SELECT se restringe a sus columnas (None para todas).
+
+        Returns:
+            Query | MergedStream: Consulta ordenada por ID que se lee con un cursor del lado del servidor
+                                  (con varios shards, la mezcla en orden de la de cada uno).
         """
-        # Buscar al usuario por su ID
-        user = UserService.get_user_by_user_id(user_id)
-        # Eliminar el usuario de la base de datos
-        db.session.delete(user)
-        db.session.commit()
+        return shard_router.stream(lambda session: Serializer.narrow_query(session.query(User), User, fields), User.user_id)
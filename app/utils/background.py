@@ -0,0 +1,56 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class BackgroundJobs():
+    """
+    Ejecuta tareas largas (por ejemplo las purgas de usuarios y hábitos) fuera de la petición, en un pool de hilos.
+
+    Cada tarea se ejecuta dentro de un contexto de aplicación propio, con su propia sesión de base de datos.
+    El estado de las tareas debe guardarse en la base de datos: si el proceso termina (por ejemplo al reciclar
+    un worker de gunicorn) las tareas pendientes se pierden y deben reanudarse desde la línea de comandos.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.workers = 1
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """
+        Lee la configuración del pool desde la aplicación Flask.
+
+        Args:
+            app (Flask): La aplicación configurada.
+        """
+        self.app = app
+        self.workers = max(1, app.config['PURGE_WORKERS'])
+
+    def _get_executor(self):
+        # Como el pool de hashes, se crea de forma perezosa en cada proceso para no heredar hilos a través de fork
+        if self._executor is None or self._executor_pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='background-job')
+            self._executor_pid = os.getpid()
+        return self._executor
+
+    def submit(self, func, *args):
+        """
+        Programa una tarea en el pool de hilos.
+
+        Args:
+            func (callable): Función a ejecutar; recibe `args` y se ejecuta con el contexto de la aplicación.
+            *args: Argumentos de la función.
+
+        Returns:
+            Future: El resultado futuro de la tarea.
+        """
+        with self._lock:
+            executor = self._get_executor()
+        return executor.submit(self._run, func, *args)
+
+    def _run(self, func, *args):
+        with self.app.app_context():
+            return func(*args)
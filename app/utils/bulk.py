@@ -0,0 +1,25 @@
+from itertools import islice
+
+
+class Bulk():
+    @staticmethod
+    def chunked(iterable, size):
+        """
+        Divide un iterable en bloques de tamaño fijo.
+
+        Se usa para limitar el número de parámetros de las cláusulas `IN` y de las filas
+        de cada sentencia `INSERT` en las operaciones masivas.
+
+        Args:
+            iterable (iterable): Elementos a dividir.
+            size (int): Número máximo de elementos por bloque.
+
+        Returns:
+            generator: Listas con a lo sumo `size` elementos.
+        """
+        iterator = iter(iterable)
+        while True:
+            chunk = list(islice(iterator, size))
+            if not chunk:
+                return
+            yield chunk
@@ -0,0 +1,297 @@
+import logging
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from sqlalchemy import event
+from .metrics import Counter
+from .replicas import RoutingSession, pinned_to_primary, reading_from_replica
+
+logger = logging.getLogger(__name__)
+
+# Clave de `session.info` con las entidades que se invalidan al confirmar la transacción actual
+PENDING_INVALIDATIONS = 'cache_invalidations'
+
+
+class MemoryCacheBackend():
+    """
+    Caché en memoria del proceso con expiración por TTL y desalojo LRU.
+
+    Cada worker tiene su propia copia, por lo que las invalidaciones solo afectan al proceso que las ejecuta;
+    con varios workers `Cache` no la usa y desactiva la caché (ver `Cache.init_app`).
+    """
+
+    def __init__(self, max_entries, default_ttl):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def add(self, key, value, ttl=None):
+        # Guarda el valor solo si la clave no existe (o ha expirado); devuelve si lo guardó
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] >= time.monotonic():
+                return False
+            self._store(key, value, ttl)
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def _store(self, key, value, ttl):
+        self._entries[key] = (value, time.monotonic() + (ttl or self.default_ttl))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def size(self):
+        return len(self._entries)
+
+
+class RedisCacheBackend():
+    """
+    Caché compartida entre procesos sobre cualquier servidor compatible con el protocolo de Redis.
+
+    Requiere el paquete opcional `redis`. Los valores se serializan con pickle, por lo que el servidor
+    debe ser de uso exclusivo de la aplicación. Los errores de conexión se tratan como fallos de caché.
+    """
+
+    def __init__(self, url, default_ttl, key_prefix='crud:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('CACHE_BACKEND=redis requires the "redis" package to be installed.')
+        self.client = redis.Redis.from_url(url)
+        self.default_ttl = default_ttl
+        self.key_prefix = key_prefix
+
+    def get(self, key):
+        try:
+            value = self.client.get(self.key_prefix + key)
+        except Exception:
+            logger.warning('Cache backend unavailable, reading %s from the database', key, exc_info=True)
+            return None
+        return pickle.loads(value) if value is not None else None
+
+    def set(self, key, value, ttl=None):
+        try:
+            self.client.set(self.key_prefix + key, pickle.dumps(value), ex=int(ttl or self.default_ttl))
+        except Exception:
+            logger.warning('Cache backend unavailable, %s was not cached', key, exc_info=True)
+
+    def add(self, key, value, ttl=None):
+        try:
+            return bool(self.client.set(self.key_prefix + key, pickle.dumps(value), ex=int(ttl or self.default_ttl), nx=True))
+        except Exception:
+            logger.warning('Cache backend unavailable, %s was not cached', key, exc_info=True)
+            return False
+
+    def delete(self, key):
+        try:
+            self.client.delete(self.key_prefix + key)
+        except Exception:
+            logger.warning('Cache backend unavailable, %s could not be invalidated', key, exc_info=True)
+
+    def size(self):
+        return None
+
+
+class NullCacheBackend():
+    """Backend que no almacena nada; desactiva la caché sin cambiar el código de los servicios."""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def add(self, key, value, ttl=None):
+        return False
+
+    def delete(self, key):
+        pass
+
+    def size(self):
+        return 0
+
+
+class Cache():
+    """
+    Caché de lectura (read-through) para las consultas de una sola entidad.
+
+    El backend se elige con CACHE_BACKEND ('memory', 'redis' o 'null'). Los servicios guardan una copia
+    de las columnas de la entidad (nunca el objeto ORM, que está ligado a la sesión) y la invalidan
+    en sus métodos de escritura.
+
+    Cada entidad tiene en el backend una versión propia (un token aleatorio) que cambia al invalidarla, y cada
+    entrada guarda la versión con la que se leyó: una escritura solo expira su entidad, y una lectura que empezó
+    antes de que la escritura se confirmara no puede volver a guardar la fila vieja. Las invalidaciones pedidas
+    dentro de una transacción se aplican al confirmarla, antes de incrementar las versiones de las tablas, así
+    ninguna petición recibe el cuerpo viejo con el ETag nuevo.
+    """
+
+    def __init__(self):
+        self.backend = NullCacheBackend()
+        self.session = None
+        self.hits = Counter('cache_hits_total', 'Lecturas servidas desde la caché', labelnames=('entity',))
+        self.misses = Counter('cache_misses_total', 'Lecturas que tuvieron que consultar la base de datos', labelnames=('entity',))
+        self.invalidations = Counter('cache_invalidations_total', 'Entradas invalidadas por escrituras', labelnames=('entity',))
+
+    def init_app(self, app):
+        """
+        Crea el backend de la caché según la configuración de la aplicación.
+
+        Args:
+            app (Flask): La aplicación configurada.
+        """
+        backend = app.config['CACHE_BACKEND']
+        if backend == 'memory' and app.config['WEB_CONCURRENCY'] > 1:
+            # Las invalidaciones de una caché por proceso no llegan al resto de los workers
+            logger.warning('CACHE_BACKEND=memory is per process and WEB_CONCURRENCY is %s: the cache is disabled, '
+                           'use CACHE_BACKEND=redis to share it between workers', app.config['WEB_CONCURRENCY'])
+            backend = 'null'
+        if backend == 'memory':
+            self.backend = MemoryCacheBackend(app.config['CACHE_MAX_ENTRIES'], app.config['CACHE_DEFAULT_TTL'])
+        elif backend == 'redis':
+            self.backend = RedisCacheBackend(app.config['CACHE_REDIS_URL'], app.config['CACHE_DEFAULT_TTL'])
+        elif backend == 'null':
+            self.backend = NullCacheBackend()
+        else:
+            raise ValueError(f'Unsupported CACHE_BACKEND: {backend}')
+
+    def register(self, session):
+        """
+        Guarda la sesión de la aplicación y aplica las invalidaciones pendientes al confirmar cada transacción.
+
+        El evento se registra al principio de la lista (`insert=True`), antes del incremento de las versiones de
+        las tablas de `TableVersionService`.
+
+        Args:
+            session (scoped_session): Sesión de la aplicación (`db.session`).
+        """
+        self.session = session
+        if not event.contains(RoutingSession, 'after_commit', self._apply_invalidations):
+            event.listen(RoutingSession, 'after_commit', self._apply_invalidations, insert=True)
+            event.listen(RoutingSession, 'after_rollback', self._discard_invalidations)
+
+    def get_or_load(self, entity, entity_id, loader, ttl=None):
+        """
+        Obtiene una entidad de la caché o la carga con `loader` y la guarda.
+
+        Solo se sirve una entrada guardada con la versión actual de la entidad, que se lee antes de llamar a
+        `loader`: si la entidad se invalida mientras se carga, el valor guardado queda inaccesible.
+
+        Un cliente que acaba de escribir (fijado al primario) no lee la caché: la carga del primario y la guarda.
+        Las lecturas de una réplica pueden usar las entradas guardadas, pero no guardan lo que cargan: la entrada
+        sobreviviría al tiempo fijado al primario con un valor anterior a la escritura del cliente.
+
+        Args:
+            entity (str): Tipo de entidad, usado en la clave y en las métricas (por ejemplo 'user').
+            entity_id (int): ID de la entidad.
+            loader (callable): Función sin argumentos que devuelve el valor a guardar.
+            ttl (int): Segundos de vida de la entrada, por defecto CACHE_DEFAULT_TTL.
+
+        Returns:
+            any: El valor guardado en la caché o el devuelto por `loader`.
+        """
+        key = f'{entity}:{entity_id}'
+        version = self._version(key, ttl)
+        entry = None if pinned_to_primary() else self.backend.get(key)
+        if entry is not None and entry[0] == version:
+            self.hits.inc(entity=entity)
+            return entry[1]
+        self.misses.inc(entity=entity)
+        value = loader()
+        if not reading_from_replica():
+            self.backend.set(key, (version, value), ttl)
+        return value
+
+    def invalidate(self, entity, entity_id):
+        """
+        Invalida una entidad de la caché al modificarla o eliminarla.
+
+        Dentro de una transacción, la invalidación se aplica al confirmarla (y se descarta si se revierte);
+        fuera de ella, inmediatamente.
+
+        Args:
+            entity (str): Tipo de entidad (por ejemplo 'habit').
+            entity_id (int): ID de la entidad.
+        """
+        key = f'{entity}:{entity_id}'
+        session = self.session() if self.session is not None else None
+        if session is not None and session.in_transaction():
+            session.info.setdefault(PENDING_INVALIDATIONS, set()).add(key)
+        else:
+            self._expire(key)
+
+    def _version(self, key, ttl):
+        # Versión actual de la entidad; la primera lectura la crea (si dos lecturas la crean a la vez, gana una)
+        version_key = f'{key}:version'
+        version = self.backend.get(version_key)
+        if version is None:
+            self.backend.add(version_key, uuid.uuid4().hex, ttl)
+            version = self.backend.get(version_key)
+        return version
+
+    def _expire(self, key):
+        # Una versión nueva deja inaccesibles las entradas guardadas con la anterior, también las que se guarden
+        # después desde una lectura que empezó antes de la escritura
+        self.backend.set(f'{key}:version', uuid.uuid4().hex)
+        self.backend.delete(key)
+        self.invalidations.inc(entity=key.split(':', 1)[0])
+
+    def _apply_invalidations(self, session):
+        for key in session.info.pop(PENDING_INVALIDATIONS, ()):
+            self._expire(key)
+
+    def _discard_invalidations(self, session):
+        session.info.pop(PENDING_INVALIDATIONS, None)
+
+    @staticmethod
+    def snapshot(obj, exclude=()):
+        """
+        Copia las columnas de un objeto ORM en un diccionario independiente de la sesión.
+
+        Args:
+            obj (Model): Objeto ORM a copiar.
+            exclude (tuple): Columnas que no deben guardarse en la caché (por ejemplo contraseñas).
+
+        Returns:
+            dict: Diccionario {columna: valor}.
+        """
+        return {column.key: getattr(obj, column.key) for column in obj.__table__.columns if column.key not in exclude}
+
+    def stats(self):
+        """
+        Returns:
+            dict: Backend en uso, número de entradas y contadores de aciertos, fallos e invalidaciones.
+        """
+        def by_entity(counter):
+            return {series['labels']['entity']: series['value'] for series in counter.snapshot()}
+
+        return {
+            'backend': type(self.backend).__name__,
+            'entries': self.backend.size(),
+            'hits': by_entity(self.hits),
+            'misses': by_entity(self.misses),
+            'invalidations': by_entity(self.invalidations),
+        }
@@ -0,0 +1,88 @@
+import base64
+from datetime import date
+from .exceptions import InvalidDataError
+
+# Bits del mapa de un año: uno por día, con espacio para el 29 de febrero (46 bytes)
+CALENDAR_BITS = 366
+
+
+class Calendar():
+    """
+    Codificación compacta de las fechas completadas de un año como mapa de bits.
+
+    El bit `i` corresponde al día `i` del año (0 es el 1 de enero) y se guarda en el byte `i // 8`, en la posición
+    `i % 8` empezando por el bit menos significativo. El mapa ocupa siempre 46 bytes (366 bits), y se envía en
+    base64; en los años no bisiestos el último bit queda a cero.
+    """
+
+    @staticmethod
+    def get_year(year):
+        """
+        Normaliza el año solicitado en el parámetro `?year=`.
+
+        Args:
+            year (str): Año solicitado, None para usar el año actual.
+
+        Returns:
+            int: El año entre 1 y 9999.
+
+        Raises:
+            InvalidDataError: Si el año no es un entero válido.
+        """
+        if year is None:
+            return date.today().year
+        try:
+            year = int(year)
+        except ValueError:
+            raise InvalidDataError('The year parameter must be an integer between 1 and 9999.')
+        if not 1 <= year <= 9999:
+            raise InvalidDataError('The year parameter must be an integer between 1 and 9999.')
+        return year
+
+    @staticmethod
+    def year_bounds(year):
+        """
+        Args:
+            year (int): Año del calendario.
+
+        Returns:
+            tuple: Primer y último día del año, para filtrar las fechas con un rango sobre el índice.
+        """
+        return date(year, 1, 1), date(year, 12, 31)
+
+    @staticmethod
+    def encode(dates, year):
+        """
+        Codifica las fechas de un año en un mapa de bits en base64.
+
+        Args:
+            dates (iterable): Fechas completadas (las de otros años se ignoran).
+            year (int): Año del calendario.
+
+        Returns:
+            str: Mapa de bits de 366 bits en base64.
+        """
+        bitmap = bytearray(CALENDAR_BITS // 8 + 1)
+        first = date(year, 1, 1).toordinal()
+        for completed_date in dates:
+            day = completed_date.toordinal() - first
+            if 0 <= day < CALENDAR_BITS:
+                bitmap[day >> 3] |= 1 << (day & 7)
+        return base64.b64encode(bytes(bitmap)).decode('ascii')
+
+    @staticmethod
+    def decode(bitmap, year):
+        """
+        Decodifica un mapa de bits en las fechas que contiene.
+
+        Args:
+            bitmap (str): Mapa de bits en base64 devuelto por `encode`.
+            year (int): Año del calendario.
+
+        Returns:
+            list: Fechas marcadas, en orden ascendente.
+        """
+        data = base64.b64decode(bitmap)
+        first = date(year, 1, 1).toordinal()
+        last = date(year, 12, 31).toordinal() - first
+        return [date.fromordinal(first + day) for day in range(last + 1) if data[day >> 3] >> (day & 7) & 1]
@@ -0,0 +1,127 @@
+import time
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+from .metrics import Counter, Histogram
+
+# Límites (en segundos) de los buckets de espera por una conexión del pool
+POOL_WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+
+# Opciones de create_engine que solo aplican a un QueuePool
+POOL_SIZING_OPTIONS = ('pool_size', 'max_overflow', 'pool_timeout', 'pool_recycle')
+
+
+def _enable_sqlite_foreign_keys(dbapi_connection, record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA foreign_keys=ON')
+    cursor.close()
+
+
+class TimedQueuePool(QueuePool):
+    """
+    QueuePool que mide cuánto espera cada petición hasta obtener una conexión.
+
+    SQLAlchemy no expone un evento para la espera en la cola del pool, así que se mide alrededor de `_do_get`.
+    El atributo `monitor` lo fija `PoolMonitor` en una subclase propia al configurar la aplicación.
+    """
+
+    monitor = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.monitor.timeouts.inc()
+            raise
+        finally:
+            self.monitor.checkout_wait.observe(time.perf_counter() - started)
+
+
+class PoolMonitor():
+    """
+    Configura el pool de conexiones a partir de SQLALCHEMY_ENGINE_OPTIONS y recoge su telemetría.
+
+    Con SQLite las opciones de tamaño del pool se descartan (están pensadas para el servidor MySQL). Salvo con
+    SQLite en memoria, se usa un `TimedQueuePool` y se registran eventos de conexión, préstamo e invalidación
+    (por ejemplo, conexiones cerradas por el servidor detectadas por `pool_pre_ping`).
+    """
+
+    def __init__(self):
+        self.checkout_wait = Histogram('db_pool_checkout_wait_seconds', 'Espera hasta obtener una conexión del pool', buckets=POOL_WAIT_BUCKETS)
+        self.timeouts = Counter('db_pool_timeouts_total', 'Peticiones que agotaron pool_timeout esperando una conexión')
+        self.connections = Counter('db_pool_connections_total', 'Conexiones nuevas abiertas contra la base de datos')
+        self.checkouts = Counter('db_pool_checkouts_total', 'Conexiones prestadas por el pool')
+        self.invalidations = Counter('db_pool_invalidations_total', 'Conexiones descartadas por errores o por pool_pre_ping')
+        self.options = {}
+
+    def init_app(self, app):
+        """
+        Ajusta las opciones del motor según la base de datos configurada.
+
+        Debe llamarse antes de `db.init_app`, que crea el motor con SQLALCHEMY_ENGINE_OPTIONS.
+
+        Args:
+            app (Flask): La aplicación configurada.
+        """
+        uri = app.config['SQLALCHEMY_DATABASE_URI']
+        options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+        if uri.startswith('sqlite'):
+            options = {key: value for key, value in options.items() if key not in POOL_SIZING_OPTIONS}
+        # Las bases SQLite en memoria usan el pool propio de Flask-SQLAlchemy (una única conexión compartida)
+        if not (uri.startswith('sqlite') and (uri.rstrip('/') == 'sqlite:' or ':memory:' in uri or 'mode=memory' in uri)):
+            # Subclase propia para que el pool registre sus métricas en este monitor
+            poolclass = type('TimedQueuePool', (TimedQueuePool,), {'monitor': self})
+            event.listen(poolclass, 'connect', lambda dbapi_connection, record: self.connections.inc())
+            event.listen(poolclass, 'checkout', lambda dbapi_connection, record, proxy: self.checkouts.inc())
+            event.listen(poolclass, 'invalidate', lambda dbapi_connection, record, exception: self.invalidations.inc())
+            options['poolclass'] = poolclass
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+        self.options = options
+
+    def register(self, engine):
+        """
+        Registra los eventos de conexión del motor de la base de datos.
+
+        SQLite no aplica las claves foráneas (ni sus `ON DELETE CASCADE`) salvo que cada conexión lo active con
+        `PRAGMA foreign_keys`; MySQL las aplica siempre.
+
+        Args:
+            engine (Engine): Motor de SQLAlchemy de la aplicación.
+        """
+        if engine.dialect.name == 'sqlite':
+            event.listen(engine, 'connect', _enable_sqlite_foreign_keys)
+
+    def stats(self, engine):
+        """
+        Args:
+            engine (Engine): Motor cuyo pool se consulta.
+
+        Returns:
+            dict: Estado actual del pool (conexiones libres, prestadas y de desbordamiento),
+                  su configuración y las métricas acumuladas del proceso que atiende la petición.
+        """
+        def total(counter):
+            return sum(series['value'] for series in counter.snapshot())
+
+        pool = engine.pool
+        state = {'pool_class': type(pool).__name__, 'status': pool.status()}
+        if isinstance(pool, QueuePool):
+            state.update({
+                'size': pool.size(),
+                'checked_in': pool.checkedin(),
+                'checked_out': pool.checkedout(),
+                'overflow': pool.overflow(),
+                'max_overflow': pool._max_overflow,
+                'timeout': pool.timeout(),
+            })
+        state.update({
+            'recycle': self.options.get('pool_recycle'),
+            'pre_ping': bool(self.options.get('pool_pre_ping')),
+            'connections': total(self.connections),
+            'checkouts': total(self.checkouts),
+            'invalidations': total(self.invalidations),
+            'timeouts': total(self.timeouts),
+            'checkout_wait': self.checkout_wait.snapshot(),
+        })
+        return state
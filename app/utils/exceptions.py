@@ -8,4 +8,8 @@ class DuplicateValueError(ValueError):
 
 class InvalidDataError(ValueError):
     def __init__(self, message):
-        super().__init__(message)
\ No newline at end of file
+        super().__init__(message)
+
+class ServiceUnavailableError(Exception):
+    def __init__(self, message):
+        super().__init__(message)
@@ -0,0 +1,73 @@
+from flask import request
+from sqlalchemy.orm import selectinload
+from .exceptions import InvalidDataError
+
+
+class Expansion():
+    """
+    Expansión de relaciones con el parámetro `?include=` (por ejemplo `include=assignments.completed_dates`).
+
+    Cada relación solicitada se carga con `selectinload`: una consulta `WHERE fk IN (...)` por nivel,
+    así el número de consultas depende de la profundidad de la expansión y no del número de filas
+    (sin las N+1 cargas perezosas de recorrer las relaciones `lazy=True` fila por fila).
+    """
+
+    @staticmethod
+    def get_request_includes(allowed):
+        """
+        Obtiene las relaciones solicitadas con el parámetro `?include=`.
+
+        Las rutas se separan por comas y sus niveles por puntos; una ruta incluye también a sus prefijos
+        (`assignments.completed_dates` expande primero `assignments`).
+
+        Args:
+            allowed (iterable): Rutas de relación admitidas por el endpoint.
+
+        Returns:
+            tuple: Rutas solicitadas con sus prefijos, ordenadas; vacía si no se indicó el parámetro.
+
+        Raises:
+            InvalidDataError: Si alguna ruta no está admitida.
+        """
+        value = request.args.get('include')
+        if not value:
+            return ()
+        requested = {path.strip() for path in value.split(',') if path.strip()}
+        unknown = sorted(requested - set(allowed))
+        if unknown:
+            raise InvalidDataError(f'Unknown includes: {", ".join(unknown)}. Available includes: {", ".join(sorted(allowed))}.')
+        paths = set()
+        for path in requested:
+            segments = path.split('.')
+            paths.update('.'.join(segments[:depth]) for depth in range(1, len(segments) + 1))
+        return tuple(sorted(paths))
+
+    @staticmethod
+    def load_options(model_class, paths):
+        """
+        Construye las opciones de carga `selectinload` de las rutas de relación indicadas.
+
+        Args:
+            model_class (Model): Modelo de SQLAlchemy desde el que parten las rutas.
+            paths (iterable): Rutas de relación separadas por puntos (por ejemplo 'assignments.completed_dates').
+
+        Returns:
+            list: Opciones para `Query.options`, una por ruta hoja.
+        """
+        options = []
+        # Las rutas que son prefijo de otra ya se cargan como parte de la ruta más larga
+        leaves = [path for path in paths if not any(other.startswith(path + '.') for other in paths)]
+        for path in sorted(leaves):
+            option, current = None, model_class
+            for name in path.split('.'):
+                attribute = getattr(current, name)
+                option = selectinload(attribute) if option is None else option.selectinload(attribute)
+                current = attribute.property.mapper.class_
+            options.append(option)
+        return options
+
+
+# Parámetro de expansión de relaciones documentado en Swagger para los endpoints que lo admiten
+INCLUDE_DOC_PARAMS = {
+    'include': 'Relaciones a incluir separadas por comas, con sus niveles separados por puntos (por ejemplo assignments.completed_dates)',
+}
@@ -0,0 +1,204 @@
+import threading
+from contextvars import ContextVar
+
+# Límites (en segundos) de los buckets de latencia por defecto
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Tipo de contenido del formato de texto de Prometheus
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _format_labels(labels, extra=None):
+    items = list(labels.items()) + list((extra or {}).items())
+    if not items:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in items)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(items, escaped)) + '}'
+
+
+class Counter():
+    """
+    Contador monotónico seguro entre hilos, opcionalmente separado por etiquetas.
+
+    Atributos:
+        name (str): Nombre de la métrica.
+        description (str): Descripción de lo que se cuenta.
+        labelnames (tuple): Nombres de las etiquetas que distinguen cada serie.
+    """
+
+    def __init__(self, name, description, labelnames=()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        """
+        Incrementa la serie correspondiente a las etiquetas dadas.
+
+        Args:
+            amount (float): Cantidad a sumar.
+            **labels: Valores de las etiquetas declaradas en `labelnames`.
+        """
+        key = tuple(str(labels.get(label, '')) for label in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def snapshot(self):
+        """
+        Returns:
+            list: Lista de series con sus etiquetas y su valor acumulado.
+        """
+        with self._lock:
+            return [{'labels': dict(zip(self.labelnames, key)), 'value': value} for key, value in self._values.items()]
+
+    def expose(self):
+        """
+        Returns:
+            list: Líneas de la métrica en el formato de texto de Prometheus.
+        """
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} counter']
+        lines.extend(f"{self.name}{_format_labels(series['labels'])} {series['value']}" for series in self.snapshot())
+        return lines
+
+
+class Gauge(Counter):
+    """
+    Valor instantáneo seguro entre hilos (por ejemplo el retraso de una réplica), opcionalmente separado por etiquetas.
+    """
+
+    def set(self, value, **labels):
+        """
+        Fija el valor de la serie correspondiente a las etiquetas dadas.
+
+        Args:
+            value (float): Valor actual.
+            **labels: Valores de las etiquetas declaradas en `labelnames`.
+        """
+        key = tuple(str(labels.get(label, '')) for label in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+    def expose(self):
+        """
+        Returns:
+            list: Líneas de la métrica en el formato de texto de Prometheus.
+        """
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} gauge']
+        lines.extend(f"{self.name}{_format_labels(series['labels'])} {series['value']}" for series in self.snapshot())
+        return lines
+
+
+class Histogram():
+    """
+    Histograma acumulativo seguro entre hilos, opcionalmente separado por etiquetas.
+
+    Atributos:
+        name (str): Nombre de la métrica.
+        description (str): Descripción de lo que se mide.
+        buckets (tuple): Límites superiores de los buckets, en orden ascendente.
+        labelnames (tuple): Nombres de las etiquetas que distinguen cada serie.
+    """
+
+    def __init__(self, name, description, buckets=DEFAULT_BUCKETS, labelnames=()):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(buckets)
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        """
+        Registra una observación en la serie correspondiente a las etiquetas dadas.
+
+        Args:
+            value (float): Valor observado (por convención, segundos para las latencias).
+            **labels: Valores de las etiquetas declaradas en `labelnames`.
+        """
+        key = tuple(str(labels.get(label, '')) for label in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {'count': 0, 'sum': 0.0, 'buckets': [0] * len(self.buckets)}
+            series['count'] += 1
+            series['sum'] += value
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['buckets'][index] += 1
+                    break
+
+    def snapshot(self):
+        """
+        Returns:
+            list: Lista de series con sus etiquetas, número de observaciones, suma y
+                  conteos acumulados por límite de bucket ('+Inf' incluye todas las observaciones).
+        """
+        with self._lock:
+            result = []
+            for key, series in self._series.items():
+                cumulative, buckets = 0, {}
+                for bound, count in zip(self.buckets, series['buckets']):
+                    cumulative += count
+                    buckets[str(bound)] = cumulative
+                buckets['+Inf'] = series['count']
+                result.append({'labels': dict(zip(self.labelnames, key)), 'count': series['count'],
+                               'sum': series['sum'], 'buckets': buckets})
+            return result
+
+    def expose(self):
+        """
+        Returns:
+            list: Líneas de la métrica en el formato de texto de Prometheus (buckets, suma y conteo por serie).
+        """
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} histogram']
+        for series in self.snapshot():
+            for bound, count in series['buckets'].items():
+                lines.append(f"{self.name}_bucket{_format_labels(series['labels'], {'le': bound})} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(series['labels'])} {series['sum']}")
+            lines.append(f"{self.name}_count{_format_labels(series['labels'])} {series['count']}")
+        return lines
+
+
+class RequestTimer():
+    """
+    Tiempos acumulados por fase (consultas, serialización) de la petición muestreada en curso.
+
+    Se guardan en una ContextVar, así cada hilo (o tarea) ve solo los de su propia petición y consultar
+    si hay una medición activa cuesta una búsqueda, sin depender de un contexto de Flask.
+    """
+
+    _current = ContextVar('request_timings', default=None)
+
+    @staticmethod
+    def start():
+        """
+        Inicia la medición de la petición en curso.
+
+        Returns:
+            dict: Tiempos acumulados por fase, en segundos, y número de consultas.
+        """
+        timings = {'db': 0.0, 'db_queries': 0, 'serialize': 0.0}
+        RequestTimer._current.set(timings)
+        return timings
+
+    @staticmethod
+    def stop():
+        """
+        Termina la medición de la petición en curso.
+
+        Returns:
+            dict: Los tiempos acumulados, None si la petición no se estaba midiendo.
+        """
+        timings = RequestTimer._current.get()
+        RequestTimer._current.set(None)
+        return timings
+
+    @staticmethod
+    def current():
+        """
+        Returns:
+            dict: Los tiempos de la petición en curso, None si no se está midiendo.
+        """
+        return RequestTimer._current.get()
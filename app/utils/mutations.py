@@ -0,0 +1,81 @@
+from app import db
+from .exceptions import NotFoundError
+from .validations import Validations
+
+
+class Mutations():
+    """
+    Modificaciones y eliminaciones de una fila por su clave primaria en una sola sentencia.
+
+    En lugar de cargar el objeto ORM para modificarlo o eliminarlo en la sesión (un SELECT y luego el UPDATE/DELETE),
+    se envía directamente `UPDATE ... WHERE pk = :id` o `DELETE ... WHERE pk = :id` y la ausencia de la fila se
+    detecta por el número de filas afectadas. Las sentencias no pasan por el identity map de la sesión.
+    """
+
+    @staticmethod
+    def update_by_id(key_column, key, values, type_obj):
+        """
+        Actualiza las columnas de la fila cuya clave primaria coincide con el valor.
+
+        En MySQL el número de filas afectadas cuenta las filas encontradas aunque no cambie ningún valor
+        (SQLAlchemy activa la opción FOUND_ROWS del cliente), así que repetir una actualización no se confunde
+        con una fila inexistente.
+
+        Args:
+            key_column (Column): Columna de clave primaria del modelo (por ejemplo User.user_id).
+            key (int): Valor de la clave primaria.
+            values (dict): Nuevos valores por nombre de atributo.
+            type_obj (str): Nombre de la entidad para los mensajes de error (por ejemplo 'User').
+
+        Returns:
+            None
+
+        Raises:
+            NotFoundError: Si la fila no existe.
+            DuplicateValueError: Si los nuevos valores violan una restricción de unicidad.
+        """
+        if not values:
+            # Sin columnas que modificar no hay UPDATE posible; solo se verifica que la fila exista
+            exists = db.session.query(db.exists().where(key_column == key)).scalar()
+            Validations.check_if_exists(exists, type_obj)
+            return
+        statement = db.update(key_column.class_).where(key_column == key).values(**values)
+        result = Validations.execute_statement(statement, type_obj.lower())
+        if result.rowcount == 0:
+            db.session.rollback()
+            raise NotFoundError(f'{type_obj} not found')
+
+    @staticmethod
+    def delete_by_id(key_column, key, type_obj, returning=()):
+        """
+        Elimina la fila cuya clave primaria coincide con el valor.
+
+        Si se piden columnas de la fila eliminada se usa `DELETE ... RETURNING` cuando la base de datos lo admite
+        (SQLite, MariaDB); en MySQL se leen antes con `SELECT ... FOR UPDATE`, que bloquea la fila hasta el DELETE.
+
+        Args:
+            key_column (Column): Columna de clave primaria del modelo (por ejemplo User.user_id).
+            key (int): Valor de la clave primaria.
+            type_obj (str): Nombre de la entidad para los mensajes de error (por ejemplo 'User').
+            returning (tuple): Columnas de la fila eliminada que se devuelven.
+
+        Returns:
+            Row: Las columnas pedidas de la fila eliminada; None si no se pidió ninguna.
+
+        Raises:
+            NotFoundError: Si la fila no existe.
+        """
+        statement = db.delete(key_column.class_).where(key_column == key)
+        execution_options = {'synchronize_session': False}
+        row = None
+        if returning and db.session.get_bind(key_column.class_).dialect.delete_returning:
+            row = db.session.execute(statement.returning(*returning), execution_options=execution_options).first()
+            deleted = row is not None
+        else:
+            if returning:
+                row = db.session.execute(db.select(*returning).where(key_column == key).with_for_update()).first()
+            deleted = db.session.execute(statement, execution_options=execution_options).rowcount > 0
+        if not deleted:
+            db.session.rollback()
+            raise NotFoundError(f'{type_obj} not found')
+        return row
@@ -0,0 +1,247 @@
+import base64
+from urllib.parse import urlencode
+from flask import current_app, request
+from .exceptions import InvalidDataError
+
+
+class Page():
+    """
+    Representa una página de resultados obtenida con paginación por cursor (keyset).
+
+    Atributos:
+        items (list): Objetos de la página actual.
+        limit (int): Tamaño de página aplicado a la consulta.
+        next_cursor (str): Cursor para solicitar la página siguiente, None si no hay más resultados.
+        prev_cursor (str): Cursor para solicitar la página anterior, None si es la primera página.
+    """
+
+    def __init__(self, items, limit, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.limit = limit
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+
+class Pagination():
+    """
+    Paginación por cursor (keyset) sobre la clave primaria.
+
+    A diferencia de OFFSET, cada página se resuelve con un `WHERE pk > :cursor ORDER BY pk LIMIT :n`,
+    por lo que las páginas profundas cuestan lo mismo que la primera.
+    """
+
+    @staticmethod
+    def encode_cursor(value):
+        """
+        Codifica el valor de la clave primaria en un cursor opaco.
+
+        Args:
+            value (int): Valor de la clave primaria del último/primer elemento de la página.
+
+        Returns:
+            str: Cursor en base64 apto para URLs.
+        """
+        return base64.urlsafe_b64encode(f'pk:{value}'.encode('utf-8')).decode('ascii').rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """
+        Decodifica un cursor opaco al valor de la clave primaria.
+
+        Args:
+            cursor (str): Cursor recibido en la petición.
+
+        Returns:
+            int: Valor de la clave primaria contenido en el cursor.
+
+        Raises:
+            InvalidDataError: Si el cursor no es válido.
+        """
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            prefix, value = base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8').split(':', 1)
+            if prefix != 'pk':
+                raise ValueError(prefix)
+            return int(value)
+        except (ValueError, UnicodeError):
+            raise InvalidDataError('The pagination cursor is invalid.')
+
+    @staticmethod
+    def get_limit(limit, config=None):
+        """
+        Normaliza el tamaño de página solicitado según la configuración de la aplicación.
+
+        Args:
+            limit (int): Tamaño de página solicitado, None para usar el valor por defecto.
+            config (dict): Configuración de la que se leen los límites; por defecto la de la aplicación actual.
+
+        Returns:
+            int: Tamaño de página entre 1 y PAGINATION_MAX_LIMIT.
+
+        Raises:
+            InvalidDataError: Si el tamaño de página no es un entero positivo.
+        """
+        config = config if config is not None else current_app.config
+        if limit is None:
+            return config['PAGINATION_DEFAULT_LIMIT']
+        if limit < 1:
+            raise InvalidDataError('The limit parameter must be a positive integer.')
+        return min(limit, config['PAGINATION_MAX_LIMIT'])
+
+    @staticmethod
+    def prepare(query, key_column, after=None, before=None, limit=None, config=None):
+        """
+        Añade a una consulta el filtro, el orden y el límite de la página solicitada.
+
+        Sirve tanto para `Query` como para sentencias `select()` (la ruta asíncrona las ejecuta con `AsyncSession`).
+
+        Args:
+            query (Query): Consulta base (puede incluir filtros) o sentencia select.
+            key_column (Column): Columna de clave primaria usada como clave del cursor.
+            after (str): Cursor a partir del cual se obtiene la página siguiente.
+            before (str): Cursor antes del cual se obtiene la página anterior.
+            limit (int): Tamaño de página solicitado.
+            config (dict): Configuración de la que se leen los límites; por defecto la de la aplicación actual.
+
+        Returns:
+            tuple: La consulta lista para ejecutarse (pide un elemento extra) y el tamaño de página aplicado.
+
+        Raises:
+            InvalidDataError: Si se envían ambos cursores o alguno no es válido.
+        """
+        if after and before:
+            raise InvalidDataError('The after and before parameters cannot be used together.')
+        limit = Pagination.get_limit(limit, config)
+        if before:
+            # Se recorre el índice en orden inverso y luego se restablece el orden ascendente
+            query = query.filter(key_column < Pagination.decode_cursor(before)).order_by(key_column.desc())
+        else:
+            if after:
+                query = query.filter(key_column > Pagination.decode_cursor(after))
+            query = query.order_by(key_column.asc())
+        # Se pide un elemento extra para saber si existe una página siguiente sin usar COUNT
+        return query.limit(limit + 1), limit
+
+    @staticmethod
+    def build_page(rows, limit, key_name, after=None, before=None):
+        """
+        Construye la página y sus cursores a partir de las filas de una consulta preparada con `prepare`.
+
+        Args:
+            rows (list): Filas devueltas por la consulta (hasta `limit + 1`).
+            limit (int): Tamaño de página aplicado.
+            key_name (str): Atributo de la clave primaria en los objetos.
+            after (str): Cursor `after` de la petición.
+            before (str): Cursor `before` de la petición.
+
+        Returns:
+            Page: La página de resultados con los cursores de navegación.
+        """
+        has_more = len(rows) > limit
+        if before:
+            items = list(reversed(rows[:limit]))
+            next_cursor = Pagination.encode_cursor(getattr(items[-1], key_name)) if items else None
+            prev_cursor = Pagination.encode_cursor(getattr(items[0], key_name)) if has_more else None
+            return Page(items, limit, next_cursor, prev_cursor)
+        items = rows[:limit]
+        next_cursor = Pagination.encode_cursor(getattr(items[-1], key_name)) if has_more else None
+        prev_cursor = Pagination.encode_cursor(getattr(items[0], key_name)) if after and items else None
+        return Page(items, limit, next_cursor, prev_cursor)
+
+    @staticmethod
+    def paginate(query, key_column, after=None, before=None, limit=None):
+        """
+        Aplica paginación por cursor a una consulta ordenada por la clave primaria.
+
+        Args:
+            query (Query): Consulta base (puede incluir filtros).
+            key_column (Column): Columna de clave primaria usada como clave del cursor.
+            after (str): Cursor a partir del cual se obtiene la página siguiente.
+            before (str): Cursor antes del cual se obtiene la página anterior.
+            limit (int): Tamaño de página solicitado.
+
+        Returns:
+            Page: La página de resultados con los cursores de navegación.
+
+        Raises:
+            InvalidDataError: Si se envían ambos cursores o alguno no es válido.
+        """
+        query, limit = Pagination.prepare(query, key_column, after, before, limit)
+        return Pagination.build_page(query.all(), limit, key_column.key, after, before)
+
+    @staticmethod
+    def parse_args(args):
+        """
+        Obtiene los parámetros de paginación de los argumentos de una petición.
+
+        Args:
+            args (dict): Argumentos de la query string.
+
+        Returns:
+            dict: Diccionario con las claves 'after', 'before' y 'limit'.
+
+        Raises:
+            InvalidDataError: Si el parámetro limit no es un entero.
+        """
+        limit = args.get('limit')
+        if limit is not None:
+            try:
+                limit = int(limit)
+            except ValueError:
+                raise InvalidDataError('The limit parameter must be a positive integer.')
+        return {'after': args.get('after'), 'before': args.get('before'), 'limit': limit}
+
+    @staticmethod
+    def get_request_args():
+        """
+        Obtiene los parámetros de paginación de la petición actual.
+
+        Returns:
+            dict: Diccionario con las claves 'after', 'before' y 'limit'.
+
+        Raises:
+            InvalidDataError: Si el parámetro limit no es un entero.
+        """
+        return Pagination.parse_args(request.args)
+
+    @staticmethod
+    def format_links(page, base_url, args):
+        """
+        Construye el encabezado HTTP `Link` (RFC 8288) con los enlaces next/prev de una página.
+
+        Args:
+            page (Page): Página de resultados.
+            base_url (str): URL del listado, sin query string.
+            args (dict): Argumentos de la petición, que se conservan en los enlaces.
+
+        Returns:
+            dict: Encabezados a añadir a la respuesta (vacío si no hay enlaces).
+        """
+        links = []
+        base_args = {key: value for key, value in args.items() if key not in ('after', 'before', 'limit')}
+        for rel, param, cursor in (('next', 'after', page.next_cursor), ('prev', 'before', page.prev_cursor)):
+            if cursor:
+                query_string = urlencode({**base_args, param: cursor, 'limit': page.limit})
+                links.append(f'<{base_url}?{query_string}>; rel="{rel}"')
+        return {'Link': ', '.join(links)} if links else {}
+
+    @staticmethod
+    def link_headers(page):
+        """
+        Construye el encabezado HTTP `Link` (RFC 8288) con los enlaces next/prev de la página.
+
+        Args:
+            page (Page): Página de resultados.
+
+        Returns:
+            dict: Encabezados a añadir a la respuesta (vacío si no hay enlaces).
+        """
+        return Pagination.format_links(page, request.base_url, request.args)
+
+
+# Parámetros de paginación documentados en Swagger para los listados paginados
+PAGINATION_DOC_PARAMS = {
+    'after': 'Cursor opaco para obtener la página siguiente',
+    'before': 'Cursor opaco para obtener la página anterior',
+    'limit': 'Tamaño de página (limitado por PAGINATION_MAX_LIMIT)',
+}
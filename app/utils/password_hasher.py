@@ -0,0 +1,138 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+import bcrypt
+from .exceptions import ServiceUnavailableError
+from .metrics import Counter, Histogram
+
+
+def _hash_password(password, rounds):
+    """
+    Genera el hash bcrypt de una contraseña dentro de un proceso del pool.
+
+    Args:
+        password (str): Contraseña en texto plano.
+        rounds (int): Factor de coste de bcrypt.
+
+    Returns:
+        tuple: (hash, instante de inicio en el proceso hijo, duración del hash en segundos).
+    """
+    started = time.time()
+    hashed = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+    return hashed, started, time.time() - started
+
+
+class PasswordHasher():
+    """
+    Calcula los hashes bcrypt fuera del hilo de la petición, en un pool de procesos acotado.
+
+    El hash es deliberadamente costoso (cientos de milisegundos con el coste de producción), por lo que
+    se delega a PASSWORD_HASH_WORKERS procesos. Si hay más de PASSWORD_HASH_QUEUE_LIMIT hashes pendientes
+    se rechaza la petición con ServiceUnavailableError, para no dejar sin hilos al resto de los endpoints.
+    Los hashes generados son compatibles con `bcrypt.check_password_hash` de Flask-Bcrypt.
+
+    El pool y el límite de la cola son de cada proceso: con gunicorn, cada worker tiene sus propios
+    PASSWORD_HASH_WORKERS procesos y su propio límite de PASSWORD_HASH_QUEUE_LIMIT hashes pendientes.
+    Un hash cuenta como pendiente hasta que su proceso termina, aunque la petición ya haya respondido 503
+    por superar PASSWORD_HASH_TIMEOUT (un hash en curso no se puede interrumpir).
+    """
+
+    def __init__(self):
+        self.workers = 0
+        self.rounds = 12
+        self.queue_limit = 0
+        self.timeout = None
+        self._executor = None
+        self._executor_pid = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        self.hash_latency = Histogram('password_hash_seconds', 'Duración del cálculo del hash bcrypt')
+        self.queue_wait = Histogram('password_hash_queue_wait_seconds', 'Tiempo de espera en cola antes de calcular el hash')
+        self.rejected = Counter('password_hash_rejected_total', 'Hashes rechazados por superar el límite de la cola')
+
+    def init_app(self, app):
+        """
+        Lee la configuración del pool desde la aplicación Flask.
+
+        Args:
+            app (Flask): La aplicación configurada.
+        """
+        self.workers = app.config['PASSWORD_HASH_WORKERS']
+        self.rounds = app.config['BCRYPT_LOG_ROUNDS']
+        self.queue_limit = app.config['PASSWORD_HASH_QUEUE_LIMIT']
+        self.timeout = app.config['PASSWORD_HASH_TIMEOUT']
+
+    def _get_executor(self):
+        # El pool se crea de forma perezosa en cada proceso, así un worker creado con fork
+        # nunca reutiliza el pool (ni sus tuberías) del proceso padre. Sus procesos no se crean con fork:
+        # el worker de gunicorn tiene varios hilos y un fork podría copiar un lock tomado por otro hilo
+        if self._executor is None or self._executor_pid != os.getpid():
+            method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context(method))
+            self._executor_pid = os.getpid()
+        return self._executor
+
+    def generate_password_hash(self, password):
+        """
+        Genera el hash bcrypt de una contraseña.
+
+        Args:
+            password (str): Contraseña en texto plano.
+
+        Returns:
+            str: Hash bcrypt de la contraseña.
+
+        Raises:
+            ServiceUnavailableError: Si la cola de hashes pendientes está llena o el hash no termina a tiempo.
+        """
+        with self._lock:
+            if self.queue_limit and self._pending >= self.queue_limit:
+                self.rejected.inc()
+                raise ServiceUnavailableError('The server is busy. Please try again later.')
+            self._pending += 1
+        enqueued = time.time()
+        if self.workers > 0:
+            try:
+                with self._lock:
+                    executor = self._get_executor()
+                future = executor.submit(_hash_password, password, self.rounds)
+            except Exception:
+                self._release()
+                raise
+            # El hash deja de estar pendiente cuando termina (o se cancela antes de empezar), no cuando la petición
+            # deja de esperarlo: así el límite de la cola cuenta también los hashes abandonados por timeout
+            future.add_done_callback(lambda _: self._release())
+            try:
+                hashed, started, duration = future.result(timeout=self.timeout)
+            except FutureTimeoutError:
+                future.cancel()
+                raise ServiceUnavailableError('The server is busy. Please try again later.')
+        else:
+            try:
+                hashed, started, duration = _hash_password(password, self.rounds)
+            finally:
+                self._release()
+        self.queue_wait.observe(max(0.0, started - enqueued))
+        self.hash_latency.observe(duration)
+        return hashed
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+
+    def stats(self):
+        """
+        Returns:
+            dict: Configuración del pool, hashes pendientes y métricas de latencia y espera en cola.
+        """
+        return {
+            'workers': self.workers,
+            'rounds': self.rounds,
+            'queue_limit': self.queue_limit,
+            'pending': self._pending,
+            'rejected': sum(series['value'] for series in self.rejected.snapshot()),
+            'hash_latency': self.hash_latency.snapshot(),
+            'queue_wait': self.queue_wait.snapshot(),
+        }
@@ -0,0 +1,220 @@
+import hashlib
+import hmac
+import itertools
+import time
+from flask import g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import text
+from .metrics import Counter, Gauge
+from .shards import is_global
+
+# Prefijo de las claves de SQLALCHEMY_BINDS que corresponden a réplicas de lectura
+REPLICA_BIND_PREFIX = 'replica_'
+
+# Cookie (y encabezado) con el instante hasta el que un cliente lee del primario tras una escritura
+READ_PRIMARY_COOKIE = 'read_primary_until'
+READ_PRIMARY_HEADER = 'X-Read-Primary-Until'
+
+# Métodos HTTP que no modifican datos
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def pinned_to_primary():
+    """
+    Indica si la petición actual lee del primario por haber escrito hace poco (consistencia read-your-writes).
+
+    Returns:
+        bool: True si el cliente está fijado al primario.
+    """
+    return has_request_context() and g.get('read_primary_pinned', False)
+
+
+def reading_from_replica():
+    """
+    Indica si las lecturas de la petición actual van a una réplica, que puede ir con retraso respecto al primario.
+
+    Returns:
+        bool: True si la petición lee de una réplica.
+    """
+    return has_request_context() and g.get('read_from_replica', False)
+
+
+class RoutingSession(Session):
+    """
+    Sesión que envía las sentencias al shard fijado y las consultas SELECT de las lecturas a la réplica elegida.
+
+    `ShardRouter` guarda en `session.info['shard']` el motor del shard de la operación, que recibe todas las
+    sentencias salvo las de las tablas globales. Sin shard fijado, `ReplicaRouter` guarda el motor de la réplica
+    en `session.info['read_replica']` al empezar una lectura de la API; el resto de las sentencias (escrituras,
+    flush, SELECT ... FOR UPDATE) y las peticiones sin réplica asignada usan el primario, igual que la sesión de
+    Flask-SQLAlchemy.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        shard = self.info.get('shard')
+        if shard is not None and bind is None and not is_global(mapper, clause):
+            return shard
+        replica = self.info.get('read_replica')
+        if (replica is not None and bind is None and not self._flushing
+                and getattr(clause, 'is_select', False) and getattr(clause, '_for_update_arg', None) is None):
+            return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ReplicaRouter():
+    """
+    Reparte las lecturas de la API entre las réplicas de lectura, con consistencia read-your-writes.
+
+    Las peticiones GET de los namespaces de datos (users, habits, assignments y completed_dates) leen de una réplica
+    elegida por turnos; las escrituras y el resto de las rutas usan el primario. Tras una escritura, la respuesta
+    incluye la cookie `read_primary_until` (y el encabezado `X-Read-Primary-Until`, para los clientes sin cookies)
+    con el instante hasta el que las lecturas de ese cliente van al primario, de modo que siempre ve sus propios
+    cambios aunque las réplicas vayan con retraso. El valor va firmado con SECRET_KEY y nunca fija al cliente más
+    allá de `pin_seconds` desde la petición, así un cliente no puede enviar todas sus lecturas al primario.
+
+    El retraso de cada réplica se mide comparando sus contadores de `table_versions` con los del primario: es el
+    número de escrituras confirmadas en el primario que la réplica todavía no ha recibido.
+
+    Atributos:
+        replica_keys (tuple): Claves de SQLALCHEMY_BINDS de las réplicas.
+        pin_seconds (int): Segundos durante los que un cliente lee del primario tras una escritura.
+        namespaces (tuple): Namespaces cuyas lecturas se envían a las réplicas.
+    """
+
+    def __init__(self):
+        self.replica_keys = ()
+        self.pin_seconds = 0
+        self.namespaces = ()
+        self.secret = b''
+        self.session = None
+        self.primary = None
+        self.replicas = {}
+        self._next_replica = itertools.count()
+        self.decisions = Counter('db_read_routing_total', 'Peticiones por base de datos de lectura elegida y motivo', labelnames=('target', 'reason'))
+        self.lag = Gauge('db_replica_lag_versions', 'Escrituras confirmadas en el primario que la réplica no ha recibido', labelnames=('replica',))
+        self.up = Gauge('db_replica_up', 'Si la réplica respondió a la última medición del retraso (1) o no (0)', labelnames=('replica',))
+
+    def init_app(self, app, namespaces):
+        """
+        Añade las réplicas a SQLALCHEMY_BINDS y registra los hooks de la petición.
+
+        Debe llamarse antes de `db.init_app`, que crea un motor por cada bind.
+
+        Args:
+            app (Flask): La aplicación configurada.
+            namespaces (tuple): Namespaces cuyas lecturas se envían a las réplicas.
+        """
+        binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+        for index, uri in enumerate(app.config['SQLALCHEMY_REPLICA_URIS']):
+            binds[f'{REPLICA_BIND_PREFIX}{index}'] = uri
+        app.config['SQLALCHEMY_BINDS'] = binds
+        self.replica_keys = tuple(key for key in binds if key.startswith(REPLICA_BIND_PREFIX))
+        self.pin_seconds = app.config['READ_YOUR_WRITES_SECONDS']
+        self.secret = app.config['SECRET_KEY'].encode()
+        self.namespaces = tuple(namespaces)
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+
+    def register(self, session, engines):
+        """
+        Guarda la sesión y los motores del primario y de las réplicas, una vez creados por Flask-SQLAlchemy.
+
+        Args:
+            session (scoped_session): Sesión de la aplicación (`db.session`).
+            engines (Mapping): Motores por clave de bind (`db.engines`, con None para el primario).
+        """
+        self.session = session
+        self.primary = engines[None]
+        self.replicas = {key: engines[key] for key in self.replica_keys}
+
+    def choose(self):
+        """
+        Elige la base de datos de la que lee la petición actual.
+
+        Returns:
+            tuple: Clave de la réplica elegida ('primary' si lee del primario) y motivo de la decisión.
+        """
+        if request.method not in SAFE_METHODS:
+            return 'primary', 'write'
+        if request.path.strip('/').split('/', 1)[0] not in self.namespaces:
+            return 'primary', 'other'
+        if self._pinned_until() > time.time():
+            return 'primary', 'pinned'
+        return self.replica_keys[next(self._next_replica) % len(self.replica_keys)], 'replica'
+
+    def before_request(self):
+        if not self.replicas:
+            return
+        target, reason = self.choose()
+        self.decisions.inc(target=target, reason=reason)
+        g.read_primary_pinned = reason == 'pinned'
+        g.read_from_replica = target != 'primary'
+        if target != 'primary':
+            self.session.info['read_replica'] = self.replicas[target]
+
+    def after_request(self, response):
+        if self.replicas and request.method not in SAFE_METHODS and response.status_code < 400:
+            pinned_until = self._sign(str(int(time.time() + self.pin_seconds)))
+            response.set_cookie(READ_PRIMARY_COOKIE, pinned_until, max_age=self.pin_seconds, httponly=True, samesite='Lax')
+            response.headers[READ_PRIMARY_HEADER] = pinned_until
+        return response
+
+    def _sign(self, value):
+        signature = hmac.new(self.secret, value.encode(), hashlib.sha256).hexdigest()
+        return f'{value}.{signature}'
+
+    def _pinned_until(self):
+        # Un valor sin firma válida no fija al cliente; uno válido nunca pasa de pin_seconds desde ahora
+        value = request.headers.get(READ_PRIMARY_HEADER) or request.cookies.get(READ_PRIMARY_COOKIE)
+        if not value or not hmac.compare_digest(self._sign(value.rpartition('.')[0]), value):
+            return 0.0
+        try:
+            return min(float(value.rpartition('.')[0]), time.time() + self.pin_seconds)
+        except ValueError:
+            return 0.0
+
+    def measure_lag(self):
+        """
+        Mide el retraso de cada réplica y actualiza sus métricas.
+
+        Returns:
+            dict: {réplica: {'up': bool, 'lag_versions': int | None}}.
+        """
+        query = text('SELECT table_name, version FROM table_versions')
+        if not self.replicas:
+            return {}
+        with self.primary.connect() as connection:
+            primary = dict(connection.execute(query).all())
+        result = {}
+        for key, engine in self.replicas.items():
+            try:
+                with engine.connect() as connection:
+                    replica = dict(connection.execute(query).all())
+            except Exception:
+                self.up.set(0, replica=key)
+                result[key] = {'up': False, 'lag_versions': None}
+                continue
+            lag = sum(max(0, version - replica.get(table_name, 0)) for table_name, version in primary.items())
+            self.up.set(1, replica=key)
+            self.lag.set(lag, replica=key)
+            result[key] = {'up': True, 'lag_versions': lag}
+        return result
+
+    def metrics(self):
+        """
+        Returns:
+            list: Métricas de enrutado y de retraso de las réplicas, para exponerlas en `/metrics`.
+        """
+        return [self.decisions, self.lag, self.up]
+
+    def stats(self):
+        """
+        Returns:
+            dict: Réplicas configuradas con su retraso actual, segundos de read-your-writes y decisiones de enrutado
+                  del proceso que atiende la petición.
+        """
+        return {
+            'replicas': self.measure_lag(),
+            'read_your_writes_seconds': self.pin_seconds,
+            'decisions': self.decisions.snapshot(),
+        }
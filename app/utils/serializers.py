@@ -0,0 +1,262 @@
+import json
+import time
+from datetime import date
+from flask import current_app, make_response, request
+from flask_restx import fields
+from sqlalchemy.orm import load_only
+from .exceptions import InvalidDataError
+from .metrics import RequestTimer
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional; sin él se usa el módulo json de la biblioteca estándar
+    orjson = None
+
+
+def _get(obj, name):
+    # Los servicios devuelven objetos ORM o diccionarios (por ejemplo, las copias de la caché)
+    return obj.get(name) if isinstance(obj, dict) else getattr(obj, name, None)
+
+
+def _format_datetime(value):
+    # Igual que fields.DateTime en formato ISO 8601: las fechas sin hora se formatean como fechas
+    return value.isoformat() if isinstance(value, date) else fields.DateTime().format(value)
+
+
+def _format_date(value):
+    return value.isoformat() if isinstance(value, date) else fields.Date().format(value)
+
+
+# Conversión de cada tipo de campo de flask-restx, equivalente a su método `format`
+FORMATTERS = (
+    (fields.Boolean, bool),
+    (fields.Integer, int),
+    (fields.Float, float),
+    (fields.String, str),
+    (fields.DateTime, _format_datetime),
+    (fields.Date, _format_date),
+)
+
+
+class Serializer():
+    """
+    Serializador precompilado de un modelo de flask-restx, equivalente a `marshal` en los listados.
+
+    `marshal` recorre los campos del modelo y resuelve su tipo en cada fila; aquí eso se hace una sola vez
+    al compilar el modelo y cada fila solo aplica la lista de conversiones. Los tipos de campo no
+    soportados (por ejemplo campos con `attribute` calculado) usan el `output` original del campo.
+
+    Atributos:
+        model (Model): Modelo de flask-restx que se serializa.
+        field_names (tuple): Campos incluidos, en el orden del modelo.
+    """
+
+    _compiled = {}  # (nombre del modelo, campos) -> Serializer
+
+    def __init__(self, model, field_names=None):
+        self.model = model
+        self.field_names = tuple(name for name in model if field_names is None or name in field_names)
+        self._steps = [self._compile_field(name, model[name]) for name in self.field_names]
+
+    @staticmethod
+    def for_model(model, field_names=None):
+        """
+        Obtiene (y guarda en caché) el serializador compilado de un modelo.
+
+        Args:
+            model (Model): Modelo de flask-restx.
+            field_names (list): Subconjunto de campos a incluir, None para todos.
+
+        Returns:
+            Serializer: El serializador compilado.
+        """
+        key = (model.name, frozenset(field_names) if field_names else None)
+        serializer = Serializer._compiled.get(key)
+        if serializer is None:
+            serializer = Serializer._compiled[key] = Serializer(model, field_names)
+        return serializer
+
+    def _compile_field(self, name, field):
+        if isinstance(field, type):
+            field = field()
+        attribute = field.attribute if field.attribute is not None else name
+        default = field.default
+
+        if isinstance(field, fields.Nested):
+            nested = Serializer.for_model(field.nested)
+            def step(obj):
+                value = _get(obj, attribute)
+                if value is None and (field.allow_null or default is not None):
+                    return None if field.allow_null else default
+                return nested._format(value)
+            return name, step
+
+        if isinstance(field, fields.List) and isinstance(field.container, fields.Nested):
+            nested = Serializer.for_model(field.container.nested)
+            def step(obj):
+                value = _get(obj, attribute)
+                return default if value is None else [nested._format(item) for item in value]
+            return name, step
+
+        if not isinstance(attribute, str) or '.' in attribute or field.mask:
+            return name, lambda obj: field.output(name, obj)
+
+        formatter = next((formatter for field_type, formatter in FORMATTERS if isinstance(field, field_type)), None)
+        if formatter is None:
+            return name, lambda obj: field.output(name, obj)
+
+        # Igual que Raw.output: los valores nulos se sustituyen por el valor por defecto del campo
+        formatted_default = formatter(default) if default else default
+        def step(obj):
+            value = _get(obj, attribute)
+            return formatted_default if value is None else formatter(value)
+        return name, step
+
+    def serialize(self, obj):
+        """
+        Serializa un objeto (o diccionario) según el modelo.
+
+        Args:
+            obj (object): Objeto ORM o diccionario.
+
+        Returns:
+            dict: Diccionario con los campos del modelo.
+        """
+        timings = RequestTimer.current()
+        if timings is None:
+            return self._format(obj)
+        started = time.perf_counter()
+        result = self._format(obj)
+        timings['serialize'] += time.perf_counter() - started
+        return result
+
+    def serialize_many(self, objs):
+        """
+        Serializa una lista de objetos según el modelo.
+
+        Args:
+            objs (list): Objetos ORM o diccionarios.
+
+        Returns:
+            list: Lista de diccionarios con los campos del modelo.
+        """
+        timings = RequestTimer.current()
+        started = time.perf_counter() if timings is not None else None
+        steps = self._steps
+        result = [{name: step(obj) for name, step in steps} for obj in objs]
+        if timings is not None:
+            timings['serialize'] += time.perf_counter() - started
+        return result
+
+    def _format(self, obj):
+        return {name: step(obj) for name, step in self._steps}
+
+    @staticmethod
+    def narrow_query(query, model_class, field_names):
+        """
+        Restringe el SELECT de una consulta a las columnas de los campos solicitados (load_only).
+
+        Args:
+            query (Query): Consulta sobre `model_class`.
+            model_class (Model): Modelo de SQLAlchemy consultado.
+            field_names (list): Campos solicitados, None para cargar todas las columnas.
+
+        Returns:
+            Query: La consulta con las columnas restringidas.
+        """
+        if not field_names:
+            return query
+        columns = [column for column in model_class.__table__.columns if column.key in field_names]
+        return query.options(load_only(*[getattr(model_class, column.key) for column in columns]))
+
+    @staticmethod
+    def get_request_fields(model, primary_key):
+        """
+        Obtiene los campos solicitados con el parámetro `?fields=` (sparse fieldsets).
+
+        Args:
+            model (Model): Modelo de respuesta del endpoint.
+            primary_key (str): Campo de clave primaria, que siempre se incluye (lo usa la paginación).
+
+        Returns:
+            list: Campos solicitados más la clave primaria, en el orden del modelo; None si no se indicó el parámetro.
+
+        Raises:
+            InvalidDataError: Si algún campo no existe en el modelo de respuesta.
+        """
+        return Serializer.parse_fields(request.args.get('fields'), model, primary_key)
+
+    @staticmethod
+    def parse_fields(value, model, primary_key):
+        """
+        Interpreta el valor del parámetro `?fields=` frente a un modelo de respuesta.
+
+        Args:
+            value (str): Campos separados por comas, None o vacío si no se indicó el parámetro.
+            model (Model): Modelo de respuesta del endpoint.
+            primary_key (str): Campo de clave primaria, que siempre se incluye (lo usa la paginación).
+
+        Returns:
+            list: Campos solicitados más la clave primaria, en el orden del modelo; None si no se indicó el parámetro.
+
+        Raises:
+            InvalidDataError: Si algún campo no existe en el modelo de respuesta.
+        """
+        if not value:
+            return None
+        requested = {name.strip() for name in value.split(',') if name.strip()}
+        unknown = sorted(requested - set(model))
+        if unknown:
+            raise InvalidDataError(f'Unknown fields: {", ".join(unknown)}. Available fields: {", ".join(model)}.')
+        requested.add(primary_key)
+        return [name for name in model if name in requested]
+
+
+def json_dumps(data):
+    """
+    Codifica un valor en JSON con orjson si está instalado, o con el módulo json en otro caso.
+
+    Args:
+        data (any): Valor a codificar.
+
+    Returns:
+        str: Documento JSON.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, default=str).decode('utf-8')
+    return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def output_json(data, code, headers=None):
+    """
+    Representación `application/json` de la API (sustituye a la de flask-restx) con codificación rápida.
+
+    Args:
+        data (any): Datos devueltos por el recurso.
+        code (int): Código de estado HTTP.
+        headers (dict): Encabezados adicionales de la respuesta.
+
+    Returns:
+        Response: Respuesta HTTP con el documento JSON.
+    """
+    timings = RequestTimer.current()
+    started = time.perf_counter() if timings is not None else None
+    if orjson is not None:
+        option = orjson.OPT_INDENT_2 if current_app.debug else 0
+        dumped = orjson.dumps(data, default=str, option=option | orjson.OPT_APPEND_NEWLINE)
+    else:
+        settings = dict(current_app.config.get('RESTX_JSON', {}))
+        if current_app.debug:
+            settings.setdefault('indent', 4)
+        dumped = json.dumps(data, **settings) + '\n'
+    if timings is not None:
+        timings['serialize'] += time.perf_counter() - started
+    response = make_response(dumped, code)
+    response.headers.extend(headers or {})
+    return response
+
+
+# Parámetro de selección de campos documentado en Swagger para los listados que lo admiten
+FIELDS_DOC_PARAMS = {
+    'fields': 'Campos a incluir separados por comas (por ejemplo user_id,nickname); la clave primaria siempre se incluye',
+}
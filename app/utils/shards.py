@@ -0,0 +1,356 @@
+import contextvars
+import functools
+import heapq
+import itertools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from operator import attrgetter
+from flask import current_app
+from sqlalchemy import event, false, func, inspect, select, text, update
+from sqlalchemy.sql import Insert
+from .metrics import Counter
+from .pagination import Pagination
+
+# Prefijo de las claves de SQLALCHEMY_BINDS de los shards adicionales (el shard 0 es la base de datos principal)
+SHARD_BIND_PREFIX = 'shard_'
+
+# Tablas repartidas por usuario y su clave primaria autoincremental
+SHARDED_KEYS = {'users': 'user_id', 'assignments': 'assignment_id', 'completed_dates': 'completed_date_id'}
+
+# Tablas que solo se usan en el shard 0: las versiones de los ETags, el estado de las purgas y la reserva de los
+# nicknames y los emails (únicos entre todos los shards) son globales
+GLOBAL_TABLES = ('table_versions', 'purge_jobs', 'user_identities')
+
+
+def is_global(mapper=None, clause=None):
+    """
+    Indica si una sentencia usa una de las tablas globales, que siempre se leen y escriben en el shard 0.
+
+    Args:
+        mapper (Mapper | type): Modelo de la sentencia, si la ejecuta el ORM.
+        clause (ClauseElement): La sentencia.
+
+    Returns:
+        bool: True si la tabla de la sentencia está en GLOBAL_TABLES.
+    """
+    table = inspect(mapper).local_table if mapper is not None else getattr(clause, 'table', clause)
+    return getattr(table, 'name', None) in GLOBAL_TABLES
+
+
+def _set_auto_increment(count, index, dbapi_connection, record):
+    # MySQL genera en el shard `index` solo IDs con (id - 1) % count == index, así no se repiten entre shards
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f'SET SESSION auto_increment_increment = {count}, auto_increment_offset = {index + 1}')
+    cursor.close()
+
+
+class ShardRouter():
+    """
+    Reparte los usuarios, sus asignaciones, sus resúmenes y sus fechas completadas entre varias bases de datos.
+
+    El shard 0 es la base de datos principal (SQLALCHEMY_DATABASE_URI) y los demás se añaden como binds
+    (`shard_1`, `shard_2`, ...). Un usuario vive en el shard `(user_id - 1) % count`, junto con todas sus filas
+    dependientes; el catálogo de hábitos se replica con el mismo ID en todos los shards, y las tablas globales
+    (`table_versions`, `purge_jobs` y `user_identities`) solo se usan en el shard 0.
+
+    Los servicios fijan el shard de la operación con `use` (la sesión envía allí todas las sentencias salvo las de
+    las tablas globales); los listados completos se reparten entre todos los shards en paralelo, cada uno con su
+    propia sesión, y se mezclan por la clave primaria. Para que los IDs nunca se repitan entre shards, en MySQL
+    cada conexión usa `auto_increment_increment` y `auto_increment_offset`; en SQLite, que no los tiene, el
+    router asigna los IDs antes de cada INSERT, con el bloqueo de escritura de la base ya tomado.
+
+    Con un único shard (sin DATABASE_SHARD_URLS) todos los métodos conservan el comportamiento de una sola base.
+
+    Atributos:
+        count (int): Número de shards.
+        workers (int): Hilos de cada proceso que ejecutan las consultas repartidas entre los shards.
+    """
+
+    def __init__(self):
+        self.count = 1
+        self.workers = 1
+        self.session = None
+        self.engines = []
+        self._next_shard = itertools.count()
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+        self.fan_outs = Counter('db_shard_fan_out_total', 'Operaciones repartidas entre todos los shards', labelnames=('operation',))
+
+    @property
+    def enabled(self):
+        return self.count > 1
+
+    def init_app(self, app):
+        """
+        Añade los shards adicionales a SQLALCHEMY_BINDS.
+
+        Debe llamarse antes de `db.init_app`, que crea un motor por cada bind.
+
+        Args:
+            app (Flask): La aplicación configurada.
+        """
+        uris = app.config['SQLALCHEMY_SHARD_URIS']
+        binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+        for index, uri in enumerate(uris, start=1):
+            binds[f'{SHARD_BIND_PREFIX}{index}'] = uri
+        app.config['SQLALCHEMY_BINDS'] = binds
+        self.count = 1 + len(uris)
+        self.workers = max(1, app.config['SHARD_FAN_OUT_WORKERS'])
+
+    def register(self, session, engines):
+        """
+        Guarda la sesión y los motores de los shards, y registra la generación de IDs de cada uno.
+
+        Args:
+            session (scoped_session): Sesión de la aplicación (`db.session`).
+            engines (Mapping): Motores por clave de bind (`db.engines`, con None para la base principal).
+        """
+        self.session = session
+        self.engines = [engines[None]] + [engines[f'{SHARD_BIND_PREFIX}{index}'] for index in range(1, self.count)]
+        if not self.enabled:
+            return
+        for index, engine in enumerate(self.engines):
+            if engine.dialect.name == 'mysql':
+                event.listen(engine, 'connect', functools.partial(_set_auto_increment, self.count, index))
+            else:
+                event.listen(engine, 'before_execute', self._assign_ids, retval=True)
+
+    def shard_for(self, user_id):
+        """
+        Returns:
+            int: Shard en el que vive el usuario.
+        """
+        return (user_id - 1) % self.count
+
+    def new_shard(self):
+        """
+        Returns:
+            int: Shard en el que se registra un usuario nuevo (por turnos).
+        """
+        return next(self._next_shard) % self.count
+
+    def use(self, shard):
+        """
+        Fija el shard en el que la sesión de la petición ejecuta las sentencias siguientes.
+
+        El shard 0 deja la sesión como sin shards (y sus lecturas pueden ir a una réplica de lectura).
+
+        Args:
+            shard (int): Índice del shard.
+        """
+        if self.enabled:
+            self.session.info['shard'] = self.engines[shard] if shard else None
+
+    def use_for_user(self, user_id):
+        """
+        Fija el shard del usuario indicado.
+
+        Args:
+            user_id (int): ID del usuario.
+        """
+        self.use(self.shard_for(user_id))
+
+    def each(self, shards=None):
+        """
+        Recorre los shards fijando cada uno en la sesión, y al terminar restablece el shard anterior.
+
+        Las sentencias de todos los shards forman parte de la transacción de la sesión, que en el commit
+        confirma la conexión de cada shard (sin commit en dos fases).
+
+        Args:
+            shards (iterable): Índices de los shards, por defecto todos.
+
+        Yields:
+            int: El índice del shard fijado.
+        """
+        previous = self.session.info.get('shard')
+        try:
+            for shard in (range(self.count) if shards is None else shards):
+                self.use(shard)
+                yield shard
+        finally:
+            self.session.info['shard'] = previous
+
+    def locate_many(self, key_column, keys):
+        """
+        Busca en qué shard está cada fila de una tabla repartida (por ejemplo asignaciones o fechas completadas).
+
+        Args:
+            key_column (Column): Clave primaria de la tabla.
+            keys (iterable): Valores de la clave primaria.
+
+        Returns:
+            dict: {clave: shard}; las claves que no existen en ningún shard se asignan al shard 0.
+        """
+        keys = list(keys)
+        shards = dict.fromkeys(keys, 0)
+        if not self.enabled or not keys:
+            return shards
+        found = self.fan_out(lambda session: session.scalars(select(key_column).where(key_column.in_(keys))).all(), 'locate')
+        for shard, shard_keys in enumerate(found):
+            shards.update(dict.fromkeys(shard_keys, shard))
+        return shards
+
+    def use_for_key(self, key_column, key):
+        """
+        Fija el shard en el que está la fila indicada (el shard 0 si no existe en ninguno).
+
+        Args:
+            key_column (Column): Clave primaria de la tabla.
+            key (int): Valor de la clave primaria.
+        """
+        if self.enabled:
+            self.use(self.locate_many(key_column, [key])[key])
+
+    def fan_out(self, loader, operation):
+        """
+        Ejecuta `loader` en todos los shards en paralelo, cada uno con su propia sesión.
+
+        Args:
+            loader (callable): Función que recibe la sesión del shard y devuelve su resultado; los objetos que
+                               devuelve quedan separados de la sesión, con las columnas ya cargadas.
+            operation (str): Nombre de la operación para las métricas.
+
+        Returns:
+            list: El resultado de cada shard, en el orden de los shards.
+        """
+        self.fan_outs.inc(operation=operation)
+        # El shard 0 usa la réplica de lectura de la petición, si tiene una
+        engines = [self.session.info.get('read_replica') or self.engines[0]] + self.engines[1:]
+        with self._lock:
+            executor = self._get_executor()
+        # Cada tarea copia las ContextVar de la petición, así sus consultas cuentan en las métricas de la petición
+        futures = [executor.submit(contextvars.copy_context().run, self._run, engine, loader) for engine in engines]
+        return [future.result() for future in futures]
+
+    def _get_executor(self):
+        # Como el pool de tareas en segundo plano, se crea de forma perezosa en cada proceso
+        if self._executor is None or self._executor_pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='shard-fan-out')
+            self._executor_pid = os.getpid()
+        return self._executor
+
+    def _run(self, engine, loader):
+        session = self.session.session_factory(info={'shard': engine})
+        try:
+            return loader(session)
+        finally:
+            session.close()
+
+    def paginate(self, build_query, key_column, after=None, before=None, limit=None):
+        """
+        Obtiene una página paginada por cursor de una tabla repartida entre los shards.
+
+        Cada shard devuelve su propia página (hasta `limit + 1` filas ordenadas por la clave primaria) y las
+        páginas se mezclan en orden, así el resultado es el mismo que con una sola base de datos.
+
+        Args:
+            build_query (callable): Función que recibe una sesión y devuelve la consulta base.
+            key_column (Column): Columna de clave primaria usada como clave del cursor.
+            after (str): Cursor a partir del cual se obtiene la página siguiente.
+            before (str): Cursor antes del cual se obtiene la página anterior.
+            limit (int): Tamaño de página solicitado.
+
+        Returns:
+            Page: La página de resultados con los cursores de navegación.
+
+        Raises:
+            InvalidDataError: Si se envían ambos cursores o alguno no es válido.
+        """
+        if not self.enabled:
+            return Pagination.paginate(build_query(self.session), key_column, after, before, limit)
+        config = current_app.config
+
+        def load(session):
+            query, page_limit = Pagination.prepare(build_query(session), key_column, after, before, limit, config)
+            return query.all(), page_limit
+
+        pages = self.fan_out(load, 'paginate')
+        page_limit = pages[0][1]
+        rows = heapq.merge(*(rows for rows, _ in pages), key=attrgetter(key_column.key), reverse=bool(before))
+        return Pagination.build_page(list(itertools.islice(rows, page_limit + 1)), page_limit, key_column.key, after, before)
+
+    def stream(self, build_query, key_column):
+        """
+        Prepara la exportación en streaming de una tabla repartida entre los shards.
+
+        Args:
+            build_query (callable): Función que recibe una sesión y devuelve la consulta base.
+            key_column (Column): Columna de clave primaria para ordenar la exportación.
+
+        Returns:
+            Query | MergedStream: La consulta de `Streaming.stream_query`, o con varios shards un iterador que mezcla
+                                  en orden las exportaciones de todos.
+        """
+        from .streaming import Streaming
+        if not self.enabled:
+            return Streaming.stream_query(build_query(self.session), key_column)
+        self.fan_outs.inc(operation='stream')
+        sessions = [self.session.session_factory(info={'shard': engine}) for engine in self.engines]
+        queries = [Streaming.stream_query(build_query(session), key_column) for session in sessions]
+        return MergedStream(queries, sessions, key_column.key)
+
+    def stats(self):
+        """
+        Returns:
+            dict: Número de shards, usuarios de cada shard, hilos de las consultas repartidas y operaciones
+                  repartidas del proceso que atiende la petición.
+        """
+        users = self.fan_out(lambda session: session.scalar(text('SELECT COUNT(*) FROM users')), 'stats')
+        return {
+            'shards': self.count,
+            'users_per_shard': users,
+            'fan_out_workers': self.workers,
+            'fan_outs': self.fan_outs.snapshot(),
+        }
+
+    def _assign_ids(self, conn, clauseelement, multiparams, params, execution_options):
+        # Solo en SQLite: los INSERT de las tablas repartidas sin clave primaria reciben IDs de la serie del shard
+        if (not isinstance(clauseelement, Insert) or clauseelement.table.name not in SHARDED_KEYS
+                or clauseelement.select is not None):
+            return clauseelement, multiparams, params
+        key = SHARDED_KEYS[clauseelement.table.name]
+        rows = multiparams if multiparams else [params]
+        missing = [index for index, row in enumerate(rows) if row.get(key) is None]
+        if not missing:
+            return clauseelement, multiparams, params
+        ids = self._allocate_ids(conn, clauseelement.table, key, len(missing))
+        rows = [dict(row) for row in rows]
+        for index, new_id in zip(missing, ids):
+            rows[index][key] = new_id
+        return (clauseelement, rows, {}) if multiparams else (clauseelement, [], rows[0])
+
+    def _allocate_ids(self, conn, table, key, amount):
+        index = self.engines.index(conn.engine)
+        # Un UPDATE que no modifica ninguna fila toma el bloqueo de escritura de la base antes de leer el máximo:
+        # ninguna otra conexión (de este u otro proceso) puede insertar hasta el commit, así dos conexiones nunca
+        # reciben el mismo ID
+        conn.execute(update(table).where(false()).values({key: table.c[key]}))
+        last_ids = conn.info.setdefault('shard_last_ids', {})
+        last = max(conn.scalar(select(func.max(table.c[key]))) or 0, last_ids.get(table.name, 0))
+        first = last + 1 + (index - last) % self.count
+        ids = [first + step * self.count for step in range(amount)]
+        last_ids[table.name] = ids[-1]
+        return ids
+
+
+class MergedStream():
+    """
+    Exportación en streaming de varios shards, mezclada en orden por la clave primaria.
+
+    Cada shard se lee con su propio cursor del lado del servidor; `close` cierra las sesiones de todos.
+    """
+
+    def __init__(self, queries, sessions, key_name):
+        self.queries = queries
+        self.sessions = sessions
+        self.key_name = key_name
+
+    def __iter__(self):
+        return heapq.merge(*self.queries, key=attrgetter(self.key_name))
+
+    def close(self):
+        for session in self.sessions:
+            session.close()
@@ -0,0 +1,54 @@
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+from sqlalchemy.types import Integer
+
+
+class day_number(FunctionElement):
+    """
+    Número de día consecutivo de una fecha, para restar fechas y detectar días seguidos en SQL.
+
+    Se compila a la función equivalente de cada motor: TO_DAYS en MySQL/MariaDB,
+    julianday en SQLite y la resta de fechas en PostgreSQL.
+    """
+    type = Integer()
+    name = 'day_number'
+    inherit_cache = True
+
+
+class weekday(FunctionElement):
+    """
+    Día de la semana de una fecha, de 0 (lunes) a 6 (domingo), igual que `date.weekday()` de Python.
+    """
+    type = Integer()
+    name = 'weekday'
+    inherit_cache = True
+
+
+@compiles(day_number)
+def _day_number_default(element, compiler, **kw):
+    return 'TO_DAYS(%s)' % compiler.process(element.clauses, **kw)
+
+
+@compiles(day_number, 'sqlite')
+def _day_number_sqlite(element, compiler, **kw):
+    return 'CAST(julianday(%s) AS INTEGER)' % compiler.process(element.clauses, **kw)
+
+
+@compiles(day_number, 'postgresql')
+def _day_number_postgresql(element, compiler, **kw):
+    return "(%s - DATE '1970-01-01')" % compiler.process(element.clauses, **kw)
+
+
+@compiles(weekday)
+def _weekday_default(element, compiler, **kw):
+    return 'WEEKDAY(%s)' % compiler.process(element.clauses, **kw)
+
+
+@compiles(weekday, 'sqlite')
+def _weekday_sqlite(element, compiler, **kw):
+    return "((CAST(strftime('%%w', %s) AS INTEGER) + 6) %% 7)" % compiler.process(element.clauses, **kw)
+
+
+@compiles(weekday, 'postgresql')
+def _weekday_postgresql(element, compiler, **kw):
+    return '(CAST(EXTRACT(ISODOW FROM %s) AS INTEGER) - 1)' % compiler.process(element.clauses, **kw)
@@ -0,0 +1,81 @@
+from flask import Response, current_app, request, stream_with_context
+from .serializers import Serializer, json_dumps
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+
+class Streaming():
+    """
+    Exportación en streaming (NDJSON) para los listados completos de una tabla.
+
+    Las filas se leen con cursores del lado del servidor (`yield_per`) y se envían una por línea
+    desde un generador, por lo que la memoria se mantiene constante sin importar el tamaño de la tabla.
+    """
+
+    @staticmethod
+    def is_requested():
+        """
+        Indica si la petición actual solicita la exportación en streaming.
+
+        Se activa con el encabezado `Accept: application/x-ndjson` o con el parámetro `?stream=1`.
+
+        Returns:
+            bool: True si se debe responder en formato NDJSON.
+        """
+        if request.args.get('stream', '').lower() in ('1', 'true'):
+            return True
+        # JSON va primero para que `Accept: */*` conserve la respuesta paginada habitual
+        return request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+    @staticmethod
+    def stream_query(query, key_column):
+        """
+        Prepara una consulta para leerse por lotes con un cursor del lado del servidor.
+
+        Args:
+            query (Query): Consulta base a exportar.
+            key_column (Column): Columna de clave primaria para ordenar la exportación.
+
+        Returns:
+            Query: Consulta ordenada que se materializa en lotes de STREAM_BATCH_SIZE filas.
+        """
+        # yield_per activa stream_results, así el driver no carga el resultado completo en memoria
+        return query.order_by(key_column.asc()).yield_per(current_app.config['STREAM_BATCH_SIZE'])
+
+    @staticmethod
+    def ndjson_response(query, response_model, field_names=None):
+        """
+        Construye una respuesta HTTP que envía cada fila como una línea JSON.
+
+        Args:
+            query (Query | MergedStream): Consulta preparada con `stream_query`, o la exportación de varios shards.
+            response_model (Model): Modelo de flask-restx usado para formatear cada fila.
+            field_names (list): Subconjunto de campos del modelo a exportar, None para todos.
+
+        Returns:
+            Response: Respuesta en streaming con el tipo de contenido application/x-ndjson.
+        """
+        serializer = Serializer.for_model(response_model, field_names)
+
+        def generate():
+            try:
+                for obj in query:
+                    yield json_dumps(serializer.serialize(obj)) + '\n'
+            finally:
+                # Al terminar la vista, el teardown de la petición ya retiró la sesión del registro, pero la consulta
+                # sigue usando el mismo objeto Session: se cierra aquí para devolver su conexión al pool, también
+                # cuando el cliente se desconecta a mitad de la exportación (una exportación de varios shards cierra
+                # la sesión de cada uno)
+                if hasattr(query, 'close'):
+                    query.close()
+                else:
+                    query.session.close()
+
+        # stream_with_context mantiene el contexto de la aplicación mientras se envían las filas
+        return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
+
+
+# Parámetro de exportación documentado en Swagger para los listados que admiten streaming
+STREAM_DOC_PARAMS = {
+    'stream': 'Si es 1, exporta todas las filas en formato NDJSON (equivalente a Accept: application/x-ndjson)',
+}
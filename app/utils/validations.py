@@ -1,6 +1,14 @@
+from datetime import date
+from sqlalchemy.exc import IntegrityError
 from app import db
 from .exceptions import *
 
+# Códigos de los errores de integridad por valor duplicado y por clave foránea inexistente, de SQLite
+# (SQLITE_CONSTRAINT_PRIMARYKEY/UNIQUE y SQLITE_CONSTRAINT_FOREIGNKEY), MySQL (ER_DUP_ENTRY y ER_NO_REFERENCED_ROW)
+# y PostgreSQL (unique_violation y foreign_key_violation)
+DUPLICATE_ERROR_CODES = {1555, 2067, 1062, '23505'}
+FOREIGN_KEY_ERROR_CODES = {787, 1216, 1452, '23503'}
+
 class Validations():
     @staticmethod
     def check_if_exists(obj, type_obj):
@@ -37,8 +45,7 @@ class Validations():
         Raises:
             ValueError: Si el valor ya existe, lanza un error con el mensaje "{name} already exists".
         """
-        if db.session.query(db.exists().where(attribute == value)).scalar():
-            raise DuplicateValueError(f'{name} already exists. Please choose a different one.')
+        Validations.check_all(Validations.field_check(attribute, value, name))
 
     @staticmethod
     def check_fk_existence(attribute, value, tablename):
@@ -57,8 +64,7 @@ class Validations():
             ValueError: Si la clave foránea no existe, lanza un error con el mensaje
                         "The primary key {value} does not exist in the {tablename} table."
         """
-        if not db.session.query(db.exists().where(attribute == value)).scalar():
-            raise NotFoundError(f'The primary key {value} does not exist in the {tablename} table.')
+        Validations.check_all(Validations.fk_check(attribute, value, tablename))
 
     @staticmethod
     def check_data_pair_existence(attribute1, value1, attribute2, value2, name):
@@ -79,11 +85,221 @@ class Validations():
             ValueError: Si la combinación de valores ya existe, lanza un error con el mensaje
                         "{name} already exists. Please choose a different {name}."
         """
-        if db.session.query(db.exists().where(db.and_(attribute1 == value1, attribute2 == value2))).scalar():
-            raise DuplicateValueError(f'This {name} already exists. Please choose a different {name}.')
+        Validations.check_all(Validations.data_pair_check(attribute1, value1, attribute2, value2, name))
         
+    @staticmethod
+    def field_check(attribute, value, name):
+        """
+        Construye la verificación de que un valor no exista todavía en un campo de la base de datos.
+
+        Args:
+            attribute (Column): La columna en la base de datos que se va a verificar.
+            value (any): El valor que no debe existir en el atributo.
+            name (str): El nombre descriptivo del campo para usar en el mensaje de error.
+
+        Returns:
+            tuple: Verificación (condición, debe_existir, error) para usar con `check_all`.
+        """
+        return (attribute == value, False, DuplicateValueError(f'{name} already exists. Please choose a different one.'))
+
+    @staticmethod
+    def fk_check(attribute, value, tablename):
+        """
+        Construye la verificación de que una clave foránea exista en su tabla.
+
+        Args:
+            attribute (Column): La columna en la base de datos que representa la clave foránea.
+            value (any): El valor esperado de la clave foránea.
+            tablename (str): El nombre de la tabla donde se busca la clave foránea.
+
+        Returns:
+            tuple: Verificación (condición, debe_existir, error) para usar con `check_all`.
+        """
+        return (attribute == value, True, NotFoundError(f'The primary key {value} does not exist in the {tablename} table.'))
+
+    @staticmethod
+    def data_pair_check(attribute1, value1, attribute2, value2, name):
+        """
+        Construye la verificación de que una combinación de dos valores no exista todavía.
+
+        Args:
+            attribute1 (Column): La primera columna a verificar.
+            value1 (any): El valor de la primera columna.
+            attribute2 (Column): La segunda columna a verificar.
+            value2 (any): El valor de la segunda columna.
+            name (str): Nombre descriptivo de la combinación para usar en el mensaje de error.
+
+        Returns:
+            tuple: Verificación (condición, debe_existir, error) para usar con `check_all`.
+        """
+        return (db.and_(attribute1 == value1, attribute2 == value2), False,
+                DuplicateValueError(f'This {name} already exists. Please choose a different {name}.'))
+
+    @staticmethod
+    def check_all(*checks):
+        """
+        Ejecuta varias verificaciones de existencia en una sola consulta a la base de datos.
+
+        Todas las condiciones se evalúan en un único `SELECT EXISTS(...), EXISTS(...), ...`,
+        y los errores se lanzan en el mismo orden en que se pasaron las verificaciones.
+
+        Args:
+            *checks (tuple): Verificaciones construidas con `field_check`, `fk_check` o `data_pair_check`.
+
+        Returns:
+            None
+
+        Raises:
+            NotFoundError: Si una clave foránea verificada no existe.
+            DuplicateValueError: Si un valor o combinación de valores verificada ya existe.
+        """
+        if not checks:
+            return
+        results = db.session.query(*[db.exists().where(condition) for condition, _, _ in checks]).one()
+        for (_, must_exist, error), exists in zip(checks, results):
+            if bool(exists) != must_exist:
+                raise error
+
+    @staticmethod
+    def commit_session(name):
+        """
+        Confirma la transacción actual traduciendo las violaciones de restricciones de la base de datos.
+
+        Las restricciones UNIQUE y FOREIGN KEY cubren la carrera entre la verificación y la escritura:
+        si otra petición insertó el mismo valor entre ambas, el error se traduce a las excepciones de la aplicación.
+
+        Args:
+            name (str): Nombre descriptivo del registro para usar en el mensaje de error.
+
+        Returns:
+            None
+
+        Raises:
+            DuplicateValueError: Si se viola una restricción de unicidad.
+            NotFoundError: Si se viola una restricción de clave foránea.
+        """
+        try:
+            db.session.commit()
+        except IntegrityError as e:
+            Validations._raise_integrity_error(e, name)
+
+    @staticmethod
+    def flush_session(name):
+        """
+        Envía las escrituras pendientes sin confirmar la transacción, traduciendo las violaciones de restricciones.
+
+        Se usa cuando una escritura debe ser visible para las consultas siguientes de la misma transacción
+        (por ejemplo, para recalcular un resumen que incluye la fila recién insertada).
+
+        Args:
+            name (str): Nombre descriptivo del registro para usar en el mensaje de error.
+
+        Returns:
+            None
+
+        Raises:
+            DuplicateValueError: Si se viola una restricción de unicidad.
+            NotFoundError: Si se viola una restricción de clave foránea.
+        """
+        try:
+            db.session.flush()
+        except IntegrityError as e:
+            Validations._raise_integrity_error(e, name)
+
+    @staticmethod
+    def execute_statement(statement, name):
+        """
+        Ejecuta una sentencia UPDATE o DELETE en la transacción actual, traduciendo las violaciones de restricciones.
+
+        Args:
+            statement (Executable): Sentencia a ejecutar.
+            name (str): Nombre descriptivo del registro para usar en el mensaje de error.
+
+        Returns:
+            Result: El resultado de la sentencia (filas afectadas y, si se pidió, las columnas de RETURNING).
+
+        Raises:
+            DuplicateValueError: Si se viola una restricción de unicidad.
+            NotFoundError: Si se viola una restricción de clave foránea.
+        """
+        try:
+            return db.session.execute(statement, execution_options={'synchronize_session': False})
+        except IntegrityError as e:
+            Validations._raise_integrity_error(e, name)
+
+    @staticmethod
+    def _raise_integrity_error(error, name):
+        # Revierte la transacción y traduce el error de integridad a las excepciones de la aplicación según su código:
+        # una clave foránea rota (por ejemplo, el usuario o el hábito se eliminó a la vez) no es un valor duplicado
+        db.session.rollback()
+        if Validations.is_foreign_key_violation(error):
+            raise NotFoundError(f'A record referenced by this {name} does not exist.')
+        if Validations.is_duplicate_violation(error):
+            raise DuplicateValueError(f'This {name} already exists. Please choose a different {name}.')
+        raise error
+
+    @staticmethod
+    def is_foreign_key_violation(error):
+        """
+        Indica si un error de integridad se debe a una clave foránea que no existe.
+
+        Args:
+            error (IntegrityError): El error lanzado por SQLAlchemy.
+
+        Returns:
+            bool: True si la fila referenciada no existe (por ejemplo, se eliminó a la vez).
+        """
+        code = Validations._integrity_error_code(error.orig)
+        return code in FOREIGN_KEY_ERROR_CODES or (code is None and 'foreign key' in str(error.orig).lower())
+
+    @staticmethod
+    def is_duplicate_violation(error):
+        """
+        Indica si un error de integridad se debe a un valor duplicado (restricción UNIQUE o clave primaria).
+
+        Args:
+            error (IntegrityError): El error lanzado por SQLAlchemy.
+
+        Returns:
+            bool: True si el valor ya existe.
+        """
+        code = Validations._integrity_error_code(error.orig)
+        message = str(error.orig).lower()
+        return code in DUPLICATE_ERROR_CODES or (code is None and ('duplicate' in message or 'unique' in message))
+
+    @staticmethod
+    def _integrity_error_code(orig):
+        # Código del error del driver: extended result code en SQLite, errno en MySQL y SQLSTATE en PostgreSQL
+        code = getattr(orig, 'sqlite_errorcode', None) or getattr(orig, 'pgcode', None)
+        if code is None and orig.args and isinstance(orig.args[0], int):
+            code = orig.args[0]
+        return code
+
     @staticmethod
     def Check_data_time_of_day(data):
         options=['mañana','tarde','noche']
         if data not in options:
             raise InvalidDataError('The value entered in the time_of_day field is incorrect. It must be [mañana, tarde, noche].')
+
+    @staticmethod
+    def check_date(value):
+        """
+        Verifica que un valor sea una fecha válida en formato ISO 8601 (AAAA-MM-DD).
+
+        Args:
+            value (str | date): La fecha a verificar. Si es None se usa la fecha actual.
+
+        Returns:
+            date: La fecha convertida.
+
+        Raises:
+            InvalidDataError: Si el valor no es una fecha válida.
+        """
+        if value is None:
+            return date.today()
+        if isinstance(value, date):
+            return value
+        try:
+            return date.fromisoformat(value)
+        except (TypeError, ValueError):
+            raise InvalidDataError(f'The value {value} is not a valid date. It must be in the format YYYY-MM-DD.')
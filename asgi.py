@@ -0,0 +1,4 @@
+from app.asgi import create_asgi_app
+
+# Crear la aplicación ASGI de lecturas asíncronas (el perfil se elige con APP_ENV); se sirve con `uvicorn asgi:app`
+app = create_asgi_app()
@@ -0,0 +1,71 @@
+import os
+import sys
+
+# Permite ejecutar los benchmarks desde la raíz del proyecto con `python -m benchmarks.<modulo>`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import BenchmarkConfig
+
+DEFAULT_DATABASE_URI = 'sqlite:///benchmark.db'
+
+
+def build_app(database_uri=DEFAULT_DATABASE_URI):
+    """
+    Crea la aplicación con `create_app` y el perfil BenchmarkConfig, apuntando a la base de datos del benchmark.
+
+    Args:
+        database_uri (str): URI de la base de datos (SQLite local o una instancia MySQL de pruebas).
+
+    Returns:
+        Flask: La aplicación configurada.
+    """
+    BenchmarkConfig.SQLALCHEMY_DATABASE_URI = database_uri
+    from app import create_app
+    return create_app(BenchmarkConfig)
+
+
+def percentile(samples, fraction):
+    """
+    Calcula un percentil por el método del rango más cercano.
+
+    Args:
+        samples (list): Muestras de latencia.
+        fraction (float): Percentil entre 0 y 1 (por ejemplo 0.99).
+
+    Returns:
+        float: El valor del percentil, 0.0 si no hay muestras.
+    """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+
+def compare_to_baseline(results, baseline, tolerance, metrics):
+    """
+    Compara los resultados de un benchmark con los de una ejecución anterior guardada en JSON.
+
+    Args:
+        results (dict): Resultados actuales, {escenario: {métrica: valor}}.
+        baseline (dict): Resultados de referencia con la misma estructura.
+        tolerance (float): Empeoramiento relativo admitido (por ejemplo 0.2 para un 20 %).
+        metrics (dict): Métricas comparadas, {métrica: True si más alto es mejor (throughput), False si es peor (latencia)}.
+
+    Returns:
+        list: Regresiones encontradas, con el escenario, la métrica, ambos valores y el cambio relativo.
+    """
+    regressions = []
+    for name, current in results.items():
+        reference = baseline.get(name)
+        if not reference:
+            continue
+        for metric, higher_is_better in metrics.items():
+            before, after = reference.get(metric), current.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append({'scenario': name, 'metric': metric, 'baseline': before, 'current': after,
+                                    'change_pct': round(change * 100, 2)})
+    return regressions
@@ -0,0 +1,82 @@
+import random
+import bcrypt
+from datetime import date, datetime, timedelta
+from app import db
+from app.models.assignment_model import Assignment
+from app.models.completed_date_model import CompletedDate
+from app.models.habit_model import Habit
+from app.models.user_identity_model import UserIdentity
+from app.models.user_model import User
+from app.utils.bulk import Bulk
+
+TIMES_OF_DAY = ('mañana', 'tarde', 'noche')
+
+# Contraseña común a todos los usuarios generados (hash con coste mínimo para no ralentizar la carga)
+PASSWORD = 'benchmark-password'
+
+
+def seed_database(users, habits, assignments, dates, seed=42, chunk_size=10000, end_date=None):
+    """
+    Puebla la base de datos con datos deterministas para los benchmarks.
+
+    Las asignaciones se reparten entre usuarios y hábitos sin repetir pares, y las fechas de
+    completación se reparten entre las asignaciones como días consecutivos con huecos aleatorios
+    hacia atrás desde `end_date`, sin repetir días dentro de la misma asignación.
+
+    Args:
+        users (int): Número de usuarios.
+        habits (int): Número de hábitos.
+        assignments (int): Número de asignaciones (como máximo users * habits).
+        dates (int): Número total de fechas de completación.
+        seed (int): Semilla del generador pseudoaleatorio.
+        chunk_size (int): Filas por sentencia INSERT.
+        end_date (date): Fecha más reciente generada, por defecto hoy.
+
+    Returns:
+        dict: Número de filas insertadas por tabla.
+    """
+    rng = random.Random(seed)
+    end_date = end_date or date.today()
+    created = datetime(2024, 1, 1)
+    assignments = min(assignments, users * habits)
+    password_hash = bcrypt.hashpw(PASSWORD.encode('utf-8'), bcrypt.gensalt(4)).decode('utf-8')
+
+    def insert(model, rows):
+        for chunk in Bulk.chunked(rows, chunk_size):
+            db.session.execute(db.insert(model), chunk)
+        db.session.commit()
+
+    insert(User, ({
+        'user_id': i, 'first_name': f'First {i}', 'last_name': f'Last {i}', 'nickname': f'user{i}',
+        'email': f'user{i}@example.com', 'user_password': password_hash, 'user_status': True,
+        'user_created_date': created,
+    } for i in range(1, users + 1)))
+
+    insert(UserIdentity, ({
+        'user_id': i, 'nickname': f'user{i}', 'email': f'user{i}@example.com',
+    } for i in range(1, users + 1)))
+
+    insert(Habit, ({
+        'habit_id': i, 'habit_name': f'Habit {i}', 'time_of_day': TIMES_OF_DAY[i % 3], 'habit_status': True,
+    } for i in range(1, habits + 1)))
+
+    # El par (usuario, hábito) se deriva del índice, así nunca se repite
+    insert(Assignment, ({
+        'assignment_id': i, 'created_date': created, 'assignment_status': True,
+        'fk_user_id': (i - 1) % users + 1, 'fk_habit_id': (i - 1) // users + 1,
+    } for i in range(1, assignments + 1)))
+
+    def date_rows():
+        per_assignment, remainder = divmod(dates, assignments) if assignments else (0, 0)
+        row_id = 1
+        for assignment_id in range(1, assignments + 1):
+            count = per_assignment + (1 if assignment_id <= remainder else 0)
+            day = end_date
+            for _ in range(count):
+                yield {'completed_date_id': row_id, 'fk_assignment_id': assignment_id, 'completed_date': day}
+                row_id += 1
+                # Rachas de días consecutivos con huecos ocasionales
+                day -= timedelta(days=1 if rng.random() < 0.85 else rng.randint(2, 5))
+
+    insert(CompletedDate, date_rows())
+    return {'users': users, 'habits': habits, 'assignments': assignments, 'completed_dates': dates}
@@ -0,0 +1,90 @@
+"""
+Configuración de gunicorn para servir la aplicación en producción.
+
+Uso:
+    gunicorn -c gunicorn.conf.py run:app
+
+Cada valor se puede ajustar con su variable de entorno (ver la tabla de variables del readme).
+"""
+import multiprocessing
+import os
+
+# Perfil de producción salvo que se indique otro; se fija antes de que preload_app importe run:app
+os.environ.setdefault('APP_ENV', 'production')
+
+# Dirección en la que escucha el servidor
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+# Procesos: la fórmula habitual de gunicorn (2 × núcleos + 1); las peticiones pasan la mayor parte del tiempo
+# esperando a MySQL o al pool de hashes, así que los hilos de cada worker cubren el resto de la concurrencia
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+# La aplicación lee el número de workers (por ejemplo para no usar la caché por proceso con varios workers)
+os.environ['WEB_CONCURRENCY'] = str(workers)
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+# Tamaño de los pools de cada worker salvo que se indique otro: una conexión permanente por hilo más otras tantas
+# bajo carga (purgas en segundo plano, incremento de versiones tras el commit), y los núcleos repartidos entre los
+# pools de hashes de todos los workers. Se fija antes de que la aplicación lea su configuración
+os.environ.setdefault('DB_POOL_SIZE', str(threads))
+os.environ.setdefault('DB_MAX_OVERFLOW', str(threads))
+os.environ.setdefault('PASSWORD_HASH_WORKERS', str(max(1, multiprocessing.cpu_count() // workers)))
+
+# Conexiones que admite cada servidor de base de datos (max_connections de MySQL, 151 por defecto)
+db_max_connections = int(os.environ.get('DB_MAX_CONNECTIONS', 151))
+
+# Importa la aplicación una sola vez en el proceso maestro: los workers comparten ese código en memoria
+# (copy-on-write) y arrancan más rápido. El motor de la base de datos se renueva en cada worker en post_fork
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() in ('1', 'true', 'yes')
+
+# Segundos sin respuesta tras los que se reinicia un worker, segundos para terminar las peticiones en curso al
+# recargar o detener el servidor, y segundos que se mantiene abierta una conexión keep-alive
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# Reinicio periódico de los workers (0 lo desactiva), con variación aleatoria para no reiniciarlos todos a la vez
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', max_requests // 10))
+
+# Los latidos de los workers en memoria compartida, para no bloquearse en discos lentos dentro de contenedores
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG') or None
+errorlog = '-'
+
+
+def on_starting(server):
+    """
+    Avisa si los pools de todos los workers juntos superan lo que admiten la base de datos o la máquina.
+
+    Cada worker tiene su propio pool de conexiones por base de datos (primario, cada réplica y cada shard) y su
+    propio pool de hashes, así que los totales crecen con el número de workers.
+    """
+    connections = workers * (int(os.environ['DB_POOL_SIZE']) + int(os.environ['DB_MAX_OVERFLOW']))
+    if connections > db_max_connections:
+        server.log.warning('%s workers x (DB_POOL_SIZE + DB_MAX_OVERFLOW) = %s connections per database, above '
+                           'DB_MAX_CONNECTIONS=%s', workers, connections, db_max_connections)
+    hash_processes = workers * int(os.environ['PASSWORD_HASH_WORKERS'])
+    if hash_processes > multiprocessing.cpu_count():
+        server.log.warning('%s workers x PASSWORD_HASH_WORKERS = %s hash processes on %s cores',
+                           workers, hash_processes, multiprocessing.cpu_count())
+
+
+def post_fork(server, worker):
+    """
+    Renueva los pools de conexiones (del primario y de las réplicas de lectura) en cada worker recién creado.
+
+    Con preload_app el proceso maestro puede haber abierto conexiones (por ejemplo al registrar los eventos del motor);
+    un socket de MySQL compartido entre procesos mezcla las respuestas de ambos. `dispose(close=False)` sustituye el
+    pool del worker por uno vacío sin cerrar las conexiones heredadas, que siguen perteneciendo al maestro.
+    """
+    if not preload_app:
+        return
+    from app import db
+    from run import app
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    server.log.info('Worker %s: database engines disposed after fork', worker.pid)
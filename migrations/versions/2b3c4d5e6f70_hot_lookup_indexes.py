@@ -0,0 +1,50 @@
+"""Unique composite indexes for the hot lookup columns.
+
+Revision ID: 2b3c4d5e6f70
+Revises: 1a2b3c4d5e6f
+Create Date: 2026-10-18 10:30:00.000000
+
+Añade índices únicos compuestos sobre (fk_user_id, fk_habit_id), (fk_assignment_id, completed_date)
+y (habit_name, time_of_day), además de un índice sobre assignments.fk_habit_id. Los índices compuestos
+también sirven a las búsquedas por su primera columna (fk_user_id y fk_assignment_id).
+
+Si la base de datos contiene pares duplicados creados antes de esta revisión, deben depurarse antes
+de aplicarla; de lo contrario la creación de los índices únicos fallará.
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '2b3c4d5e6f70'
+down_revision = '1a2b3c4d5e6f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # batch_alter_table permite aplicar la revisión también sobre SQLite (benchmarks y pruebas locales)
+    with op.batch_alter_table('habits', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_habits_name_time_of_day', ['habit_name', 'time_of_day'])
+
+    with op.batch_alter_table('assignments', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_assignments_user_habit', ['fk_user_id', 'fk_habit_id'])
+        batch_op.create_index('ix_assignments_fk_habit_id', ['fk_habit_id'], unique=False)
+
+    with op.batch_alter_table('completed_dates', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_completed_dates_assignment_date', ['fk_assignment_id', 'completed_date'])
+
+
+def downgrade():
+    # En MySQL las claves foráneas necesitan un índice que empiece por su columna, por lo que se crean
+    # índices simples antes de eliminar los compuestos y se conserva ix_assignments_fk_habit_id
+    with op.batch_alter_table('completed_dates', schema=None) as batch_op:
+        batch_op.create_index('ix_completed_dates_fk_assignment_id', ['fk_assignment_id'], unique=False)
+        batch_op.drop_constraint('uq_completed_dates_assignment_date', type_='unique')
+
+    with op.batch_alter_table('assignments', schema=None) as batch_op:
+        batch_op.create_index('ix_assignments_fk_user_id', ['fk_user_id'], unique=False)
+        batch_op.drop_constraint('uq_assignments_user_habit', type_='unique')
+
+    with op.batch_alter_table('habits', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_habits_name_time_of_day', type_='unique')
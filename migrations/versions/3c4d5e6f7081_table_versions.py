@@ -0,0 +1,35 @@
+"""Per-table version counters for conditional GETs.
+
+Revision ID: 3c4d5e6f7081
+Revises: 2b3c4d5e6f70
+Create Date: 2026-10-18 11:00:00.000000
+
+Crea la tabla table_versions con un contador por tabla. Los servicios incrementan el contador
+en cada escritura y las lecturas lo usan para calcular ETags.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c4d5e6f7081'
+down_revision = '2b3c4d5e6f70'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    table_versions = op.create_table('table_versions',
+    sa.Column('table_name', sa.String(length=64), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('table_name')
+    )
+    op.bulk_insert(table_versions, [
+        {'table_name': table_name, 'version': 1}
+        for table_name in ('users', 'habits', 'assignments', 'completed_dates')
+    ])
+
+
+def downgrade():
+    op.drop_table('table_versions')
@@ -0,0 +1,43 @@
+"""Materialized per-assignment stats.
+
+Revision ID: 4d5e6f708192
+Revises: 3c4d5e6f7081
+Create Date: 2026-10-18 12:00:00.000000
+
+Crea la tabla assignment_stats con el resumen de rachas y totales de cada asignación.
+Tras aplicar la migración sobre una base con datos, ejecutar `flask stats rebuild` para poblarla;
+mientras tanto, las asignaciones sin resumen se calculan en cada lectura.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4d5e6f708192'
+down_revision = '3c4d5e6f7081'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('assignment_stats',
+    sa.Column('assignment_id', sa.Integer(), nullable=False),
+    sa.Column('last_completed', sa.Date(), nullable=True),
+    sa.Column('current_streak', sa.Integer(), nullable=False),
+    sa.Column('longest_streak', sa.Integer(), nullable=False),
+    sa.Column('total_count', sa.Integer(), nullable=False),
+    sa.Column('monday_count', sa.Integer(), nullable=False),
+    sa.Column('tuesday_count', sa.Integer(), nullable=False),
+    sa.Column('wednesday_count', sa.Integer(), nullable=False),
+    sa.Column('thursday_count', sa.Integer(), nullable=False),
+    sa.Column('friday_count', sa.Integer(), nullable=False),
+    sa.Column('saturday_count', sa.Integer(), nullable=False),
+    sa.Column('sunday_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['assignment_id'], ['assignments.assignment_id'], ),
+    sa.PrimaryKeyConstraint('assignment_id')
+    )
+
+
+def downgrade():
+    op.drop_table('assignment_stats')
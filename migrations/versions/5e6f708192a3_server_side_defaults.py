@@ -0,0 +1,52 @@
+"""Server-side defaults for the creation and completion dates.
+
+Revision ID: 5e6f708192a3
+Revises: 4d5e6f708192
+Create Date: 2026-10-18 16:00:00.000000
+
+Sustituye los valores por defecto de users.user_created_date, assignments.created_date y
+completed_dates.completed_date, que se calculaban en Python una sola vez al importar los modelos,
+por valores por defecto de la base de datos que se evalúan en cada inserción.
+
+El valor por defecto de completed_dates.completed_date es una expresión, `(CURRENT_DATE)`, que MySQL
+admite a partir de la versión 8.0.13.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e6f708192a3'
+down_revision = '4d5e6f708192'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # batch_alter_table permite aplicar la revisión también sobre SQLite (benchmarks y pruebas locales)
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.alter_column('user_created_date', existing_type=sa.DateTime(), existing_nullable=False,
+                              server_default=sa.func.now())
+
+    with op.batch_alter_table('assignments', schema=None) as batch_op:
+        batch_op.alter_column('created_date', existing_type=sa.DateTime(), existing_nullable=False,
+                              server_default=sa.func.now())
+
+    with op.batch_alter_table('completed_dates', schema=None) as batch_op:
+        batch_op.alter_column('completed_date', existing_type=sa.Date(), existing_nullable=False,
+                              server_default=sa.text('(CURRENT_DATE)'))
+
+
+def downgrade():
+    with op.batch_alter_table('completed_dates', schema=None) as batch_op:
+        batch_op.alter_column('completed_date', existing_type=sa.Date(), existing_nullable=False,
+                              server_default=None)
+
+    with op.batch_alter_table('assignments', schema=None) as batch_op:
+        batch_op.alter_column('created_date', existing_type=sa.DateTime(), existing_nullable=False,
+                              server_default=None)
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.alter_column('user_created_date', existing_type=sa.DateTime(), existing_nullable=False,
+                              server_default=None)
@@ -0,0 +1,71 @@
+"""Cascading foreign keys and background purge jobs.
+
+Revision ID: 6f708192a3b4
+Revises: 5e6f708192a3
+Create Date: 2026-10-18 18:00:00.000000
+
+Vuelve a crear las claves foráneas de assignments, completed_dates y assignment_stats con `ON DELETE CASCADE`,
+para que al eliminar un usuario, un hábito o una asignación la base de datos elimine sus filas dependientes, y
+crea la tabla purge_jobs con el estado de las eliminaciones en segundo plano.
+
+Las claves foráneas de la revisión inicial no tienen nombre: MySQL les asigna uno propio (por ejemplo
+`assignments_ibfk_1`), que se obtiene por reflexión; las nuevas se crean con un nombre explícito.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6f708192a3b4'
+down_revision = '5e6f708192a3'
+branch_labels = None
+depends_on = None
+
+# Nombre de las claves foráneas sin nombre al reflejar las tablas en SQLite (batch_alter_table)
+NAMING_CONVENTION = {'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s'}
+
+# Claves foráneas que se eliminan en cascada: tabla y (columna, tabla referenciada, columna referenciada)
+CASCADE_FOREIGN_KEYS = (
+    ('assignments', (('fk_user_id', 'users', 'user_id'), ('fk_habit_id', 'habits', 'habit_id'))),
+    ('completed_dates', (('fk_assignment_id', 'assignments', 'assignment_id'),)),
+    ('assignment_stats', (('assignment_id', 'assignments', 'assignment_id'),)),
+)
+
+
+def replace_foreign_keys(ondelete):
+    inspector = sa.inspect(op.get_bind())
+    for table, foreign_keys in CASCADE_FOREIGN_KEYS:
+        existing = {tuple(fk['constrained_columns']): fk['name'] for fk in inspector.get_foreign_keys(table)}
+        with op.batch_alter_table(table, schema=None, naming_convention=NAMING_CONVENTION) as batch_op:
+            for column, referred_table, referred_column in foreign_keys:
+                name = f'fk_{table}_{column}_{referred_table}'
+                batch_op.drop_constraint(existing.get((column,)) or name, type_='foreignkey')
+                batch_op.create_foreign_key(name, referred_table, [column], [referred_column], ondelete=ondelete)
+
+
+def upgrade():
+    # batch_alter_table permite aplicar la revisión también sobre SQLite (benchmarks y pruebas locales)
+    replace_foreign_keys('CASCADE')
+
+    op.create_table('purge_jobs',
+    sa.Column('purge_job_id', sa.Integer(), nullable=False),
+    sa.Column('target_table', sa.String(length=64), nullable=False),
+    sa.Column('target_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.Enum('pending', 'running', 'completed', 'failed'), server_default='pending', nullable=False),
+    sa.Column('deleted_rows', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('error', sa.String(length=500), nullable=True),
+    sa.Column('created_date', sa.DateTime(), server_default=sa.func.now(), nullable=False),
+    sa.Column('updated_date', sa.DateTime(), server_default=sa.func.now(), nullable=False),
+    sa.PrimaryKeyConstraint('purge_job_id')
+    )
+    with op.batch_alter_table('purge_jobs', schema=None) as batch_op:
+        batch_op.create_index('ix_purge_jobs_target', ['target_table', 'target_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('purge_jobs', schema=None) as batch_op:
+        batch_op.drop_index('ix_purge_jobs_target')
+
+    op.drop_table('purge_jobs')
+    replace_foreign_keys(None)
@@ -0,0 +1,57 @@
+"""At most one active purge job per row.
+
+Revision ID: 708192a3b4c5
+Revises: 6f708192a3b4
+Create Date: 2026-10-18 20:00:00.000000
+
+Añade a purge_jobs la columna active_target ('tabla:id' mientras la purga está pendiente o en curso, NULL al
+terminar) con una restricción única, que sustituye al índice ix_purge_jobs_target: dos peticiones simultáneas
+de eliminación de la misma fila ya no pueden programar dos purgas. Solo la purga activa más reciente de cada
+fila recibe su valor.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '708192a3b4c5'
+down_revision = '6f708192a3b4'
+branch_labels = None
+depends_on = None
+
+purge_jobs = sa.table('purge_jobs',
+    sa.column('purge_job_id', sa.Integer),
+    sa.column('target_table', sa.String),
+    sa.column('target_id', sa.Integer),
+    sa.column('status', sa.String),
+    sa.column('active_target', sa.String),
+)
+
+
+def upgrade():
+    with op.batch_alter_table('purge_jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('active_target', sa.String(length=80), nullable=True))
+
+    bind = op.get_bind()
+    rows = bind.execute(sa.select(purge_jobs.c.purge_job_id, purge_jobs.c.target_table, purge_jobs.c.target_id)
+                        .where(purge_jobs.c.status.in_(('pending', 'running')))
+                        .order_by(purge_jobs.c.purge_job_id.desc())).all()
+    seen = set()
+    for purge_job_id, target_table, target_id in rows:
+        active_target = f'{target_table}:{target_id}'
+        if active_target in seen:
+            continue
+        seen.add(active_target)
+        bind.execute(purge_jobs.update().where(purge_jobs.c.purge_job_id == purge_job_id).values(active_target=active_target))
+
+    with op.batch_alter_table('purge_jobs', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_purge_jobs_active_target', ['active_target'])
+        batch_op.drop_index('ix_purge_jobs_target')
+
+
+def downgrade():
+    with op.batch_alter_table('purge_jobs', schema=None) as batch_op:
+        batch_op.create_index('ix_purge_jobs_target', ['target_table', 'target_id'], unique=False)
+        batch_op.drop_constraint('uq_purge_jobs_active_target', type_='unique')
+        batch_op.drop_column('active_target')
@@ -0,0 +1,36 @@
+"""Global reservation of user nicknames and emails.
+
+Revision ID: 8192a3b4c5d6
+Revises: 708192a3b4c5
+Create Date: 2026-10-18 21:00:00.000000
+
+Crea la tabla user_identities con el nickname y el email de cada usuario y sus restricciones únicas. Con varios
+shards solo se usa la del shard 0, que garantiza la unicidad entre todos los shards. Se rellena con los usuarios
+de esta base de datos; con varios shards, `flask shards rebalance` reserva en el shard 0 los de los demás.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8192a3b4c5d6'
+down_revision = '708192a3b4c5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('user_identities',
+    sa.Column('user_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('nickname', sa.String(length=100), nullable=False),
+    sa.Column('email', sa.String(length=100), nullable=False),
+    sa.PrimaryKeyConstraint('user_id'),
+    sa.UniqueConstraint('email'),
+    sa.UniqueConstraint('nickname')
+    )
+    op.execute('INSERT INTO user_identities (user_id, nickname, email) SELECT user_id, nickname, email FROM users')
+
+
+def downgrade():
+    op.drop_table('user_identities')
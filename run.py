@@ -1,9 +1,9 @@
 from app import create_app
 
-# Crear la aplicación Flask usando la función factory `create_app`
+# Crear la aplicación Flask usando la función factory `create_app` (el perfil se elige con APP_ENV)
 app = create_app()
 
 # Punto de entrada principal para ejecutar la aplicación
 if __name__ == '__main__':
-    # Ejecutar la aplicación Flask con el modo debug activado
-    app.run(debug=True)
+    # Ejecutar la aplicación Flask con el modo debug y la recarga automática del perfil de configuración
+    app.run(debug=app.config['DEBUG'], use_reloader=app.config['USE_RELOADER'])
@@ -0,0 +1,95 @@
+"""
+Número de consultas SQL de las expansiones `?include=`: debe ser constante, sin una consulta por fila expandida.
+
+Uso:
+    python -m pytest tests/test_includes.py
+"""
+from datetime import date, timedelta
+import pytest
+from sqlalchemy import event
+from app import create_app, db
+from app.config import BenchmarkConfig
+from app.models.assignment_model import Assignment
+from app.models.completed_date_model import CompletedDate
+from app.models.habit_model import Habit
+from app.models.user_model import User
+
+# Consultas de una expansión: versiones del ETag, la entidad, sus asignaciones y sus fechas completadas
+MAX_QUERIES = 4
+
+
+class IncludesConfig(BenchmarkConfig):
+    """
+    Perfil de las pruebas: base de datos SQLite en memoria, sin caché de entidades ni pool de hashes.
+    """
+
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    SQLALCHEMY_REPLICA_URIS = []
+    SQLALCHEMY_SHARD_URIS = []
+    CACHE_BACKEND = 'null'
+    PASSWORD_HASH_WORKERS = 0
+
+
+def build(assignments, days):
+    """
+    Crea la aplicación con un usuario 1 y un hábito 1 que tienen `assignments` asignaciones de `days` fechas.
+
+    Returns:
+        Flask: La aplicación con los datos cargados.
+    """
+    app = create_app(IncludesConfig)
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([User(f'First {i}', f'Last {i}', f'user{i}', f'user{i}@example.com', 'x') for i in range(1, assignments + 1)])
+        db.session.add_all([Habit(f'Habit {i}', 'mañana') for i in range(1, assignments + 1)])
+        db.session.flush()
+        # El usuario 1 tiene una asignación por hábito y el hábito 1 una por usuario
+        db.session.add_all([Assignment(1, habit_id) for habit_id in range(1, assignments + 1)])
+        db.session.add_all([Assignment(user_id, 1) for user_id in range(2, assignments + 1)])
+        db.session.flush()
+        start = date.today() - timedelta(days=days - 1)
+        db.session.add_all([CompletedDate(assignment_id, start + timedelta(days=day))
+                            for assignment_id in range(1, 2 * assignments) for day in range(days)])
+        db.session.commit()
+    return app
+
+
+def count_queries(app, path):
+    """
+    Hace un GET a `path` y cuenta las sentencias SQL que ejecuta.
+
+    Returns:
+        tuple: La respuesta y el número de sentencias.
+    """
+    statements = []
+    listener = lambda conn, cursor, statement, parameters, context, executemany: statements.append(statement)
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        response = app.test_client().get(path)
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+    return response, len(statements)
+
+
+@pytest.mark.parametrize('path', ['/users/1?include=assignments.completed_dates',
+                                  '/habits/1?include=assignments.completed_dates'])
+def test_include_queries_do_not_grow_with_rows(path):
+    queries = []
+    for assignments, days in ((2, 3), (20, 30)):
+        response, count = count_queries(build(assignments, days), path)
+        assert response.status_code == 200, response.get_data(as_text=True)
+        body = response.get_json()
+        assert len(body['assignments']) == assignments
+        assert all(len(assignment['completed_dates']) == days for assignment in body['assignments'])
+        queries.append(count)
+    assert queries[0] == queries[1]
+    assert queries[1] <= MAX_QUERIES
+
+
+def test_include_assignments_only_skips_dates():
+    response, count = count_queries(build(5, 3), '/users/1?include=assignments')
+    assert response.status_code == 200, response.get_data(as_text=True)
+    assert all('completed_dates' not in assignment for assignment in response.get_json()['assignments'])
+    assert count <= MAX_QUERIES - 1
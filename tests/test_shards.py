@@ -0,0 +1,178 @@
+"""
+Reparto por usuario entre dos shards SQLite: IDs sin colisiones, filas de cada usuario en su shard, listados
+paginados mezclados en orden, réplica del catálogo de hábitos y unicidad global del nickname y el email.
+
+Uso:
+    python -m pytest tests/test_shards.py
+"""
+import json
+import re
+from datetime import date, timedelta
+import pytest
+from app import create_app, db, shard_router
+from app.config import BenchmarkConfig
+from app.utils.pagination import Pagination
+from app.utils.validations import Validations
+
+USERS = 7
+
+
+class ShardsConfig(BenchmarkConfig):
+    """
+    Perfil de las pruebas: shard 0 y shard 1 en archivos SQLite, sin caché de entidades ni pool de hashes.
+    """
+
+    SQLALCHEMY_REPLICA_URIS = []
+    CACHE_BACKEND = 'null'
+    PASSWORD_HASH_WORKERS = 0
+    BCRYPT_LOG_ROUNDS = 4
+
+
+@pytest.fixture
+def client(tmp_path):
+    """
+    Crea la aplicación con dos shards vacíos y `USERS` usuarios registrados por la API.
+
+    Returns:
+        FlaskClient: Cliente de pruebas de la aplicación.
+    """
+    config = type('TmpShardsConfig', (ShardsConfig,), {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "shard0.db"}',
+        'SQLALCHEMY_SHARD_URIS': [f'sqlite:///{tmp_path / "shard1.db"}'],
+    })
+    app = create_app(config)
+    with app.app_context():
+        for engine in shard_router.engines:
+            db.metadata.create_all(engine)
+    client = app.test_client()
+    for i in range(1, USERS + 1):
+        response = client.post('/users/', json={'first_name': f'First {i}', 'last_name': f'Last {i}', 'nickname': f'user{i}',
+                                                'email': f'user{i}@example.com', 'user_password': 'Password123!'})
+        assert response.status_code == 201, response.get_data(as_text=True)
+    with app.app_context():
+        yield client
+
+
+def ids(shard, table, key):
+    """
+    Returns:
+        list: Valores de la columna `key` de `table` en el shard indicado, ordenados.
+    """
+    with shard_router.engines[shard].connect() as connection:
+        return connection.scalars(db.text(f'SELECT {key} FROM {table} ORDER BY {key}')).all()
+
+
+def user_ids():
+    """
+    Returns:
+        list: IDs de los usuarios de todos los shards, ordenados (los usuarios se reparten por turnos, así que la
+              serie puede tener huecos).
+    """
+    return sorted(sum((ids(shard, 'users', 'user_id') for shard in range(shard_router.count)), []))
+
+
+def test_ids_do_not_collide_between_shards(client):
+    per_shard = [ids(shard, 'users', 'user_id') for shard in range(shard_router.count)]
+    assert all(per_shard)
+    assert len(set(user_ids())) == len(user_ids()) == USERS
+    for shard, members in enumerate(per_shard):
+        assert all(shard_router.shard_for(user_id) == shard for user_id in members)
+
+
+def test_allocated_ids_follow_each_shard_series(client):
+    users = db.metadata.tables['users']
+    for shard, engine in enumerate(shard_router.engines):
+        with engine.begin() as connection:
+            allocated = shard_router._allocate_ids(connection, users, 'user_id', 3)
+        assert all(shard_router.shard_for(user_id) == shard for user_id in allocated)
+        assert min(allocated) > max(ids(shard, 'users', 'user_id'))
+        assert allocated == sorted(set(allocated))
+
+
+def test_user_rows_stay_on_user_shard(client):
+    assert client.post('/habits/', json={'habit_name': 'Read', 'time_of_day': 'noche'}).status_code == 201
+    today = date.today()
+    for user_id in user_ids():
+        assert client.post('/assignments/', json={'fk_user_id': user_id, 'fk_habit_id': 1}).status_code == 201
+    for assignment_id in ids(0, 'assignments', 'assignment_id') + ids(1, 'assignments', 'assignment_id'):
+        for day in range(2):
+            response = client.post('/completed_dates/', json={'fk_assignment_id': assignment_id,
+                                                              'completed_date': (today - timedelta(days=day)).isoformat()})
+            assert response.status_code == 201, response.get_data(as_text=True)
+
+    for shard in range(shard_router.count):
+        with shard_router.engines[shard].connect() as connection:
+            owners = connection.scalars(db.text('SELECT fk_user_id FROM assignments')).all()
+            date_owners = connection.scalars(db.text(
+                'SELECT a.fk_user_id FROM completed_dates c JOIN assignments a ON a.assignment_id = c.fk_assignment_id')).all()
+            orphans = connection.scalar(db.text(
+                'SELECT COUNT(*) FROM completed_dates WHERE fk_assignment_id NOT IN (SELECT assignment_id FROM assignments)'))
+        assert owners and all(shard_router.shard_for(user_id) == shard for user_id in owners)
+        assert len(date_owners) == 2 * len(owners)
+        assert all(shard_router.shard_for(user_id) == shard for user_id in date_owners)
+        assert orphans == 0
+
+    response = client.get(f'/assignments/user/{user_ids()[1]}')
+    assert response.status_code == 200
+    assert [assignment['fk_user_id'] for assignment in response.get_json()] == [user_ids()[1]]
+
+
+def follow(client, path, rel):
+    """
+    Recorre un listado paginado siguiendo los enlaces `rel` del encabezado Link.
+
+    Returns:
+        list: Las páginas de IDs de usuario, en el orden en que se recorrieron.
+    """
+    pages = []
+    while path:
+        response = client.get(path)
+        assert response.status_code == 200, response.get_data(as_text=True)
+        pages.append([user['user_id'] for user in response.get_json()])
+        match = re.search(rf'<([^>]+)>; rel="{rel}"', response.headers.get('Link', ''))
+        path = match.group(1) if match else None
+    return pages
+
+
+def test_cursor_pages_merge_shards_in_order(client):
+    expected = user_ids()
+    assert follow(client, '/users/?limit=2', 'next') == [expected[start:start + 2] for start in range(0, USERS, 2)]
+    # Hacia atrás desde el final, los enlaces 'prev' devuelven las mismas filas en páginas alineadas con el final
+    before_end = Pagination.encode_cursor(expected[-1] + 1)
+    assert follow(client, f'/users/?limit=2&before={before_end}', 'prev') == [
+        expected[max(end - 2, 0):end] for end in range(USERS, 0, -2)]
+
+    response = client.get('/users/?stream=1')
+    assert response.status_code == 200
+    assert [json.loads(line)['user_id'] for line in response.get_data(as_text=True).splitlines()] == expected
+
+
+def test_habits_are_replicated_in_every_shard(client):
+    assert client.post('/habits/', json={'habit_name': 'Run', 'time_of_day': 'mañana'}).status_code == 201
+    habit_id = ids(0, 'habits', 'habit_id')[-1]
+    assert all(ids(shard, 'habits', 'habit_id') == [habit_id] for shard in range(shard_router.count))
+
+    assert client.put(f'/habits/{habit_id}', json={'habit_name': 'Walk', 'time_of_day': 'tarde'}).status_code == 200
+    for engine in shard_router.engines:
+        with engine.connect() as connection:
+            assert connection.execute(db.text('SELECT habit_name, time_of_day FROM habits')).all() == [('Walk', 'tarde')]
+
+    # Un usuario de cada shard puede asignarse el hábito replicado
+    for user_id in user_ids()[:2]:
+        assert client.post('/assignments/', json={'fk_user_id': user_id, 'fk_habit_id': habit_id}).status_code == 201
+
+    assert client.delete(f'/habits/{habit_id}').status_code == 200
+    assert all(ids(shard, 'habits', 'habit_id') == [] for shard in range(shard_router.count))
+    assert all(ids(shard, 'assignments', 'assignment_id') == [] for shard in range(shard_router.count))
+
+
+def test_nickname_and_email_are_unique_across_shards(client, monkeypatch):
+    # Sin la verificación previa (como en dos registros simultáneos), el nuevo usuario caería en cualquiera de los
+    # shards y solo la tabla global del shard 0 lo detiene
+    monkeypatch.setattr(Validations, 'check_all', staticmethod(lambda *checks: None))
+    for nickname, email in (('user1', 'new1@example.com'), ('new2', 'user2@example.com')):
+        for _ in range(shard_router.count):
+            response = client.post('/users/', json={'first_name': 'New', 'last_name': 'User', 'nickname': nickname,
+                                                    'email': email, 'user_password': 'Password123!'})
+            assert response.status_code == 422, response.get_data(as_text=True)
+    assert sum(len(ids(shard, 'users', 'user_id')) for shard in range(shard_router.count)) == USERS